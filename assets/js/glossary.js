@@ -0,0 +1,132 @@
+// Glossary definitions for bold terms on the lecture pages.
+//
+// The build writes the glossary, built from the terms the lectures define, to
+// the file named by this script's data-index attribute
+// (Lectures/glossary/index.json, see scripts/glossary.py) and marks every bold
+// mention of one of its terms with the term's key (<strong data-term="hit
+// rate">). Once the
+// page is idle the glossary is loaded, the terms it defines become focusable,
+// and hovering or focusing one shows its definition with a link to the
+// section that defines it. Content swapped in by lecture-nav.js is picked up
+// as well. Defining occurrences (<dfn>) are left alone.
+(() => {
+  'use strict';
+
+  const script = document.currentScript;
+  if (!script || !script.dataset.index) return;
+  const indexUrl = new URL(script.dataset.index, document.baseURI);
+  const glossaryUrl = new URL('../html/glossary.html', indexUrl);
+  const SHOW_DELAY = 150;
+  const HIDE_DELAY = 250;
+
+  let terms = null;
+  let lectures = null;
+  let popover = null;
+  let active = null;
+  let timer = 0;
+
+  function load() {
+    return fetch(indexUrl).then((response) => {
+      if (!response.ok) throw new Error(`${indexUrl}: ${response.status}`);
+      return response.json();
+    }).then((data) => {
+      lectures = new Map(data.lectures.map((lecture) => [lecture.lecture, lecture]));
+      terms = new Map(data.terms.map((entry) => [entry.key, entry]));
+      mark();
+      new MutationObserver(mark).observe(document.body, { childList: true });
+    });
+  }
+
+  function mark() {
+    document.querySelectorAll('strong[data-term]:not(.glossary-term)').forEach((element) => {
+      if (!terms.has(element.dataset.term)) return;
+      element.classList.add('glossary-term');
+      element.tabIndex = 0;
+    });
+  }
+
+  function createPopover() {
+    popover = document.createElement('div');
+    popover.className = 'glossary-popover';
+    popover.id = 'glossary-popover';
+    popover.setAttribute('role', 'tooltip');
+    popover.hidden = true;
+    popover.addEventListener('mouseenter', () => clearTimeout(timer));
+    popover.addEventListener('mouseleave', () => hideLater());
+    document.body.append(popover);
+  }
+
+  function sourceLink(lecture, anchor, heading) {
+    const link = document.createElement('a');
+    const info = lectures.get(lecture);
+    link.href = new URL(info.url + (anchor ? `#${anchor}` : ''), indexUrl).href;
+    link.textContent = `Lecture ${lecture}` + (heading ? ` › ${heading}` : '');
+    return link;
+  }
+
+  function show(element) {
+    const entry = terms.get(element.dataset.term);
+    if (!entry) return;
+    if (!popover) createPopover();
+    clearTimeout(timer);
+    if (active) active.removeAttribute('aria-describedby');
+    active = element;
+
+    const term = document.createElement('strong');
+    term.className = 'glossary-popover-term';
+    term.textContent = entry.term;
+    const definition = document.createElement('p');
+    definition.className = 'glossary-popover-definition';
+    definition.textContent = entry.definition;
+    const source = document.createElement('p');
+    source.className = 'glossary-popover-source';
+    const all = document.createElement('a');
+    all.href = glossaryUrl.href;
+    all.textContent = 'Glossary';
+    source.append(sourceLink(entry.lecture, entry.anchor, entry.heading), ' · ', all);
+    popover.replaceChildren(term, definition, source);
+    popover.hidden = false;
+    element.setAttribute('aria-describedby', popover.id);
+
+    const rect = element.getBoundingClientRect();
+    const width = popover.offsetWidth;
+    const left = Math.max(8, Math.min(rect.left, document.documentElement.clientWidth - width - 8));
+    popover.style.left = `${left + window.scrollX}px`;
+    popover.style.top = `${rect.bottom + window.scrollY + 6}px`;
+  }
+
+  function hide() {
+    clearTimeout(timer);
+    if (popover) popover.hidden = true;
+    if (active) active.removeAttribute('aria-describedby');
+    active = null;
+  }
+
+  function hideLater() {
+    clearTimeout(timer);
+    timer = setTimeout(hide, HIDE_DELAY);
+  }
+
+  document.addEventListener('mouseover', (event) => {
+    const element = event.target.closest && event.target.closest('.glossary-term');
+    if (!element || element === active) return;
+    clearTimeout(timer);
+    timer = setTimeout(() => show(element), SHOW_DELAY);
+  });
+  document.addEventListener('mouseout', (event) => {
+    const element = event.target.closest && event.target.closest('.glossary-term');
+    if (element && !element.contains(event.relatedTarget)) hideLater();
+  });
+  document.addEventListener('focusin', (event) => {
+    if (event.target.classList && event.target.classList.contains('glossary-term')) {
+      show(event.target);
+    } else if (!popover || !popover.contains(event.target)) {
+      hide();
+    }
+  });
+  document.addEventListener('keydown', (event) => {
+    if (event.key === 'Escape' && active) hide();
+  });
+
+  (window.requestIdleCallback || setTimeout)(() => load().catch(() => {}));
+})();
@@ -0,0 +1,92 @@
+// Instant previous/next navigation between lecture pages.
+//
+// The previous/next buttons fetch the target page, or take it from a small
+// in-memory cache of recently visited lectures, and swap the header and main
+// content in place instead of loading a new document. The next lecture is
+// fetched while the browser is idle, so reading in order never waits for the
+// network. Without JavaScript, or if anything fails, the links load normally.
+(() => {
+  'use strict';
+
+  // Pages kept in memory, least recently used first
+  const CACHE_SIZE = 8;
+  const pages = new Map();
+  let current = location.pathname;
+
+  function load(url) {
+    url = url.split('#')[0];
+    let page = pages.get(url);
+    if (page) {
+      pages.delete(url);
+    } else {
+      page = fetch(url, { credentials: 'same-origin' }).then((response) => {
+        if (!response.ok) throw new Error(`${url}: ${response.status}`);
+        return response.text();
+      });
+      page.catch(() => pages.delete(url));
+    }
+    pages.set(url, page);
+    while (pages.size > CACHE_SIZE) pages.delete(pages.keys().next().value);
+    return page;
+  }
+
+  function prefetchNext() {
+    const next = document.querySelector('.lecture-nav a[rel="next"]');
+    if (next) load(next.href).catch(() => {});
+  }
+
+  function swap(html, url) {
+    const doc = new DOMParser().parseFromString(html, 'text/html');
+    const header = doc.querySelector('.lecture-header');
+    const main = doc.querySelector('main');
+    if (!header || !main) throw new Error(`${url}: not a lecture page`);
+
+    document.title = doc.title;
+    document.querySelector('.lecture-header').replaceWith(document.adoptNode(header));
+    document.querySelector('main').replaceWith(document.adoptNode(main));
+    // The new page's hints name the lecture after it
+    document.querySelectorAll('head link[rel="prefetch"]').forEach((link) => link.remove());
+    doc.querySelectorAll('head link[rel="prefetch"]').forEach((link) => {
+      document.head.append(document.adoptNode(link));
+    });
+    current = new URL(url).pathname;
+
+    const target = location.hash && document.getElementById(decodeURIComponent(location.hash.slice(1)));
+    if (target) {
+      target.scrollIntoView();
+    } else {
+      window.scrollTo(0, 0);
+    }
+    const title = document.querySelector('.lecture-title');
+    if (title) {
+      title.tabIndex = -1;
+      title.focus({ preventScroll: true });
+    }
+    prefetchNext();
+  }
+
+  function navigate(url, push) {
+    return load(url).then((html) => {
+      if (push) history.pushState(null, '', url);
+      swap(html, url);
+    });
+  }
+
+  document.addEventListener('click', (event) => {
+    const link = event.target.closest('.lecture-nav a[rel="prev"], .lecture-nav a[rel="next"]');
+    if (!link || event.defaultPrevented || event.button !== 0 ||
+        event.metaKey || event.ctrlKey || event.shiftKey || event.altKey) {
+      return;
+    }
+    event.preventDefault();
+    navigate(link.href, true).catch(() => { location.href = link.href; });
+  });
+
+  window.addEventListener('popstate', () => {
+    // In-page anchors also add history entries; only a different page needs a swap
+    if (location.pathname === current) return;
+    navigate(location.href, false).catch(() => location.reload());
+  });
+
+  (window.requestIdleCallback || setTimeout)(prefetchNext);
+})();
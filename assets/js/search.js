@@ -0,0 +1,420 @@
+// Full-text search of the lecture notes on index.html.
+//
+// The build writes a term dictionary and one index shard per lecture to the
+// directory named by the form's data-index attribute (Lectures/search/), in
+// the binary format described in scripts/search_format.py. A query loads the
+// dictionary once, then only the shards of the lectures that contain all of
+// its words, and decodes only the posting lists of its terms, which it finds
+// through the dictionary. Matching and ranking follow SearchIndex.query in
+// scripts/search_index.py: every word must occur in the same section, the last
+// one also as a prefix, and sections are ranked by occurrences with bonuses for
+// the words appearing in the heading and as a phrase in it.
+(() => {
+  'use strict';
+
+  const STOPWORDS = new Set((
+    'a an and are as at be but by for from has have if in into is it its of on or so such ' +
+    'than that the their then there these this to was were which will with').split(' '));
+  const MAX_PREFIX_TERMS = 50;
+  const PHRASE_BONUS = 5;
+  const HEADING_BONUS = 10;
+  const MAX_RESULTS = 20;
+  const TOKEN_RE = /[\p{L}\p{N}]+/gu;
+
+  const form = document.querySelector('.lecture-search');
+  if (!form) return;
+  const input = form.querySelector('input');
+  const status = form.querySelector('.lecture-search-status');
+  const list = form.querySelector('.lecture-search-results');
+  const base = new URL(form.dataset.index, document.baseURI);
+
+  const utf8 = new TextDecoder();
+  let dictionary = null;
+  const shards = new Map();
+
+  // Sequential reader over an encoded index file (search_format.Reader)
+  class Reader {
+    constructor(bytes, pos = 0) {
+      this.bytes = bytes;
+      this.pos = pos;
+    }
+
+    varint() {
+      let value = 0;
+      let scale = 1;
+      for (;;) {
+        if (this.pos >= this.bytes.length) throw new Error('truncated search index');
+        const byte = this.bytes[this.pos++];
+        value += (byte & 0x7f) * scale;
+        if (byte < 0x80) return value;
+        scale *= 128;
+      }
+    }
+
+    raw(size) {
+      const start = this.pos;
+      this.pos += size;
+      if (this.pos > this.bytes.length) throw new Error('truncated search index');
+      return this.bytes.subarray(start, this.pos);
+    }
+
+    string() {
+      return utf8.decode(this.raw(this.varint()));
+    }
+
+    header(magic) {
+      if (utf8.decode(this.raw(magic.length)) !== magic) throw new Error(`not a search index file (${magic})`);
+      return this.string();
+    }
+  }
+
+  // Bucketed, front-coded term -> value table (search_format.TermTable); a
+  // lookup decodes one bucket of terms
+  class TermTable {
+    constructor(reader, decodeValue) {
+      this.count = reader.varint();
+      this.bucketSize = reader.varint();
+      this.entryOffsets = [];
+      this.dataOffsets = [];
+      let entries = 0;
+      let data = 0;
+      for (let i = Math.ceil(this.count / this.bucketSize); i > 0; i--) {
+        this.entryOffsets.push(entries += reader.varint());
+        this.dataOffsets.push(data += reader.varint());
+      }
+      this.entries = reader.raw(reader.varint());
+      this.data = reader.raw(reader.varint());
+      this.decodeValue = decodeValue;
+      this.buckets = new Map();
+      this.values = new Map();
+      // The first term of a bucket is stored whole
+      this.heads = this.entryOffsets.map((offset) => {
+        const head = new Reader(this.entries, offset);
+        head.varint();
+        return head.string();
+      });
+    }
+
+    // [term, start, end] of every entry in a bucket, values as data block offsets
+    bucket(index) {
+      if (this.buckets.has(index)) return this.buckets.get(index);
+      const reader = new Reader(this.entries, this.entryOffsets[index]);
+      let end = this.dataOffsets[index];
+      let term = new Uint8Array(0);
+      const entries = [];
+      for (let i = Math.min(this.bucketSize, this.count - index * this.bucketSize); i > 0; i--) {
+        const shared = reader.varint();
+        const suffix = reader.raw(reader.varint());
+        const next = new Uint8Array(shared + suffix.length);
+        next.set(term.subarray(0, shared));
+        next.set(suffix, shared);
+        term = next;
+        const start = end;
+        end += reader.varint();
+        entries.push([utf8.decode(term), start, end]);
+      }
+      this.buckets.set(index, entries);
+      return entries;
+    }
+
+    // Index of the last bucket whose first term is <= term, or -1
+    findBucket(term) {
+      let low = 0;
+      let high = this.heads.length;
+      while (low < high) {
+        const mid = (low + high) >> 1;
+        if (this.heads[mid] <= term) low = mid + 1; else high = mid;
+      }
+      return low - 1;
+    }
+
+    find(term) {
+      const index = this.findBucket(term);
+      return index < 0 ? undefined : this.bucket(index).find(([found]) => found === term);
+    }
+
+    get(term) {
+      const entry = this.find(term);
+      return entry && this.decodeValue(this.data.subarray(entry[1], entry[2]));
+    }
+
+    // [bucket index, values of the bucket's terms up to term], or undefined if term is absent
+    bucketValues(term) {
+      const index = this.findBucket(term);
+      if (index < 0) return undefined;
+      const entries = this.bucket(index);
+      const position = entries.findIndex(([found]) => found === term);
+      if (position < 0) return undefined;
+      if (!this.values.has(index)) {
+        this.values.set(index, entries.map(([, start, end]) => this.decodeValue(this.data.subarray(start, end))));
+      }
+      return [index, this.values.get(index).slice(0, position + 1)];
+    }
+
+    has(term) {
+      return this.find(term) !== undefined;
+    }
+
+    withPrefix(prefix, limit) {
+      const found = [];
+      for (let index = Math.max(this.findBucket(prefix), 0); index < this.heads.length; index++) {
+        for (const [term] of this.bucket(index)) {
+          if (term < prefix) continue;
+          if (!term.startsWith(prefix) || found.length === limit) return found;
+          found.push(term);
+        }
+      }
+      return found;
+    }
+  }
+
+  // Varints: the first number, then deltas
+  function decodeDeltas(bytes) {
+    const numbers = [];
+    let number = 0;
+    let delta = 0;
+    let scale = 1;
+    for (const byte of bytes) {
+      delta += (byte & 0x7f) * scale;
+      if (byte >= 0x80) {
+        scale *= 128;
+        continue;
+      }
+      number += delta;
+      numbers.push(number);
+      delta = 0;
+      scale = 1;
+    }
+    return numbers;
+  }
+
+  // A packed posting list (search_format.write_postings) as [section, count] pairs
+  function decodePostings(bytes) {
+    const reader = new Reader(bytes);
+    const pairs = [];
+    let section = 0;
+    while (reader.pos < bytes.length) {
+      const value = reader.varint();
+      section += Math.floor(value / 2);
+      pairs.push([section, value % 2 ? reader.varint() + 2 : 1]);
+    }
+    return pairs;
+  }
+
+  function decodeDictionary(buffer) {
+    const reader = new Reader(new Uint8Array(buffer));
+    reader.header('LSD');
+    const lectures = [];
+    for (let count = reader.varint(); count > 0; count--) {
+      lectures.push(reader.varint());
+      reader.string();
+    }
+    const terms = new TermTable(reader, decodeDeltas);
+    const counts = reader.raw(terms.heads.length * lectures.length);
+    // lecture -> terms the lecture has before each bucket
+    const ranks = new Map(lectures.map((num, i) => {
+      const before = [0];
+      for (let offset = i; offset < counts.length; offset += lectures.length) {
+        before.push(before[before.length - 1] + counts[offset]);
+      }
+      return [num, before];
+    }));
+    return { terms, ranks };
+  }
+
+  // Position of a term among the sorted terms of a lecture (search_format.term_rank)
+  function termRank(data, term, lecture) {
+    const found = data.terms.bucketValues(term);
+    if (!found || !found[1][found[1].length - 1].includes(lecture)) return -1;
+    const [index, values] = found;
+    return data.ranks.get(lecture)[index] + values.slice(0, -1).filter((lectures) => lectures.includes(lecture)).length;
+  }
+
+  // A shard's posting lists, in the order of the lecture's terms (search_format.ShardPostings)
+  class ShardPostings {
+    constructor(reader, data, lecture) {
+      this.count = reader.varint();
+      this.bucketSize = reader.varint();
+      this.offsets = [];
+      let offset = 0;
+      for (let i = Math.ceil(this.count / this.bucketSize); i > 0; i--) this.offsets.push(offset += reader.varint());
+      this.data = reader.raw(reader.varint());
+      this.dictionary = data;
+      this.lecture = lecture;
+    }
+
+    get(term) {
+      const rank = termRank(this.dictionary, term, this.lecture);
+      if (rank < 0) return undefined;
+      const reader = new Reader(this.data, this.offsets[Math.floor(rank / this.bucketSize)]);
+      for (let i = rank % this.bucketSize; i > 0; i--) {
+        const size = reader.varint();
+        reader.pos += size;
+      }
+      return decodePostings(reader.raw(reader.varint()));
+    }
+  }
+
+  // lecture_parser.slugify() of an ASCII heading, which is the anchor the shard leaves out
+  function derivedAnchor(heading) {
+    return heading.trim().toLowerCase().replace(/[^\w\- ]/g, '').replace(/ /g, '-');
+  }
+
+  function decodeShard(buffer, data) {
+    const reader = new Reader(new Uint8Array(buffer));
+    reader.header('LSS');
+    const lecture = reader.varint();
+    const title = reader.string();
+    const url = reader.string();
+    const strings = [];
+    for (let count = reader.varint(); count > 0; count--) strings.push(reader.string());
+    const sections = [];
+    for (let count = reader.varint(); count > 0; count--) {
+      const heading = strings[reader.varint()];
+      const anchor = reader.varint();
+      sections.push([anchor ? strings[anchor - 1] : derivedAnchor(heading), heading]);
+    }
+    // Posting lists are decoded when a query needs them
+    return { lecture, title, url, sections, postings: new ShardPostings(reader, data, lecture) };
+  }
+
+  function fetchIndex(name, decode) {
+    return fetch(new URL(name, base)).then((response) => {
+      if (!response.ok) throw new Error(`${name}: ${response.status}`);
+      return response.arrayBuffer();
+    }).then(decode);
+  }
+
+  function loadDictionary() {
+    if (!dictionary) {
+      dictionary = fetchIndex('terms.bin', decodeDictionary);
+      dictionary.catch(() => { dictionary = null; });
+    }
+    return dictionary;
+  }
+
+  function loadShard(data, num) {
+    if (!shards.has(num)) {
+      const shard = fetchIndex(`lecture-${String(num).padStart(2, '0')}.bin`, (buffer) => decodeShard(buffer, data));
+      shard.catch(() => shards.delete(num));
+      shards.set(num, shard);
+    }
+    return shards.get(num);
+  }
+
+  function tokenize(text) {
+    return text.toLowerCase().match(TOKEN_RE) || [];
+  }
+
+  function queryWords(text) {
+    return tokenize(text).filter((word) => !STOPWORDS.has(word));
+  }
+
+  function expand(data, word, prefix) {
+    if (!prefix) return data.terms.has(word) ? [word] : [];
+    return data.terms.withPrefix(word, MAX_PREFIX_TERMS);
+  }
+
+  function countPhrases(tokens, termSets) {
+    if (termSets.length < 2) return 0;
+    let count = 0;
+    for (let start = 0; start + termSets.length <= tokens.length; start++) {
+      if (termSets.every((terms, i) => terms.has(tokens[start + i]))) count++;
+    }
+    return count;
+  }
+
+  function score(shard, expansions) {
+    // section -> occurrences, one map per query word
+    const hits = expansions.map((words) => {
+      const merged = new Map();
+      for (const term of words) {
+        for (const [section, count] of shard.postings.get(term) || []) {
+          merged.set(section, (merged.get(section) || 0) + count);
+        }
+      }
+      return merged;
+    });
+    const termSets = expansions.map((words) => new Set(words));
+    const results = [];
+    const sections = [...hits[0].keys()].filter((section) => hits.every((merged) => merged.has(section)));
+    for (const section of sections.sort((a, b) => a - b)) {
+      const [anchor, heading] = shard.sections[section];
+      let points = hits.reduce((sum, merged) => sum + merged.get(section), 0);
+      // Section 0's heading is the lecture title, which is not part of its text
+      if (section) {
+        const tokens = tokenize(heading);
+        points += HEADING_BONUS * termSets.filter((terms) => tokens.some((token) => terms.has(token))).length;
+        points += PHRASE_BONUS * countPhrases(tokens, termSets);
+      }
+      results.push({
+        lecture: shard.lecture, title: shard.title, anchor, heading, score: points,
+        url: shard.url + (anchor ? `#${anchor}` : ''),
+      });
+    }
+    return results;
+  }
+
+  async function search(text) {
+    const words = queryWords(text);
+    if (!words.length) return [];
+    const data = await loadDictionary();
+    const expansions = words.map((word, i) => expand(data, word, i === words.length - 1));
+    let lectures = null;
+    for (const expansion of expansions) {
+      const found = new Set(expansion.flatMap((term) => data.terms.get(term)));
+      lectures = lectures === null ? found : new Set([...lectures].filter((num) => found.has(num)));
+    }
+    const loaded = await Promise.all([...lectures].sort((a, b) => a - b).map((num) => loadShard(data, num)));
+    const results = loaded.flatMap((shard) => score(shard, expansions));
+    results.sort((a, b) => b.score - a.score || a.lecture - b.lecture);
+    return results.slice(0, MAX_RESULTS);
+  }
+
+  function render(results, text) {
+    list.replaceChildren(...results.map((result) => {
+      const item = document.createElement('li');
+      const link = document.createElement('a');
+      link.href = new URL(result.url, base).href;
+      const lecture = document.createElement('span');
+      lecture.className = 'search-result-lecture';
+      lecture.textContent = result.title;
+      link.append(lecture);
+      if (result.anchor) {
+        const heading = document.createElement('span');
+        heading.className = 'search-result-heading';
+        heading.textContent = result.heading;
+        link.append(heading);
+      }
+      item.append(link);
+      return item;
+    }));
+    status.textContent = text ? `${results.length || 'No'} result${results.length === 1 ? '' : 's'}` : '';
+  }
+
+  // Only the latest query's results are shown, however the fetches interleave
+  let latest = 0;
+  function update() {
+    const text = input.value.trim();
+    const id = ++latest;
+    search(text).then((results) => {
+      if (id === latest) render(results, text);
+    }).catch(() => {
+      if (id === latest) status.textContent = 'Search is unavailable right now.';
+    });
+  }
+
+  let timer = 0;
+  input.addEventListener('input', () => {
+    clearTimeout(timer);
+    timer = setTimeout(update, 100);
+  });
+  form.addEventListener('submit', (event) => {
+    event.preventDefault();
+    clearTimeout(timer);
+    update();
+  });
+  // The dictionary is needed by the first keystroke
+  input.addEventListener('focus', () => loadDictionary().catch(() => {}), { once: true });
+  form.hidden = false;
+})();
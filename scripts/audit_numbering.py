@@ -1,30 +1,26 @@
-import os
-import re
-import glob
+import sys
 
-def audit_numbering(lectures_dir):
-    print(f"Auditing HTML files in {lectures_dir}...\n")
+from heading_index import HEADING_INDEX_PATH, load_heading_index
+
+def audit_numbering(index_path=HEADING_INDEX_PATH):
+    print(f"Auditing headings in {index_path}...\n")
     
-    files = sorted(glob.glob(os.path.join(lectures_dir, "lecture-*.html")))
+    # The build records every heading, with its section number, in the heading index
+    try:
+        index = load_heading_index(index_path)
+    except FileNotFoundError:
+        print(f"{index_path} not found; run scripts/build.py first")
+        return
     
-    for file_path in files:
-        filename = os.path.basename(file_path)
-        # Extract lecture number from filename (e.g., lecture-05.html -> 5)
-        try:
-            lecture_num = int(re.search(r'lecture-(\d+)\.html', filename).group(1))
-        except:
-            print(f"Skipping {filename}: Could not parse lecture number.")
-            continue
+    for lecture in index['lectures']:
+        lecture_num = lecture['lecture']
+        filename = lecture['url'].rsplit('/', 1)[-1]
             
         print(f"--- Checking {filename} (Lecture {lecture_num}) ---")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Find all headings with numbers
-        # Regex looks for <h[2-4]> followed by a number pattern like 5.1, 5.1.2, etc.
-        # We capture the tag, the number, and the title
-        headings = re.findall(r'<(h[2-4])>(\s*(\d+(?:\.\d+)*)\s+.*?)</\1>', content, re.IGNORECASE)
+        # Numbered h2-h4 headings as (tag, title, number), like "5.1", "5.1.2"
+        headings = [(f"h{h['level']}", h['text'], h['number']) for h in lecture['headings']
+                    if h['number'] and 2 <= h['level'] <= 4]
         
         if not headings:
             print("  No numbered headings found.")
@@ -85,4 +81,4 @@ def audit_numbering(lectures_dir):
                         last_h4 = parts[3]
 
 if __name__ == "__main__":
-    audit_numbering(r"d:\Academics\Projects\isuru sir\CO224-Web\Lectures\html")
+    audit_numbering(*sys.argv[1:2])
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Compare the binary search index format with plain JSON.
+
+Reads the shards the build wrote to Lectures/search/, encodes the same index
+both as the binary files the build ships (search_format.py) and as naive JSON
+(the dictionary and each shard passed to json.dumps), and reports file sizes,
+raw and gzipped, and query latency for each.
+
+Latency is measured on a fixed set of queries through search_index.SearchIndex,
+with the shards already in memory as bytes, so it covers decoding and
+querying but not reading files. "cold" is a query against shards not yet
+decoded, "warm" the same query again. Each figure is the best of --repeat runs.
+
+Besides the current lectures, the benchmark runs on a synthetic corpus
+--scale times larger: copies of every lecture in which the terms found in
+only one lecture get a new spelling per copy, so the vocabulary grows along
+with the lectures instead of staying fixed. Run from the repository root
+after a build:
+
+    python scripts/bench_search_index.py [--scale 10] [--repeat 5]
+"""
+
+import argparse
+import bisect
+import gzip
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from search_format import decode_dictionary, decode_shard, encode_dictionary, encode_shard, read_postings
+from search_index import (
+    DICTIONARY_NAME,
+    INDEX_VERSION,
+    SEARCH_DIR,
+    SearchIndex,
+    build_dictionary,
+    lecture_vocabulary,
+)
+
+QUERIES = [
+    'write-back', 'TLB', 'hit rate', 'forwarding', 'pipeline haz', 'virtual memory',
+    'cache miss penalty', 'memory', 'instruction set architecture', 'regis',
+]
+
+
+class JsonTerms(dict):
+    """A JSON dictionary's terms with the prefix lookup SearchIndex expects."""
+
+    def __init__(self, terms):
+        super().__init__(terms)
+        self.sorted = sorted(terms)
+
+    def with_prefix(self, prefix, limit):
+        start = bisect.bisect_left(self.sorted, prefix)
+        end = bisect.bisect_left(self.sorted, prefix + '\uffff', start)
+        return self.sorted[start:min(end, start + limit)]
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def load_json_dictionary(data):
+    dictionary = json.loads(data)
+    dictionary['terms'] = JsonTerms(dictionary['terms'])
+    return dictionary
+
+
+def load_json_shard(data, dictionary):
+    return json.loads(data)
+
+
+def shards_dictionary(shards):
+    return build_dictionary([lecture_vocabulary(shard) for shard in shards])
+
+
+def read_shards(directory):
+    """The shards of a built index, with posting lists decoded to lists."""
+    dictionary = decode_dictionary((Path(directory) / DICTIONARY_NAME).read_bytes())
+    shards = []
+    for path in sorted(Path(directory).glob('lecture-*.bin')):
+        shard = decode_shard(path.read_bytes(), dictionary)
+        shard['sections'] = list(shard['sections'])
+        shard['postings'] = {term: read_postings(data) for term, data in shard['postings'].items()}
+        shards.append(shard)
+    return shards
+
+
+def synthetic_corpus(shards, scale):
+    """`scale` copies of `shards`; terms unique to one lecture are respelled in each copy."""
+    lectures_of = shards_dictionary(shards)['terms']
+    count = len(shards)
+    corpus = []
+    for copy in range(scale):
+        for shard in shards:
+            num = shard['lecture'] + copy * count
+            postings = {}
+            for term, values in shard['postings'].items():
+                # Tokens never contain "_", so respelled terms cannot collide with real ones
+                renamed = f'{term}_{copy}' if copy and len(lectures_of[term]) == 1 else term
+                postings[renamed] = values
+            corpus.append({'lecture': num, 'title': f"{shard['title']} ({copy + 1})",
+                           'url': shard['url'].replace(f"{shard['lecture']:02d}", f'{num:02d}'),
+                           'sections': shard['sections'], 'postings': postings})
+    return corpus
+
+
+def encode(shards, binary):
+    """(dictionary bytes, {lecture: shard bytes}) in one of the two formats."""
+    dictionary = shards_dictionary(shards)
+    if binary:
+        return encode_dictionary(dictionary), {s['lecture']: encode_shard(s, INDEX_VERSION) for s in shards}
+    return dump_json(dictionary), {s['lecture']: dump_json(s) for s in shards}
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(shards, binary, repeat):
+    dictionary_data, shard_data = encode(shards, binary)
+    load_dictionary = decode_dictionary if binary else load_json_dictionary
+    load_shard = decode_shard if binary else load_json_shard
+    packed = {num: len(gzip.compress(data, 9)) for num, data in shard_data.items()}
+    packed_dictionary = len(gzip.compress(dictionary_data, 9))
+
+    dictionary = load_dictionary(dictionary_data)
+    cold = []
+    warm = []
+    fetched = []
+    for query in QUERIES:
+        def run_cold():
+            SearchIndex(dictionary, lambda num: load_shard(shard_data[num], dictionary)).query(query)
+        cold.append(best_of(repeat, run_cold))
+        index = SearchIndex(dictionary, lambda num: load_shard(shard_data[num], dictionary))
+        index.query(query)
+        warm.append(best_of(repeat, lambda: index.query(query)))
+        fetched.append(packed_dictionary + sum(packed[num] for num in index.shards))
+    return {
+        'raw': len(dictionary_data) + sum(len(data) for data in shard_data.values()),
+        'gzipped': packed_dictionary + sum(packed.values()),
+        'dictionary': packed_dictionary,
+        'load': best_of(repeat, lambda: load_dictionary(dictionary_data)),
+        'cold': statistics.median(cold),
+        'cold_max': max(cold),
+        'warm': statistics.median(warm),
+        'fetched': statistics.median(fetched),
+    }
+
+
+def report(name, shards, repeat):
+    terms = len(shards_dictionary(shards)['terms'])
+    entries = sum(len(postings) // 2 for shard in shards for postings in shard['postings'].values())
+    print(f"{name}: {len(shards)} lecture(s), {terms:,} terms, {entries:,} section entries")
+    results = [measure(shards, False, repeat), measure(shards, True, repeat)]
+    rows = [
+        ('index size, raw', 'raw', '{:,} B'),
+        ('index size, gzipped', 'gzipped', '{:,} B'),
+        ('dictionary, gzipped', 'dictionary', '{:,} B'),
+        ('decode dictionary', 'load', '{:.2f} ms'),
+        ('query, cold (median)', 'cold', '{:.2f} ms'),
+        ('query, cold (slowest)', 'cold_max', '{:.2f} ms'),
+        ('query, warm (median)', 'warm', '{:.2f} ms'),
+        ('fetched per query, gzipped', 'fetched', '{:,.0f} B'),
+    ]
+    print(f"  {'':28}{'JSON':>14}{'binary':>14}{'change':>9}")
+    for label, key, fmt in rows:
+        json_value, binary_value = results[0][key], results[1][key]
+        scale = 1000 if fmt.endswith('ms') else 1
+        change = f'{(binary_value / json_value - 1) * 100:+.0f}%' if json_value else ''
+        print(f"  {label:28}{fmt.format(json_value * scale):>14}{fmt.format(binary_value * scale):>14}{change:>9}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the binary search index with plain JSON.')
+    parser.add_argument('--scale', type=int, default=10, help='size of the synthetic corpus (default: 10x)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement (default: 5)')
+    parser.add_argument('--dir', default=str(SEARCH_DIR), help=f'index directory (default: {SEARCH_DIR})')
+    args = parser.parse_args(argv)
+
+    if not (Path(args.dir) / DICTIONARY_NAME).is_file():
+        print(f"{Path(args.dir) / DICTIONARY_NAME} not found; run scripts/build.py first")
+        return 1
+    shards = read_shards(args.dir)
+    report('Current lectures', shards, args.repeat)
+    if args.scale > 1:
+        report(f'Synthetic corpus ({args.scale}x)', synthetic_corpus(shards, args.scale), args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
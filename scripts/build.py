@@ -0,0 +1,754 @@
+#!/usr/bin/env python3
+"""
+One-command build for the lecture site.
+
+Every lecture runs through a declared stage graph entirely in memory, and
+each output file is written exactly once at the end:
+
+    parse ─┬─> html ─> libraries ─> video-links ─> strong-tags ─> fingerprint ─> critical-css ─> minify ─> Lectures/html/lecture-NN.html
+           ├─> search ────────────────────────────────────────────────────────────────────────────────> Lectures/search/lecture-NN.bin, vocabulary/lecture-NN.json
+           ├─> outline ───────────────────────────────────────────────────────────────────────────────> Lectures/headings/lecture-NN.json
+           ├─> glossary ──────────────────────────────────────────────────────────────────────────────> Lectures/glossary/lecture-NN.json
+           └─> tex ─> tex-fixups ──────────────────────────────────────────────────────────────────────> Lectures/latex/lecture-NN.tex
+
+Site-level stages (index.html video buttons and asset URLs, the purged
+stylesheet every page links to, the hint for the next lecture's first image,
+the service worker's precache manifest, the search dictionary, the
+site-wide heading index and the glossary) run once per build. Run from the
+repository root:
+
+    python scripts/build.py [--latex] [--jobs N] [--force] [--explain] [--watch]
+
+With --watch the process stays alive, keeps sources and parsed trees in
+memory, and rebuilds only the outputs whose inputs changed after each save.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import convert_lectures
+from build_manifest import BuildManifest, hash_bytes
+from critical_css import critical_css, defer_stylesheets, parse_stylesheet
+from fingerprint_assets import AssetManifest, rewrite_asset_urls
+from fix_all_strong_tags import fix_strong_tags_html
+from fix_flow_diagrams import fix_flow_diagrams
+from fix_itemize import fix_itemize_formatting
+from fix_spacing import fix_spacing
+from glossary import (
+    GLOSSARY_DIR,
+    GLOSSARY_INDEX_PATH,
+    GLOSSARY_PAGE_PATH,
+    GLOSSARY_VERSION,
+    TEMPLATE_PATH as GLOSSARY_TEMPLATE_PATH,
+    build_glossary,
+    collect_terms,
+    dump_glossary,
+    glossary_keys,
+    lecture_glossary,
+    mark_terms,
+    render_glossary_page,
+)
+from heading_index import HEADING_INDEX_PATH, HEADINGS_DIR, build_heading_index, dump_outline, lecture_outline
+from image_pipeline import ImageCatalog
+from lecture_parser import parse_markdown
+from md_to_latex_converter import MarkdownToLatexConverter
+from minify_html import minify_html
+from file_watcher import PollingWatcher
+from parallel_jobs import add_jobs_argument, resolve_jobs, run_in_order
+from precompress import find_assets, precompress, remove_orphans
+from prefetch_hints import first_image, next_page_href, relative_url, set_image_prefetch
+from purge_css import PURGED_KEY, purge_css
+from search_format import encode_dictionary, encode_shard
+from search_index import (
+    DICTIONARY_NAME,
+    INDEX_VERSION as SEARCH_INDEX_VERSION,
+    SEARCH_DIR,
+    VOCABULARY_DIR,
+    build_dictionary,
+    dump_vocabulary,
+    lecture_shard,
+    lecture_vocabulary,
+)
+from service_worker import (
+    SERVICE_WORKER_PATH,
+    TEMPLATE_PATH as SERVICE_WORKER_TEMPLATE_PATH,
+    changed_entries,
+    precache_manifest,
+    read_manifest,
+    render_service_worker,
+)
+from standardize_libraries import STANDARD_LIBRARIES, standardize_html
+from update_video_links_complete import (
+    apply_index_video_links,
+    apply_lecture_video_links,
+    resolve_video_ids,
+)
+
+MARKDOWN_DIR = Path('Lectures/markdown')
+IMAGE_DIR = Path('Lectures/img')
+STYLESHEET_PATH = Path('assets/css/style.css')
+SCRIPT_DIR = Path('assets/js')
+HTML_DIR = Path('Lectures/html')
+LATEX_DIR = Path('Lectures/latex')
+INDEX_PATH = Path('index.html')
+
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+class Stage:
+    """A named build step that reads and writes entries of an artifact dict."""
+
+    def __init__(self, name, func, requires=(), scope='lecture', group='html', version='1'):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.scope = scope
+        self.group = group
+        self.version = version
+
+
+def parse_stage(lecture, artifacts):
+    # Watch mode seeds the tree from its warm cache when the source is unchanged
+    if artifacts.get('doc') is None:
+        artifacts['doc'] = parse_markdown(artifacts['markdown'])
+
+
+def html_stage(lecture, artifacts):
+    # Marks the defining occurrences of terms for the renderer; shared with glossary_stage
+    collect_terms(artifacts['doc'])
+    content = convert_lectures.HtmlRenderer(images=lecture.get('images')).render(artifacts['doc'])
+    artifacts['html'] = convert_lectures.create_lecture_html(
+        lecture['lecture_num'], lecture['title'], content,
+        lecture['prev_num'], lecture['next_num'],
+        lecture['prev_title'], lecture['next_title'], lecture['template'],
+        toc=convert_lectures.render_toc(artifacts['doc'].attrs['outline']))
+
+
+def libraries_stage(lecture, artifacts):
+    standardized = standardize_html(artifacts['html'])
+    if standardized is None:
+        raise ValueError('page template has no </head> tag')
+    artifacts['html'] = standardized
+
+
+def video_links_stage(lecture, artifacts):
+    video_id = lecture.get('video_id')
+    if video_id and 'YOUR_VIDEO_ID_HERE' not in video_id:
+        artifacts['html'] = apply_lecture_video_links(
+            artifacts['html'], f"{lecture['lecture_num']:02d}", video_id)
+
+
+def strong_tags_stage(lecture, artifacts):
+    artifacts['html'] = fix_strong_tags_html(artifacts['html'])
+
+
+def fingerprint_stage(lecture, artifacts):
+    artifacts['html'] = rewrite_asset_urls(artifacts['html'], HTML_DIR.as_posix(), lecture['assets'])
+
+
+def critical_css_stage(lecture, artifacts):
+    css = critical_css(lecture['stylesheet_rules'], artifacts['html'])
+    artifacts['html'] = defer_stylesheets(artifacts['html'], css)
+    artifacts['stats']['critical-css'] = len(css.encode('utf-8'))
+
+
+def minify_stage(lecture, artifacts):
+    before = len(artifacts['html'].encode('utf-8'))
+    artifacts['html'] = minify_html(artifacts['html'])
+    artifacts['stats']['minify'] = (before, len(artifacts['html'].encode('utf-8')))
+
+
+def search_stage(lecture, artifacts):
+    url = f"../{HTML_DIR.name}/lecture-{lecture['lecture_num']:02d}.html"
+    shard = lecture_shard(artifacts['doc'], lecture['lecture_num'], lecture['title'], url)
+    artifacts['search'] = encode_shard(shard, SEARCH_INDEX_VERSION)
+    artifacts['vocabulary'] = dump_vocabulary(lecture_vocabulary(shard))
+
+
+def outline_stage(lecture, artifacts):
+    url = f"../{HTML_DIR.name}/lecture-{lecture['lecture_num']:02d}.html"
+    outline = lecture_outline(artifacts['doc'], lecture['lecture_num'], lecture['title'], url)
+    artifacts['outline'] = dump_outline(outline)
+
+
+def glossary_stage(lecture, artifacts):
+    url = f"../{HTML_DIR.name}/lecture-{lecture['lecture_num']:02d}.html"
+    glossary = lecture_glossary(artifacts['doc'], lecture['lecture_num'], lecture['title'], url)
+    artifacts['glossary'] = dump_glossary(glossary)
+
+
+def tex_stage(lecture, artifacts):
+    artifacts['tex'] = MarkdownToLatexConverter().render(artifacts['doc'])
+
+
+def tex_fixups_stage(lecture, artifacts):
+    tex = fix_flow_diagrams(artifacts['tex'])
+    tex = fix_itemize_formatting(tex)
+    artifacts['tex'] = fix_spacing(tex)
+
+
+def read_index(outputs):
+    """index.html as updated by earlier site stages in this build."""
+    content = outputs.get(INDEX_PATH)
+    if content is None:
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+            content = f.read()
+    return content
+
+
+def index_video_links_stage(site, outputs):
+    updated, changed = apply_index_video_links(read_index(outputs), site['video_ids'])
+    if changed:
+        outputs[INDEX_PATH] = updated
+
+
+def index_fingerprint_stage(site, outputs):
+    content = read_index(outputs)
+    updated = rewrite_asset_urls(content, '.', site['assets'], site['previous_assets'])
+    if updated != content:
+        outputs[INDEX_PATH] = updated
+
+
+def read_pages(site, outputs):
+    """index.html and every lecture page, as built so far or as on disk when not rebuilt."""
+    pages = {INDEX_PATH: read_index(outputs)}
+    for path in site['pages']:
+        content = outputs.get(path)
+        if content is None and path.is_file():
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        if content is not None:
+            pages[path] = content
+    return pages
+
+
+def purge_css_stage(site, outputs):
+    pages = read_pages(site, outputs)
+    pruned, removed = purge_css(site['stylesheet'], pages.values())
+    copy, changed = site['asset_manifest'].add_derived(PURGED_KEY, pruned)
+    if changed:
+        outputs[Path(copy)] = pruned
+        site['purged'] = (len(removed), len(site['stylesheet'].encode('utf-8')), len(pruned.encode('utf-8')))
+
+    # Every fingerprinted copy of the stylesheet, full or purged, now resolves to the purged one
+    assets = dict(site['assets'], **{STYLESHEET_PATH.as_posix(): copy, PURGED_KEY: copy})
+    previous = dict(site['previous_assets'])
+    previous.update({old: source for source, old in site['assets'].items()})
+    for path, content in pages.items():
+        updated = rewrite_asset_urls(content, path.parent.as_posix(), assets, previous)
+        if updated != content:
+            outputs[path] = updated
+
+
+def prefetch_images_stage(site, outputs):
+    pages = read_pages(site, outputs)
+    for path in site['pages']:
+        if path not in pages:
+            continue
+        page_dir = path.parent.as_posix()
+        href = next_page_href(pages[path])
+        next_path = path.parent / href if href else None
+        image = first_image(pages[next_path]) if next_path in pages else None
+        url = mime_type = None
+        if image is not None:
+            url, mime_type = image
+            url = relative_url(url, next_path.parent.as_posix(), page_dir)
+        updated = set_image_prefetch(pages[path], url, mime_type)
+        if updated != pages[path]:
+            outputs[path] = updated
+
+
+def search_dictionary_stage(site, outputs):
+    vocabularies = []
+    for path in site['vocabularies']:
+        content = outputs.get(path)
+        if content is None and path.is_file():
+            content = path.read_text(encoding='utf-8')
+        if content is not None:
+            vocabularies.append(json.loads(content))
+    dictionary = encode_dictionary(build_dictionary(vocabularies))
+    path = SEARCH_DIR / DICTIONARY_NAME
+    if not path.is_file() or path.read_bytes() != dictionary:
+        outputs[path] = dictionary
+
+
+def heading_index_stage(site, outputs):
+    outlines = []
+    for path in site['outlines']:
+        content = outputs.get(path)
+        if content is None and path.is_file():
+            content = path.read_text(encoding='utf-8')
+        if content is not None:
+            outlines.append(json.loads(content))
+    index = dump_outline(build_heading_index(outlines))
+    previous = HEADING_INDEX_PATH.read_text(encoding='utf-8') if HEADING_INDEX_PATH.is_file() else None
+    if index != previous:
+        outputs[HEADING_INDEX_PATH] = index
+
+
+def glossary_index_stage(site, outputs):
+    lectures = []
+    for path in site['glossaries']:
+        content = outputs.get(path)
+        if content is None and path.is_file():
+            content = path.read_text(encoding='utf-8')
+        if content is not None:
+            lectures.append(json.loads(content))
+    glossary = build_glossary(lectures)
+    site['glossary_keys'] = glossary_keys(glossary)
+    index = dump_glossary(glossary)
+    previous = GLOSSARY_INDEX_PATH.read_text(encoding='utf-8') if GLOSSARY_INDEX_PATH.is_file() else None
+    if index != previous:
+        outputs[GLOSSARY_INDEX_PATH] = index
+
+    with open(GLOSSARY_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        page = render_glossary_page(glossary, f.read())
+    # Linked to the purged stylesheet of the last build; purge-css updates it if that changes
+    assets = dict(site['assets'])
+    purged = site['asset_manifest'].derived.get(PURGED_KEY)
+    if purged:
+        assets[STYLESHEET_PATH.as_posix()] = purged
+    page = minify_html(rewrite_asset_urls(page, HTML_DIR.as_posix(), assets))
+    previous = GLOSSARY_PAGE_PATH.read_text(encoding='utf-8') if GLOSSARY_PAGE_PATH.is_file() else None
+    if page != previous:
+        outputs[GLOSSARY_PAGE_PATH] = page
+
+
+def glossary_terms_stage(site, outputs):
+    # Mentions are marked against the merged glossary, so pages not rebuilt follow it too
+    pages = read_pages(site, outputs)
+    for path in site['pages']:
+        if path not in pages or path == GLOSSARY_PAGE_PATH:
+            continue
+        updated = mark_terms(pages[path], site['glossary_keys'])
+        if updated != pages[path]:
+            outputs[path] = updated
+
+
+def service_worker_stage(site, outputs):
+    # Copies written by this build, such as a new purged stylesheet, are only in `outputs` so far
+    manifest = precache_manifest(read_pages(site, outputs), outputs)
+    with open(SERVICE_WORKER_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        service_worker = render_service_worker(manifest, f.read())
+    previous = SERVICE_WORKER_PATH.read_text(encoding='utf-8') if SERVICE_WORKER_PATH.is_file() else None
+    if service_worker != previous:
+        outputs[SERVICE_WORKER_PATH] = service_worker
+        site['precache'] = (len(manifest), changed_entries(read_manifest(previous), manifest))
+
+
+STAGES = [
+    Stage('parse', parse_stage, group='shared'),
+    Stage('html', html_stage, requires=['parse']),
+    Stage('libraries', libraries_stage, requires=['html']),
+    Stage('video-links', video_links_stage, requires=['libraries']),
+    Stage('strong-tags', strong_tags_stage, requires=['video-links']),
+    Stage('fingerprint', fingerprint_stage, requires=['strong-tags']),
+    Stage('critical-css', critical_css_stage, requires=['fingerprint']),
+    Stage('minify', minify_stage, requires=['critical-css']),
+    Stage('search', search_stage, requires=['parse'], group='search'),
+    Stage('outline', outline_stage, requires=['parse'], group='outline'),
+    Stage('glossary', glossary_stage, requires=['parse'], group='glossary'),
+    Stage('tex', tex_stage, requires=['parse'], group='latex'),
+    Stage('tex-fixups', tex_fixups_stage, requires=['tex'], group='latex'),
+    Stage('index-video-links', index_video_links_stage, scope='site'),
+    Stage('index-fingerprint', index_fingerprint_stage, requires=['index-video-links'], scope='site'),
+    Stage('glossary-index', glossary_index_stage, scope='site', group='glossary'),
+    Stage('glossary-terms', glossary_terms_stage, requires=['glossary-index'], scope='site', group='glossary'),
+    Stage('purge-css', purge_css_stage, requires=['index-fingerprint', 'glossary-terms'], scope='site'),
+    Stage('prefetch-images', prefetch_images_stage, requires=['purge-css'], scope='site'),
+    Stage('service-worker', service_worker_stage, requires=['prefetch-images'], scope='site'),
+    Stage('search-dictionary', search_dictionary_stage, scope='site', group='search'),
+    Stage('heading-index', heading_index_stage, scope='site', group='outline'),
+]
+
+# Artifacts that become files: the stage group producing them and where they go
+OUTPUTS = {
+    'html': ('html', HTML_DIR, 'lecture-{num:02d}.html'),
+    'search': ('search', SEARCH_DIR, 'lecture-{num:02d}.bin'),
+    'vocabulary': ('search', VOCABULARY_DIR, 'lecture-{num:02d}.json'),
+    'outline': ('outline', HEADINGS_DIR, 'lecture-{num:02d}.json'),
+    'glossary': ('glossary', GLOSSARY_DIR, 'lecture-{num:02d}.json'),
+    'tex': ('latex', LATEX_DIR, 'lecture-{num:02d}.tex'),
+}
+
+
+def stage_order(stages, groups):
+    """Topologically sort the stages of the enabled groups."""
+    enabled = {stage.name: stage for stage in stages if stage.group in groups}
+    ordered = []
+    visiting = set()
+    done = set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f'Stage graph has a cycle at {stage.name}')
+        visiting.add(stage.name)
+        for name in stage.requires:
+            if name not in enabled:
+                raise ValueError(f'Stage {stage.name} requires disabled stage {name}')
+            visit(enabled[name])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in enabled.values():
+        visit(stage)
+    return ordered
+
+
+def pipeline_signature(stages, group):
+    """Identify the stages producing one output so that changing them invalidates earlier builds."""
+    parts = [f'{s.name}@{s.version}' for s in stages
+             if s.scope == 'lecture' and s.group in ('shared', group)]
+    return hash_bytes(';'.join(parts))[:16]
+
+
+def run_lecture_pipeline(task):
+    """Run every lecture-scope stage for one lecture (runs in a worker)."""
+    lecture, stage_names = task
+    stages = {stage.name: stage for stage in STAGES}
+    artifacts = {'markdown': lecture['markdown'], 'doc': lecture.get('doc'), 'stats': {}}
+    timings = {}
+    for name in stage_names:
+        start = time.perf_counter()
+        stages[name].func(lecture, artifacts)
+        timings[name] = time.perf_counter() - start
+    outputs = {key: artifacts[key] for key in OUTPUTS if key in artifacts}
+    # Trees are only handed back in-process; pickling them from workers costs more than a re-parse
+    doc = artifacts['doc'] if lecture.get('keep_doc') else None
+    return outputs, timings, doc, artifacts['stats']
+
+
+class SourceCache:
+    """Keeps file contents and hashes in memory until the file's stat changes."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def read(self, path):
+        """Return (bytes, sha256) for a file, re-reading only when it changed."""
+        path = Path(path)
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.entries.get(path)
+        if cached is None or cached[0] != stamp:
+            with open(path, 'rb') as f:
+                data = f.read()
+            cached = (stamp, data, hash_bytes(data))
+            self.entries[path] = cached
+        return cached[1], cached[2]
+
+
+# =============================================================================
+# BUILD
+# =============================================================================
+
+class SiteBuilder:
+    """Plans, runs and writes one build of the lecture site."""
+
+    def __init__(self, latex=False, jobs=1, explain=False):
+        self.groups = {'shared', 'html', 'search', 'outline', 'glossary'} | ({'latex'} if latex else set())
+        self.stages = stage_order(STAGES, self.groups)
+        self.jobs = jobs
+        self.explain = explain
+        self.timings = {}
+        self.compressed = []
+        self.manifests = None
+        # Warm state reused between rebuilds in watch mode
+        self.sources = SourceCache()
+        self.docs = {}
+        self.images = ImageCatalog().load()
+        self.assets = AssetManifest().load()
+        self.stylesheet_hash = None
+        self.stylesheet_rules = []
+
+    def output_path(self, key, lecture_num):
+        _, directory, pattern = OUTPUTS[key]
+        return directory / pattern.format(num=lecture_num)
+
+    def lectures(self, refresh=True):
+        """
+        Read every lecture source and attach what the stages need to run it.
+
+        With refresh=False the image catalog and asset manifest are used as
+        last saved by a build: no variants are encoded, nothing is copied to
+        assets/dist and nothing is written, as the preview server requires.
+        """
+        template_bytes, self.template_hash = self.sources.read(convert_lectures.TEMPLATE_PATH)
+        template = template_bytes.decode('utf-8')
+        video_ids = resolve_video_ids()
+        self.site = {'video_ids': video_ids}
+
+        start = time.perf_counter()
+        images = self.images.refresh(self.jobs) if refresh else self.images.images
+        self.images_signature = self.images.signature()
+        self.timings['images'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assets = self.assets.refresh() if refresh else self.assets.assets
+        self.site.update(assets=assets, previous_assets=self.assets.previous, asset_manifest=self.assets)
+        self.timings['fingerprint-assets'] = time.perf_counter() - start
+
+        stylesheet, stylesheet_hash = self.sources.read(STYLESHEET_PATH)
+        if stylesheet_hash != self.stylesheet_hash:
+            self.stylesheet_rules = parse_stylesheet(stylesheet.decode('utf-8'))
+            self.stylesheet_hash = stylesheet_hash
+        self.site['stylesheet'] = stylesheet.decode('utf-8')
+
+        lecture_files = convert_lectures.find_lecture_files()
+        lectures = convert_lectures.plan_lecture_pages(lecture_files, template)
+        for lecture in lectures:
+            source, source_hash = self.sources.read(lecture['source'])
+            lecture['markdown'] = source.decode('utf-8')
+            lecture['video_id'] = video_ids.get(f"{lecture['lecture_num']:02d}", '')
+            lecture['source_hash'] = source_hash
+            lecture['images'] = images
+            lecture['assets'] = assets
+            lecture['stylesheet_rules'] = self.stylesheet_rules
+        return lectures
+
+    def output_inputs(self, key, lecture):
+        """Everything one output of a lecture depends on, as recorded in the manifest."""
+        signature = pipeline_signature(self.stages, OUTPUTS[key][0])
+        if key == 'html':
+            inputs = convert_lectures.build_inputs(
+                lecture['source_hash'], self.template_hash, lecture['lecture_num'],
+                lecture['prev_title'], lecture['next_title'])
+            inputs.update(pipeline=signature, libraries=hash_bytes(STANDARD_LIBRARIES)[:16],
+                          video=lecture['video_id'], images=self.images_signature,
+                          assets=self.assets.signature(), stylesheet=self.stylesheet_hash[:16],
+                          glossary=GLOSSARY_VERSION)
+            return inputs
+        inputs = {
+            'source': lecture['source_hash'],
+            'converter': convert_lectures.CONVERTER_VERSION,
+            'pipeline': signature,
+        }
+        if key in ('search', 'vocabulary'):
+            inputs['search'] = SEARCH_INDEX_VERSION
+        if key in ('outline', 'glossary'):
+            # Entries carry the lecture's number and title, which come from the file name
+            inputs['title'] = lecture['title']
+        if key == 'glossary':
+            inputs['glossary'] = GLOSSARY_VERSION
+        return inputs
+
+    def plan(self, force=False):
+        """Read sources and decide which lectures need to run through the pipeline."""
+        if self.manifests is None:
+            self.manifests = {key: BuildManifest(OUTPUTS[key][1] / convert_lectures.MANIFEST_NAME).load()
+                              for key in self.output_keys()}
+        self.expected = {key: set() for key in self.output_keys()}
+
+        stale = []
+        live_hashes = set()
+        for lecture in self.lectures():
+            num = lecture['lecture_num']
+            live_hashes.add(lecture['source_hash'])
+
+            lecture['outputs'] = {}
+            for key in self.output_keys():
+                path = self.output_path(key, num)
+                self.expected[key].add(path.name)
+                inputs = self.output_inputs(key, lecture)
+                reasons = ['forced'] if force else self.manifests[key].rebuild_reasons(path, inputs)
+                if reasons:
+                    lecture['outputs'][key] = (path, inputs)
+                    if self.explain:
+                        print(f"Rebuilding {path}: {', '.join(reasons)}")
+            if lecture['outputs']:
+                stale.append(lecture)
+
+        # Drop trees of sources that no longer exist in this form
+        for source_hash in list(self.docs):
+            if source_hash not in live_hashes:
+                del self.docs[source_hash]
+        return stale
+
+    def stages_for(self, lecture):
+        """Names of the lecture stages needed to produce a lecture's stale outputs."""
+        groups = {'shared'} | {OUTPUTS[key][0] for key in lecture['outputs']}
+        return [stage.name for stage in self.stages
+                if stage.scope == 'lecture' and stage.group in groups]
+
+    def render_page(self, lecture):
+        """Run a lecture's HTML stages in memory, without writing or recording anything."""
+        lecture = dict(lecture, doc=self.docs.get(lecture['source_hash']), keep_doc=True)
+        stage_names = [stage.name for stage in self.stages
+                       if stage.scope == 'lecture' and stage.group in ('shared', 'html')]
+        outputs, timings, doc, _ = run_lecture_pipeline((lecture, stage_names))
+        self.docs[lecture['source_hash']] = doc
+        html = outputs['html']
+        if GLOSSARY_INDEX_PATH.is_file():
+            # Mentions are linked to the glossary of the last build, as glossary-terms would
+            index, _ = self.sources.read(GLOSSARY_INDEX_PATH)
+            html = mark_terms(html, glossary_keys(json.loads(index)))
+        return html, timings
+
+    def output_keys(self):
+        return [key for key, (group, _, _) in OUTPUTS.items() if group in self.groups]
+
+    def run(self, force=False):
+        """Build everything that is out of date; returns the number of files written."""
+        build_start = time.perf_counter()
+        self.timings = {}
+        stale = self.plan(force)
+        self.site['pages'] = [HTML_DIR / name for name in sorted(self.expected['html'])] + [GLOSSARY_PAGE_PATH]
+        self.site['vocabularies'] = [VOCABULARY_DIR / name for name in sorted(self.expected['vocabulary'])]
+        self.site['outlines'] = [HEADINGS_DIR / name for name in sorted(self.expected['outline'])]
+        self.site['glossaries'] = [GLOSSARY_DIR / name for name in sorted(self.expected['glossary'])]
+        pending = {}
+        failed = 0
+        in_process = resolve_jobs(self.jobs) <= 1 or len(stale) <= 1
+        if in_process:
+            for lecture in stale:
+                lecture['doc'] = self.docs.get(lecture['source_hash'])
+                lecture['keep_doc'] = True
+        tasks = [(lecture, self.stages_for(lecture)) for lecture in stale]
+        jobs = 1 if in_process else self.jobs
+        for (lecture, _), result, error in run_in_order(run_lecture_pipeline, tasks, jobs):
+            name = Path(lecture['source']).name
+            if error is not None:
+                failed += 1
+                print(f"Failed: {name}: {error}")
+                continue
+            artifacts, timings, doc, stats = result
+            if doc is not None:
+                self.docs[lecture['source_hash']] = doc
+            for stage_name, seconds in timings.items():
+                self.timings[stage_name] = self.timings.get(stage_name, 0.0) + seconds
+            for key, (path, inputs) in lecture['outputs'].items():
+                pending[path] = artifacts[key]
+                self.manifests[key].record(path, inputs)
+            if 'minify' in stats:
+                before, after = stats['minify']
+                print(f"Built: {name} (minified {before:,} -> {after:,} bytes, -{before - after:,}; "
+                      f"{stats['critical-css']:,} bytes of critical CSS inlined)")
+            else:
+                print(f"Built: {name}")
+
+        for stage in self.stages:
+            if stage.scope == 'site':
+                start = time.perf_counter()
+                stage.func(self.site, pending)
+                self.timings[stage.name] = time.perf_counter() - start
+        if 'purged' in self.site:
+            removed, before, after = self.site['purged']
+            print(f"Purged {STYLESHEET_PATH}: {removed} unused selector(s) removed, "
+                  f"{before:,} -> {after:,} bytes (-{before - after:,})")
+        if 'precache' in self.site:
+            entries, changed = self.site['precache']
+            print(f"Updated {SERVICE_WORKER_PATH}: {len(changed)} of {entries} precached entries changed")
+            if self.explain:
+                for url in changed:
+                    print(f"   • {url}")
+
+        # Every output is written exactly once, after all stages have run
+        start = time.perf_counter()
+        for path, content in pending.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, bytes):
+                path.write_bytes(content)
+                continue
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        for key, manifest in self.manifests.items():
+            manifest.prune(self.expected[key])
+            manifest.save()
+        self.assets.remove_stale()
+        self.assets.save()
+        self.timings['write'] = time.perf_counter() - start
+
+        # .gz/.br siblings of every served asset; unchanged files cost one stat each
+        start = time.perf_counter()
+        self.compressed = precompress(find_assets())
+        remove_orphans()
+        self.timings['compress'] = time.perf_counter() - start
+        self.timings['total'] = time.perf_counter() - build_start
+
+        if failed:
+            print(f"\n{failed} lecture(s) failed to build")
+        return len(pending), failed
+
+    def print_compression(self):
+        if not self.compressed:
+            return
+        original = sum(entry[2] for entry in self.compressed)
+        compressed = sum(entry[3] for entry in self.compressed)
+        print(f"\nPrecompressed {len(self.compressed)} file(s): {original:,} -> {compressed:,} bytes")
+
+    def print_timings(self):
+        print("\nStage timings:")
+        for name, seconds in self.timings.items():
+            print(f"  {name:<20} {seconds * 1000:8.1f} ms")
+
+
+def watch(builder, interval):
+    """Rebuild affected outputs whenever a watched input changes."""
+    watched = [MARKDOWN_DIR, IMAGE_DIR, STYLESHEET_PATH, SCRIPT_DIR, convert_lectures.TEMPLATE_PATH,
+               SERVICE_WORKER_TEMPLATE_PATH, GLOSSARY_TEMPLATE_PATH]
+    watcher = PollingWatcher(watched)
+    print("\nWatching for changes in:")
+    for path in watched:
+        print(f"   • {path}")
+    print("\n💡 Press Ctrl+C to stop\n")
+
+    try:
+        while True:
+            changed = watcher.wait(interval)
+            names = ', '.join(sorted(p.name for p in changed))
+            written, failed = builder.run()
+            total = builder.timings.get('total', 0.0) * 1000
+            if written:
+                print(f"Changed {names}: rebuilt {written} file(s) in {total:.1f} ms")
+            elif not failed:
+                print(f"Changed {names}: nothing to rebuild ({total:.1f} ms)")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build the lecture site in one in-memory pass.')
+    parser.add_argument('--latex', action='store_true',
+                        help='also build Lectures/latex/lecture-NN.tex')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every output even if its inputs are unchanged')
+    parser.add_argument('--explain', action='store_true',
+                        help='print why each output was rebuilt')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and rebuild affected outputs when inputs change')
+    parser.add_argument('--interval', type=float, default=0.1, metavar='SECONDS',
+                        help='how often --watch polls for changes (default: 0.1)')
+    add_jobs_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    builder = SiteBuilder(latex=args.latex, jobs=args.jobs, explain=args.explain)
+    print("Stages: " + ' -> '.join(stage.name for stage in builder.stages))
+
+    written, failed = builder.run(force=args.force)
+    if written:
+        print(f"\nWrote {written} file(s)")
+    elif not failed:
+        print("\nEverything is up to date.")
+    builder.print_compression()
+    builder.print_timings()
+
+    if args.watch:
+        # Incremental rebuilds are small; stay in-process so parsed trees stay warm
+        builder.jobs = 1
+        watch(builder, args.interval)
+    elif failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
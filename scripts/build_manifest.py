@@ -0,0 +1,101 @@
+"""
+Content-hash build manifest for generated lecture files.
+
+Records, for every output file, the hashes of the inputs it was built from.
+A later build compares the current inputs against the recorded ones and only
+regenerates outputs whose inputs changed.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    """Return the hex SHA-256 digest of a bytes or str value."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """Return the hex SHA-256 digest of a file's contents."""
+    with open(path, 'rb') as f:
+        return hash_bytes(f.read())
+
+
+# Human-readable names used by --explain
+INPUT_DESCRIPTIONS = {
+    'source': 'markdown source changed',
+    'template': 'page template changed',
+    'converter': 'converter version changed',
+    'lecture': 'lecture number changed',
+    'prev': 'previous lecture link changed',
+    'next': 'next lecture link changed',
+    'images': 'image variants changed',
+    'assets': 'fingerprinted assets changed',
+    'stylesheet': 'stylesheet changed',
+    'search': 'search index format changed',
+    'title': 'lecture title changed',
+    'glossary': 'glossary term detection changed',
+}
+
+
+class BuildManifest:
+    """Persistent map of output file name -> recorded input hashes."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+
+    def load(self):
+        """Load the manifest from disk; a missing or stale file starts empty."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == MANIFEST_VERSION:
+            self.entries = data.get('outputs', {})
+        return self
+
+    def save(self):
+        """Write the manifest back to disk if anything was recorded."""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'outputs': self.entries}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.dirty = False
+
+    def rebuild_reasons(self, output_path, inputs):
+        """Return why `output_path` must be rebuilt; an empty list means up to date."""
+        output_path = Path(output_path)
+        recorded = self.entries.get(output_path.name)
+        if recorded is None:
+            return ['no previous build recorded']
+        if not output_path.exists():
+            return ['output file missing']
+        reasons = []
+        for key in sorted(set(inputs) | set(recorded)):
+            if recorded.get(key) != inputs.get(key):
+                reasons.append(INPUT_DESCRIPTIONS.get(key, f'{key} changed'))
+        return reasons
+
+    def record(self, output_path, inputs):
+        """Remember the inputs an output was just built from."""
+        name = Path(output_path).name
+        if self.entries.get(name) != inputs:
+            self.entries[name] = dict(inputs)
+            self.dirty = True
+
+    def prune(self, keep_names):
+        """Forget outputs that are no longer produced."""
+        for name in list(self.entries):
+            if name not in keep_names:
+                del self.entries[name]
+                self.dirty = True
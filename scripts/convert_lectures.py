@@ -1,70 +1,265 @@
-import os
+import argparse
+import html
 import re
 from pathlib import Path
+from urllib.parse import unquote
+
+from highlight import canonical_language, highlight
+from image_pipeline import VARIANT_FORMATS
+from lecture_parser import parse_markdown
+from parallel_jobs import add_jobs_argument
+from tex_math import to_mathml
+
+LECTURES_DIR = Path('Lectures/markdown')
+OUTPUT_DIR = Path('Lectures/html')
+TEMPLATE_PATH = Path(__file__).resolve().parent / 'templates' / 'lecture.html'
+MANIFEST_NAME = '.build-manifest.json'
+
+# Bump whenever a change to the renderer alters the generated HTML
+CONVERTER_VERSION = '11'
+
+# Image URLs as seen from Lectures/html
+IMAGE_URL = '../img/'
+VARIANT_URL = '../img-variants/'
+# Widest an image is displayed in the lecture content column, in CSS pixels
+CONTENT_WIDTH = 740
+# Deepest heading level listed in a page's table of contents
+TOC_MAX_LEVEL = 3
+
+
+def escape_html(text):
+    """Escape text for use in HTML element content."""
+    return html.escape(text, quote=False)
+
+
+def escape_attr(text):
+    """Escape text for use in a double-quoted HTML attribute."""
+    return html.escape(text, quote=True)
+
+
+class HtmlRenderer:
+    """Emit lecture HTML by walking a tree from lecture_parser."""
+
+    def __init__(self, images=None):
+        # File name in Lectures/img -> image_pipeline.ImageCatalog info
+        self.images = images or {}
+        self.image_count = 0
+
+    def render(self, document, drop_title=True):
+        """Render a parsed document to an HTML fragment."""
+        blocks = document.children
+        # The first H1 duplicates the lecture title shown in the page header
+        if drop_title and blocks and blocks[0].type == 'heading' and blocks[0].attrs['level'] == 1:
+            blocks = blocks[1:]
+        self.image_count = 0
+        return self.render_blocks(blocks)
+
+    def render_blocks(self, blocks, tight=False):
+        return '\n\n'.join(self.render_block(block, tight) for block in blocks)
+
+    def render_block(self, node, tight=False):
+        kind = node.type
+        if kind == 'paragraph':
+            content = self.render_inline(node.children)
+            return content if tight else f'<p>{content}</p>'
+        if kind == 'heading':
+            level = node.attrs['level']
+            anchor = f' id="{escape_attr(node.attrs["id"])}"' if node.attrs.get('id') else ''
+            return f'<h{level}{anchor}>{self.render_inline(node.children)}</h{level}>'
+        if kind == 'list':
+            return self.render_list(node)
+        if kind == 'code_block':
+            return self.render_code_block(node)
+        if kind == 'blockquote':
+            return f'<blockquote>\n{self.render_blocks(node.children)}\n</blockquote>'
+        if kind == 'table':
+            return self.render_table(node)
+        if kind == 'hr':
+            return '<hr>'
+        if kind == 'html_block':
+            return self.render_inline(node.children)
+        if kind == 'comment':
+            return node.text
+        if kind == 'math_block':
+            if node.attrs.get('math') is not None:
+                return to_mathml(node.attrs['math'], display=True, source=node.text)
+            return f'<div class="math-display">$$\n{escape_html(node.text)}\n$$</div>'
+        raise ValueError(f'Unknown block type: {kind}')
+
+    def render_list(self, node):
+        tag = 'ol' if node.attrs['ordered'] else 'ul'
+        start = node.attrs.get('start')
+        open_tag = f'<ol start="{start}">' if tag == 'ol' and start not in (None, 1) else f'<{tag}>'
+        tight = node.attrs['tight']
+        items = []
+        for item in node.children:
+            if tight:
+                body = '\n'.join(self.render_block(block, tight=True) for block in item.children)
+            else:
+                body = '\n' + self.render_blocks(item.children) + '\n'
+            items.append(f'<li>{body}</li>')
+        return open_tag + '\n' + '\n'.join(items) + f'\n</{tag}>'
+
+    def render_code_block(self, node):
+        lang = node.attrs.get('lang', '')
+        code = highlight(node.text, lang)
+        lang = canonical_language(lang) or lang
+        class_attr = f' class="language-{escape_attr(lang)}"' if lang else ''
+        return f'<pre{class_attr}><code{class_attr}>{code}\n</code></pre>'
+
+    def render_table(self, node):
+        aligns = node.attrs['aligns']
+        head, rows = node.children[0], node.children[1:]
+        out = ['<table>', '<thead>', self.render_row(head, 'th', aligns), '</thead>']
+        if rows:
+            out.append('<tbody>')
+            out.extend(self.render_row(row, 'td', aligns) for row in rows)
+            out.append('</tbody>')
+        out.append('</table>')
+        return '\n'.join(out)
+
+    def render_row(self, row, tag, aligns):
+        cells = []
+        for index, cell in enumerate(row.children):
+            align = aligns[index] if index < len(aligns) else None
+            style = f' style="text-align: {align};"' if align else ''
+            cells.append(f'<{tag}{style}>{self.render_inline(cell.children)}</{tag}>')
+        return '<tr>\n' + '\n'.join(cells) + '\n</tr>'
+
+    def render_inline(self, nodes):
+        out = []
+        for node in nodes:
+            kind = node.type
+            if kind == 'text':
+                out.append(escape_html(node.text))
+            elif kind == 'strong':
+                out.append(self.render_strong(node))
+            elif kind == 'em':
+                out.append(f'<em>{self.render_inline(node.children)}</em>')
+            elif kind == 'code':
+                out.append(f'<code>{escape_html(node.text)}</code>')
+            elif kind == 'link':
+                title = node.attrs.get('title')
+                title_attr = f' title="{escape_attr(title)}"' if title else ''
+                out.append(f'<a href="{escape_attr(node.attrs["href"])}"{title_attr}>'
+                           f'{self.render_inline(node.children)}</a>')
+            elif kind == 'image':
+                out.append(self.render_image(node))
+            elif kind == 'html':
+                out.append(node.text)
+            elif kind == 'math' and node.attrs.get('math') is not None:
+                out.append(to_mathml(node.attrs['math'], node.attrs.get('display', False), node.text))
+            elif kind == 'math':
+                # Left for KaTeX; wrapped so that KaTeX auto-render only has to scan these elements
+                if node.attrs.get('display'):
+                    out.append(f'<span class="math-display">\\[{escape_html(node.text)}\\]</span>')
+                else:
+                    out.append(f'<span class="math-inline">\\({escape_html(node.text)}\\)</span>')
+            elif kind == 'linebreak':
+                out.append('<br>\n')
+            else:
+                raise ValueError(f'Unknown inline type: {kind}')
+        return ''.join(out)
+
+    def render_strong(self, node):
+        """Bold text; a term's defining occurrence (glossary.collect_terms) is a <dfn> carrying its key."""
+        inner = self.render_inline(node.children)
+        if node.attrs.get('defines'):
+            return f'<strong><dfn data-term="{escape_attr(node.attrs["term"])}">{inner}</dfn></strong>'
+        return f'<strong>{inner}</strong>'
+
+    def render_image(self, node):
+        src = node.attrs['src']
+        # Markdown sources reference images relative to Lectures/markdown
+        if src.startswith('img/'):
+            src = '../' + src
+        html_attrs = {name: value for name, value in node.attrs.get('html_attrs', {}).items()
+                      if name != 'style'}
+        info = self.images.get(unquote(src[len(IMAGE_URL):])) if src.startswith(IMAGE_URL) else None
+        if info and 'width' in info:
+            html_attrs.update(self.image_size_attrs(info, html_attrs))
+        # The first image may be above the fold; the rest load as they scroll into view
+        self.image_count += 1
+        if self.image_count > 1:
+            html_attrs.setdefault('loading', 'lazy')
+        html_attrs.setdefault('decoding', 'async')
+
+        attrs = [f'src="{escape_attr(src)}"', f'alt="{escape_attr(node.attrs.get("alt", ""))}"']
+        attrs.extend(f'{name}="{escape_attr(value)}"' for name, value in html_attrs.items())
+        style = 'max-width: 100%;'
+        if info and info.get('placeholder'):
+            # Blurred preview painted behind the image until it has loaded
+            style += f' background: url({info["placeholder"]}) center / cover no-repeat;'
+        attrs.append(f'style="{escape_attr(style)}"')
+        img = f'<img {" ".join(attrs)}>'
+
+        if not info or not info.get('variants'):
+            return img
+        return self.render_picture(img, info, html_attrs.get('width'))
+
+    @staticmethod
+    def image_size_attrs(info, html_attrs):
+        """width/height reserving the image's box before it loads, honouring an authored width."""
+        if 'height' in html_attrs:
+            return {}
+        if 'width' not in html_attrs:
+            return {'width': str(info['width']), 'height': str(info['height'])}
+        try:
+            width = int(html_attrs['width'])
+        except ValueError:
+            return {}
+        return {'height': str(round(width * info['height'] / info['width']))}
+
+    def render_picture(self, img, info, display_width):
+        """Wrap an <img> in <picture> with a srcset per modern format."""
+        try:
+            shown = min(int(display_width), CONTENT_WIDTH)
+        except (TypeError, ValueError):
+            shown = CONTENT_WIDTH
+        shown = min(shown, info['width'])
+        sizes = f'(max-width: {shown}px) 100vw, {shown}px'
+        sources = []
+        for fmt, entries in info['variants'].items():
+            srcset = ', '.join(f'{VARIANT_URL}{name} {width}w' for width, name in entries)
+            sources.append(f'<source type="{VARIANT_FORMATS[fmt][0]}" srcset="{escape_attr(srcset)}" '
+                           f'sizes="{sizes}">')
+        return '<picture>' + ''.join(sources) + img + '</picture>'
+
 
 def convert_markdown_to_html(md_content):
     """Convert markdown content to HTML"""
-    html = md_content
-    
-    # Remove the first H1 heading (which duplicates the lecture title)
-    # This removes lines like "# Lecture 1: Computer Abstractions and Technology"
-    html = re.sub(r'^# .*?\n', '', html, count=1, flags=re.MULTILINE)
-    
-    # Convert headers
-    html = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^#### (.*?)$', r'<h4>\1</h4>', html, flags=re.MULTILINE)
-    
-    # Convert bold and italic
-    html = re.sub(r'\*\*\*(.*?)\*\*\*', r'<strong><em>\1</em></strong>', html)
-    html = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'\*(.*?)\*', r'<em>\1</em>', html)
-    html = re.sub(r'_(.*?)_', r'<em>\1</em>', html)
-    
-    # Convert inline code
-    html = re.sub(r'`([^`]+)`', r'<code>\1</code>', html)
-    
-    # Convert images
-    html = re.sub(r'<img src="img/', r'<img src="../img/', html)
-    html = re.sub(r'!\[(.*?)\]\((.*?)\)', r'<img src="\2" alt="\1" style="max-width: 100%;">', html)
-    
-    # Convert links
-    html = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', html)
-    
-    # Convert unordered lists
-    lines = html.split('\n')
-    in_ul = False
-    result_lines = []
-    
-    for line in lines:
-        if re.match(r'^- ', line):
-            if not in_ul:
-                result_lines.append('<ul>')
-                in_ul = True
-            result_lines.append('<li>' + line[2:] + '</li>')
-        else:
-            if in_ul:
-                result_lines.append('</ul>')
-                in_ul = False
-            result_lines.append(line)
-    
-    if in_ul:
-        result_lines.append('</ul>')
-    
-    html = '\n'.join(result_lines)
-    
-    # Convert paragraphs (lines that aren't already HTML tags)
-    lines = html.split('\n')
-    result_lines = []
-    for line in lines:
-        line = line.strip()
-        if line and not line.startswith('<') and not line.endswith('>'):
-            result_lines.append(f'<p>{line}</p>')
+    return HtmlRenderer().render(parse_markdown(md_content))
+
+
+def render_toc(outline, max_level=TOC_MAX_LEVEL):
+    """
+    Table of contents for a page from its document outline (parse_markdown()).
+
+    Lists the headings below the page title down to `max_level` as nested
+    lists of links to their ids. Pages with fewer than two such headings get none.
+    """
+    entries = [heading for heading in outline if 1 < heading['level'] <= max_level]
+    if len(entries) < 2:
+        return ''
+    parts = []
+    # Levels of the open <ol>s; a deeper heading opens a list inside the open <li>
+    levels = []
+    for heading in entries:
+        level = heading['level']
+        if not levels or level > levels[-1]:
+            parts.append('<ol>')
+            levels.append(level)
         else:
-            result_lines.append(line)
-    
-    return '\n'.join(result_lines)
+            while len(levels) > 1 and level < levels[-1]:
+                parts.append('</li></ol>')
+                levels.pop()
+            # A page may open with deeper headings than the ones that follow
+            levels[-1] = min(levels[-1], level)
+            parts.append('</li>')
+        parts.append(f'<li><a href="#{escape_attr(heading["id"])}">{escape_html(heading["text"])}</a>')
+    parts.append('</li></ol>' * len(levels))
+    return ('<nav class="lecture-toc" aria-label="Table of contents">'
+            '<details><summary>Contents</summary>' + ''.join(parts) + '</details></nav>')
 
 def get_lecture_title(filename):
     """Extract lecture title from filename"""
@@ -74,128 +269,119 @@ def get_lecture_title(filename):
         return f"Lecture {num}: {title}"
     return filename.replace('.md', '')
 
-def create_lecture_html(lecture_num, title, content, prev_num=None, next_num=None):
+def load_template(path=TEMPLATE_PATH):
+    """Read the lecture page template"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def create_lecture_html(lecture_num, title, content, prev_num=None, next_num=None,
+                        prev_title=None, next_title=None, template=None, toc=''):
     """Create HTML page for a lecture"""
-    
-    prev_link = f'<a href="lecture-{prev_num:02d}.html" class="nav-btn">← Previous Lecture</a>' if prev_num else '<span class="nav-btn disabled">← Previous Lecture</span>'
-    next_link = f'<a href="lecture-{next_num:02d}.html" class="nav-btn">Next Lecture →</a>' if next_num else '<span class="nav-btn disabled">Next Lecture →</span>'
-    
-    html_template = f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} - Lectures on Computer Architecture</title>
-    <link rel="stylesheet" href="../../assets/css/style.css">
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-</head>
-<body>
-    <header class="lecture-header">
-        <div class="container">
-            <a href="../../index.html" class="back-link">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <line x1="19" y1="12" x2="5" y2="12"></line>
-                    <polyline points="12 19 5 12 12 5"></polyline>
-                </svg>
-                Back to All Lectures
-            </a>
-            <h1 class="lecture-title">{title}</h1>
-            <p class="lecture-meta">Lectures on Computer Architecture</p>
-        </div>
-    </header>
-
-    <main class="lecture-content-area container">
-        <div class="content-body">
-            <!-- Video Section -->
-            <div class="video-container">
-                <div class="video-thumbnail">
-                    <a href="#video-lecture-{lecture_num:02d}" target="_blank" class="video-play-overlay">
-                        <img src="https://img.youtube.com/vi/VIDEO_ID_{lecture_num:02d}/maxresdefault.jpg" 
-                             alt="Lecture {lecture_num} Video Thumbnail"
-                             onerror="this.src='https://img.youtube.com/vi/VIDEO_ID_{lecture_num:02d}/hqdefault.jpg'">
-                        <div class="play-button">
-                            <svg width="68" height="48" viewBox="0 0 68 48" fill="none">
-                                <path d="M66.52 7.74c-.78-2.93-2.49-5.41-5.42-6.19C55.79.13 34 0 34 0S12.21.13 6.9 1.55c-2.93.78-4.63 3.26-5.42 6.19C.06 13.05 0 24 0 24s.06 10.95 1.48 16.26c.78 2.93 2.49 5.41 5.42 6.19C12.21 47.87 34 48 34 48s21.79-.13 27.1-1.55c2.93-.78 4.64-3.26 5.42-6.19C67.94 34.95 68 24 68 24s-.06-10.95-1.48-16.26z" fill="red"/>
-                                <path d="M45 24L27 14v20" fill="white"/>
-                            </svg>
-                        </div>
-                    </a>
-                </div>
-                <div class="video-info">
-                    <p class="video-notice">
-                        <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <circle cx="12" cy="12" r="10"></circle>
-                            <line x1="12" y1="16" x2="12" y2="12"></line>
-                            <line x1="12" y1="8" x2="12.01" y2="8"></line>
-                        </svg>
-                        Click the thumbnail above to watch the video lecture on YouTube
-                    </p>
-                </div>
-            </div>
-
-            {content}
-            
-            <div class="lecture-nav">
-                {prev_link}
-                {next_link}
-            </div>
-        </div>
-    </main>
-
-    <footer>
-        <div class="container">
-            <p>&copy; 2025 CO224 Computer Architecture Lecture Series. All rights reserved.</p>
-            <p>Department of Computer Engineering, University of Peradeniya</p>
-        </div>
-    </footer>
-</body>
-</html>
-'''
-    return html_template
-
-def main():
-    """Main function to convert all lecture markdown files to HTML"""
-    lectures_dir = Path('Lectures/markdown')
-    output_dir = Path('Lectures/html')
-    output_dir.mkdir(exist_ok=True)
-    
-    # Get all lecture files and sort them numerically by lecture number
-    def get_lecture_number(filename):
-        match = re.match(r'Lecture (\d+)', filename.name)
-        return int(match.group(1)) if match else 0
-    
-    lecture_files = sorted([f for f in lectures_dir.glob('Lecture *.md')], key=get_lecture_number)
-    
-    print(f"Found {len(lecture_files)} lecture files")
-    
+    if template is None:
+        template = load_template()
+
+    if prev_num:
+        title_attr = f' title="{escape_attr(prev_title)}"' if prev_title else ''
+        prev_link = (f'<a href="lecture-{prev_num:02d}.html" class="nav-btn" rel="prev"{title_attr}>'
+                     '← Previous Lecture</a>')
+    else:
+        prev_link = '<span class="nav-btn disabled">← Previous Lecture</span>'
+    if next_num:
+        title_attr = f' title="{escape_attr(next_title)}"' if next_title else ''
+        next_link = (f'<a href="lecture-{next_num:02d}.html" class="nav-btn" rel="next"{title_attr}>'
+                     'Next Lecture →</a>')
+        # Readers mostly go on to the next lecture; fetch it while this one is read
+        prefetch = f'<link rel="prefetch" href="lecture-{next_num:02d}.html">'
+    else:
+        next_link = '<span class="nav-btn disabled">Next Lecture →</span>'
+        prefetch = ''
+
+    return template.format(
+        lecture_num=lecture_num,
+        title=title,
+        content=content,
+        toc=toc,
+        prev_link=prev_link,
+        next_link=next_link,
+        prefetch=prefetch,
+    )
+
+
+def get_lecture_number(path):
+    """Extract the lecture number from a markdown file name"""
+    match = re.match(r'Lecture (\d+)', Path(path).name)
+    return int(match.group(1)) if match else 0
+
+
+def find_lecture_files(lectures_dir=LECTURES_DIR):
+    """Return lecture markdown files sorted numerically by lecture number"""
+    return sorted(Path(lectures_dir).glob('Lecture *.md'), key=get_lecture_number)
+
+
+def build_inputs(source_hash, template_hash, lecture_num, prev_title, next_title):
+    """Collect everything a lecture page depends on, for the build manifest"""
+    return {
+        'source': source_hash,
+        'template': template_hash,
+        'converter': CONVERTER_VERSION,
+        'lecture': str(lecture_num),
+        'prev': prev_title or '',
+        'next': next_title or '',
+    }
+
+
+def plan_lecture_pages(lecture_files, template):
+    """Assign lecture numbers and prev/next neighbours before any work is fanned out"""
+    titles = [get_lecture_title(f.name) for f in lecture_files]
+    pages = []
     for i, lecture_file in enumerate(lecture_files):
-        lecture_num = i + 1
         prev_num = i if i > 0 else None
         next_num = i + 2 if i < len(lecture_files) - 1 else None
-        
-        print(f"Processing: {lecture_file.name}")
-        
-        # Read markdown content
-        with open(lecture_file, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        
-        # Get title
-        title = get_lecture_title(lecture_file.name)
-        
-        # Convert to HTML
-        html_content = convert_markdown_to_html(md_content)
-        
-        # Create full HTML page
-        full_html = create_lecture_html(lecture_num, title, html_content, prev_num, next_num)
-        
-        # Write to file
-        output_file = output_dir / f'lecture-{lecture_num:02d}.html'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(full_html)
-        
-        print(f"Created: {output_file.name}")
-    
-    print(f"\nSuccessfully created {len(lecture_files)} lecture HTML pages!")
+        pages.append({
+            'source': str(lecture_file),
+            'lecture_num': i + 1,
+            'title': titles[i],
+            'prev_num': prev_num,
+            'next_num': next_num,
+            'prev_title': titles[i - 1] if prev_num else None,
+            'next_title': titles[i + 1] if next_num else None,
+            'template': template,
+        })
+    return pages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Convert lecture markdown files to HTML pages.')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every page even if its inputs are unchanged')
+    parser.add_argument('--explain', action='store_true',
+                        help='print why each page was rebuilt')
+    add_jobs_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Convert all lecture markdown files to HTML.
+
+    Pages are built by scripts/build.py's SiteBuilder, so both entry points
+    share one planner and one manifest (Lectures/html/.build-manifest.json)
+    and write the same fully processed pages.
+    """
+    args = parse_args(argv)
+    # build.py imports this module; import it only once both are loaded
+    from build import SiteBuilder
+
+    print(f"Found {len(find_lecture_files())} lecture files")
+    written, failed = SiteBuilder(jobs=args.jobs, explain=args.explain).run(force=args.force)
+    if written:
+        print(f"\nWrote {written} file(s)")
+    elif not failed:
+        print("\nAll lecture HTML pages are up to date.")
+    if failed:
+        print(f"\n{failed} lecture(s) failed to convert")
+        raise SystemExit(1)
 
 if __name__ == '__main__':
     main()
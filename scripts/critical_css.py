@@ -0,0 +1,240 @@
+"""
+Per-page critical CSS for the generated lecture pages.
+
+The stylesheet is split into rules once per build. For each page, the tags,
+classes and ids of everything above the fold (the header, the video block and
+the first few content blocks) are collected, and only rules whose selectors can
+match those elements are kept. That subset is inlined into <head>, and the full
+stylesheet and the Google Fonts stylesheet are switched to non-blocking loads
+(`rel="preload"` swapped to `stylesheet` on load, with a <noscript> fallback).
+
+Matching is deliberately generous: a selector is kept when every compound in it
+names tags, classes and ids that occur above the fold, ignoring combinators,
+attribute selectors and structural pseudo-classes. Interaction states (:hover,
+:focus, ...) and @font-face rules are left to the full stylesheet.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# Children of .content-body treated as above the fold, the video block included
+FOLD_BLOCKS = 5
+# Pseudo-classes that never apply while the page first renders
+STATE_PSEUDO_CLASSES = {'hover', 'focus', 'focus-visible', 'focus-within', 'active', 'visited', 'target'}
+# Characters handed to the HTML parser at a time
+FEED_CHUNK = 4096
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'source', 'track', 'wbr'}
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+BRACE_RE = re.compile(r'[{}]')
+PSEUDO_RE = re.compile(r'::?([\w-]+)(\((?:[^()]|\([^()]*\))*\))?')
+ATTRIBUTE_RE = re.compile(r'\[[^\]]*\]')
+COMBINATOR_RE = re.compile(r'\s*[>+~]\s*|\s+')
+COMPOUND_RE = re.compile(r'([.#]?)(-?[A-Za-z_][\w-]*|\*)')
+KEYFRAMES_RE = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+SPACE_RE = re.compile(r'\s+')
+PUNCTUATION_SPACE_RE = re.compile(r'\s*([{};,>])\s*')
+DECLARATION_COLON_RE = re.compile(r'\s*:\s*')
+GOOGLE_FONTS_URL = 'https://fonts.googleapis.com/'
+STYLESHEET_LINK_RE = re.compile(r'<link\b(?=[^>]*\brel="stylesheet")(?=[^>]*\bhref="([^"]*)")[^>]*>')
+
+
+def parse_stylesheet(css):
+    """
+    Split a stylesheet into a list of rules.
+
+    Each rule is (prelude, body) for a style rule or an at-rule with
+    declarations, and (prelude, [rules]) for @media and @supports blocks.
+    """
+    css = COMMENT_RE.sub('', css)
+    rules = []
+    pos = 0
+    while True:
+        start = css.find('{', pos)
+        if start < 0:
+            break
+        prelude = css[pos:start].strip()
+        # Statements such as @charset end in ';' before the next block
+        if ';' in prelude and prelude.startswith('@'):
+            prelude = prelude.rsplit(';', 1)[1].strip()
+        depth = 0
+        end = len(css) + 1
+        for brace in BRACE_RE.finditer(css, start):
+            depth += 1 if brace.group() == '{' else -1
+            if not depth:
+                end = brace.end()
+                break
+        body = css[start + 1:end - 1]
+        if prelude.startswith(('@media', '@supports')):
+            rules.append((prelude, parse_stylesheet(body)))
+        else:
+            rules.append((prelude, body.strip()))
+        pos = end
+    return rules
+
+
+class FoldCollector(HTMLParser):
+    """Collects the tags, classes and ids of the elements above the fold."""
+
+    def __init__(self, fold_blocks=FOLD_BLOCKS):
+        super().__init__(convert_charrefs=False)
+        self.fold_blocks = fold_blocks
+        self.tags = {'html', 'body'}
+        self.classes = set()
+        self.ids = set()
+        self.stack = []
+        self.content_depth = None
+        self.blocks = 0
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.content_depth is not None and len(self.stack) == self.content_depth:
+            self.blocks += 1
+            if self.blocks > self.fold_blocks:
+                self.done = True
+                return
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        self.tags.add(tag)
+        self.classes.update(classes)
+        if attrs.get('id'):
+            self.ids.add(attrs['id'])
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        if 'content-body' in classes and self.content_depth is None:
+            self.content_depth = len(self.stack)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if not self.done and tag not in VOID_TAGS and self.stack and self.stack[-1] == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if self.done or tag not in self.stack:
+            return
+        while self.stack.pop() != tag:
+            pass
+
+
+def fold_elements(html, fold_blocks=FOLD_BLOCKS):
+    """Return (tags, classes, ids) used above the fold of a page."""
+    collector = FoldCollector(fold_blocks)
+    # Feed in chunks so the rest of a long page is never parsed
+    for start in range(0, len(html), FEED_CHUNK):
+        collector.feed(html[start:start + FEED_CHUNK])
+        if collector.done:
+            break
+    return collector.tags, collector.classes, collector.ids
+
+
+def split_selectors(prelude):
+    """Split a selector list on top-level commas."""
+    selectors = []
+    depth = 0
+    current = []
+    for char in prelude:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    selectors.append(''.join(current).strip())
+    return [s for s in selectors if s]
+
+
+def selector_matches(selector, tags, classes, ids, interactive=False):
+    """
+    Whether `selector` may match an element built from the given names.
+
+    Selectors for interaction states only match when `interactive` is set.
+    """
+    if not interactive:
+        for match in PSEUDO_RE.finditer(selector):
+            if match.group(1) in STATE_PSEUDO_CLASSES:
+                return False
+    selector = selector.replace(':root', 'html')
+    selector = ATTRIBUTE_RE.sub('', PSEUDO_RE.sub('', selector))
+    for compound in COMBINATOR_RE.split(selector.strip()):
+        for kind, name in COMPOUND_RE.findall(compound):
+            if name == '*':
+                continue
+            names = {'': tags, '.': classes, '#': ids}[kind]
+            if (name.lower() if kind == '' else name) not in names:
+                return False
+    return True
+
+
+def compact_css(css):
+    css = SPACE_RE.sub(' ', css)
+    return PUNCTUATION_SPACE_RE.sub(r'\1', css).replace(';}', '}').strip()
+
+
+def select_rules(rules, tags, classes, ids):
+    """Return the CSS text of the rules that may apply to the given names."""
+    out = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = select_rules(body, tags, classes, ids)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @font-face waits for the deferred font stylesheet; @keyframes are added below
+            continue
+        else:
+            selectors = [s for s in split_selectors(prelude) if selector_matches(s, tags, classes, ids)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{DECLARATION_COLON_RE.sub(':', body)}}}")
+    return compact_css(''.join(out))
+
+
+def critical_css(rules, html, fold_blocks=FOLD_BLOCKS):
+    """Critical CSS for one page, including the @keyframes its rules animate with."""
+    tags, classes, ids = fold_elements(html, fold_blocks)
+    css = select_rules(rules, tags, classes, ids)
+    for prelude, body in rules:
+        match = KEYFRAMES_RE.match(prelude)
+        if match and re.search(r'\b' + re.escape(match.group(1)) + r'\b', css):
+            css += compact_css(f'{prelude}{{{body}}}')
+    return css
+
+
+def is_deferrable(href):
+    """The site's own stylesheet and Google Fonts; library CSS keeps loading as before."""
+    return '://' not in href or href.startswith(GOOGLE_FONTS_URL)
+
+
+def defer_stylesheets(html, css):
+    """
+    Inline `css` before the page's own stylesheet and switch that stylesheet
+    and the Google Fonts one to non-blocking loads.
+    """
+    head_end = html.find('</head>')
+    if head_end < 0:
+        return html
+    inlined = False
+
+    def replace(match):
+        nonlocal inlined
+        href = match.group(1)
+        if not is_deferrable(href):
+            return match.group()
+        deferred = (f'<link rel="preload" href="{href}" as="style" '
+                    f'onload="this.onload=null;this.rel=\'stylesheet\'">'
+                    f'<noscript>{match.group()}</noscript>')
+        if href.startswith(GOOGLE_FONTS_URL):
+            # The font files come from a second origin; open that connection early
+            deferred = '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>' + deferred
+        if not inlined:
+            inlined = True
+            return f'<style>{css}</style>' + deferred
+        return deferred
+
+    return STYLESHEET_LINK_RE.sub(replace, html[:head_end]) + html[head_end:]
@@ -0,0 +1,181 @@
+"""
+Content-fingerprinted copies of the site's static assets.
+
+The stylesheet, the scripts, the icon sprite and the lecture images are
+copied into assets/dist/ under names that embed a hash of their contents, e.g.
+assets/dist/style.3f2a1b9c0d.css. A changed file gets a new URL, so hosting
+can cache everything in assets/dist/ for a year (`Cache-Control: immutable`)
+while HTML pages keep revalidating.
+
+assets/dist/manifest.json maps every source path to its fingerprinted copy
+and is what hosting configuration or other tools should read. Files the build
+generates from a source, such as the purged stylesheet, are recorded under
+`derived` the same way. Pages are
+rewritten with rewrite_asset_urls(); rewriting is idempotent, so it can be
+applied to index.html in place on every build.
+"""
+
+import json
+import os
+import posixpath
+import re
+import shutil
+from html import escape, unescape
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from build_manifest import hash_bytes, hash_file
+
+FINGERPRINT_DIR = Path('assets/dist')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+# Source files, relative to the repository root, that get fingerprinted copies
+FINGERPRINT_PATTERNS = [
+    'assets/css/*.css',
+    'assets/js/*.js',
+    'assets/img/*.svg',
+    'Lectures/img/*.jpg',
+    'Lectures/img/*.jpeg',
+    'Lectures/img/*.png',
+]
+HASH_LENGTH = 10
+
+# The URL runs up to a query or fragment; a "#" inside a character reference ("&#x27;") is part of it
+URL_ATTR_RE = re.compile(r'(\s(?:src|href)=")((?:[^"#?&]|&#?\w+;|&)+)([^"]*")')
+FINGERPRINTED_RE = re.compile(r'^(.+)\.[0-9a-f]{%d}(\.\w+)$' % HASH_LENGTH)
+
+
+def fingerprint_name(path, sha):
+    stem = re.sub(r'[^A-Za-z0-9_-]+', '-', Path(path).stem).strip('-').lower()
+    return f'{stem}.{sha[:HASH_LENGTH]}{Path(path).suffix.lower()}'
+
+
+class AssetManifest:
+    """Source path -> fingerprinted copy, with the copies kept in step with their sources."""
+
+    def __init__(self, output_dir=FINGERPRINT_DIR, patterns=FINGERPRINT_PATTERNS):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self.patterns = patterns
+        self.assets = {}
+        self.sources = {}
+        self.derived = {}
+        self.previous = {}
+        self.dirty = False
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == MANIFEST_VERSION:
+            self.assets = data.get('assets', {})
+            self.sources = data.get('sources', {})
+            self.derived = data.get('derived', {})
+        return self
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'assets': self.assets, 'sources': self.sources,
+                       'derived': self.derived}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.dirty = False
+
+    def refresh(self):
+        """Copy new or changed assets to fingerprinted names; returns {source: copy}."""
+        # Earlier copies stay resolvable so pages still pointing at them get rewritten
+        self.previous.update({copy: source for source, copy in self.assets.items()})
+        self.previous.update({copy: key for key, copy in self.derived.items()})
+        assets = {}
+        sources = {}
+        for pattern in self.patterns:
+            for path in sorted(Path('.').glob(pattern)):
+                source = path.as_posix()
+                st = path.stat()
+                stamp = [st.st_mtime_ns, st.st_size]
+                cached = self.sources.get(source)
+                sha = cached['sha'] if cached and cached['stamp'] == stamp else hash_file(path)
+                sources[source] = {'stamp': stamp, 'sha': sha}
+                copy = (self.output_dir / fingerprint_name(path, sha)).as_posix()
+                assets[source] = copy
+                if not os.path.exists(copy):
+                    self.output_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(path, copy)
+
+        if assets != self.assets or sources != self.sources:
+            self.dirty = True
+        self.assets = assets
+        self.sources = sources
+        self.remove_stale()
+        self.save()
+        return assets
+
+    def add_derived(self, key, content):
+        """
+        Record generated `content` for `key` under a fingerprinted name.
+
+        Returns (copy, changed); the caller writes the file when it changed.
+        """
+        copy = (self.output_dir / fingerprint_name(key, hash_bytes(content))).as_posix()
+        changed = self.derived.get(key) != copy or not os.path.exists(copy)
+        if self.derived.get(key) != copy:
+            self.derived[key] = copy
+            self.dirty = True
+        return copy, changed
+
+    def remove_stale(self):
+        """Delete copies no source maps to any more."""
+        if not self.output_dir.is_dir():
+            return
+        copies = list(self.assets.values()) + list(self.derived.values())
+        wanted = {Path(copy).name for copy in copies} | {MANIFEST_NAME}
+        for entry in os.scandir(self.output_dir):
+            # Precompressed siblings go with their copy
+            name = re.sub(r'\.(?:gz|br)$', '', entry.name)
+            if entry.is_file() and name not in wanted:
+                os.unlink(entry.path)
+
+    def signature(self):
+        """Short hash of the whole mapping, for the build manifest."""
+        return hash_bytes(json.dumps(self.assets, sort_keys=True))[:16]
+
+
+def resolve_source(path, assets, previous=None):
+    """Map a repository path, original or fingerprinted, to its source path."""
+    if path in assets:
+        return path
+    if previous and path in previous:
+        return previous[path]
+    # A copy from a build whose manifest is gone: match on name alone
+    match = FINGERPRINTED_RE.match(posixpath.basename(path))
+    if match and path.startswith(FINGERPRINT_DIR.as_posix() + '/'):
+        candidates = [source for source, copy in assets.items()
+                      if FINGERPRINTED_RE.match(posixpath.basename(copy)).groups() == match.groups()]
+        if len(candidates) == 1:
+            return candidates[0]
+    return None
+
+
+def rewrite_asset_urls(html, page_dir, assets, previous=None):
+    """
+    Point src/href attributes of a page in `page_dir` at fingerprinted copies.
+
+    `assets` maps source paths to copies, both relative to the repository root.
+    """
+    def replace(match):
+        prefix, url, rest = match.groups()
+        if '://' in url or url.startswith(('//', 'data:', 'mailto:', 'tel:', 'javascript:')):
+            return match.group()
+        # Attribute text is HTML: "Moore&#x27;s%20Law.jpg" names "Moore's Law.jpg"
+        path = posixpath.normpath(posixpath.join(page_dir, unquote(unescape(url))))
+        source = resolve_source(path, assets, previous)
+        if source not in assets:
+            return match.group()
+        new_url = quote(posixpath.relpath(assets[source], page_dir))
+        return prefix + escape(new_url, quote=True) + rest
+
+    return URL_ATTR_RE.sub(replace, html)
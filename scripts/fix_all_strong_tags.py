@@ -1,10 +1,7 @@
 import re
 
-def fix_strong_tags(filepath):
-    """Wrap standalone <strong> tags in <p> tags."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
+def fix_strong_lines(lines):
+    """Wrap standalone <strong> lines in <p> tags; returns the fixed lines."""
     result = []
     
     for i, line in enumerate(lines):
@@ -27,6 +24,19 @@ def fix_strong_tags(filepath):
         else:
             result.append(line)
     
+    return result
+
+def fix_strong_tags_html(content):
+    """Apply fix_strong_lines to an in-memory HTML string."""
+    return ''.join(fix_strong_lines(content.splitlines(keepends=True)))
+
+def fix_strong_tags(filepath):
+    """Wrap standalone <strong> tags in <p> tags."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    
+    result = fix_strong_lines(lines)
+    
     # Write back
     with open(filepath, 'w', encoding='utf-8') as f:
         f.writelines(result)
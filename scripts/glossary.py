@@ -0,0 +1,375 @@
+"""
+Glossary of the terms the lectures define in bold.
+
+The notes introduce their vocabulary in **bold**, mostly in one of three
+shapes:
+
+    **Hit rate**: fraction of accesses found in the cache
+    - **Write-through** - every write also goes to memory
+    A **cache block** is the unit of transfer between levels ...
+    **Write-through policy** updates both cache and memory ...
+
+plus the first paragraph under a heading such as "Miss Penalty Definition"
+and "**Definition:** ..." paragraphs directly under the heading that names
+the term. collect_terms() finds those in a parsed lecture, in the same tree
+the HTML renderer walks, and marks the defining bold occurrence. A label
+such as "**Example:**" is not a term, and neither is a phrase the lecture
+uses fewer than MIN_USES times (one-off emphasis), a single capitalized word
+the lecture never writes in lower case ("Java") or a bare plural
+("Enthusiasts").
+
+The build writes each lecture's terms to Lectures/glossary/lecture-NN.json
+and merges them into Lectures/glossary/index.json:
+
+    {"lectures": [{"lecture": 14, "title": "...", "url": "../html/lecture-14.html"}, ...],
+     "terms": [{"key": "hit rate", "term": "Hit rate", "definition": "...",
+                "lecture": 14, "anchor": "143-cache-terminology", "heading": "14.3 ...",
+                "also": [{"lecture": 16, "anchor": "...", "heading": "..."}]}, ...]}
+
+A term defined in several lectures is listed under the first; "also" names
+the others. The index is rendered as Lectures/html/glossary.html. Once it
+is built, mark_terms() gives every bold mention of a glossary term on the
+final pages its key, and assets/js/glossary.js uses the index to show
+definitions when those are hovered.
+"""
+
+import html
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from lecture_parser import slugify
+
+GLOSSARY_DIR = Path('Lectures/glossary')
+GLOSSARY_INDEX_PATH = GLOSSARY_DIR / 'index.json'
+GLOSSARY_PAGE_PATH = Path('Lectures/html/glossary.html')
+TEMPLATE_PATH = Path(__file__).resolve().parent / 'templates' / 'glossary.html'
+
+# Bump whenever a change to term detection alters the glossary or the terms marked on the pages
+GLOSSARY_VERSION = '2'
+
+MAX_TERM_WORDS = 4
+MAX_TERM_CHARS = 60
+# Occurrences of a term in its lecture's text, the definition included
+MIN_USES = 2
+# Words of prose in a definition; "IF, ID, EX = 3 cycles" lists values, it defines nothing
+MIN_DEFINITION_WORDS = 3
+MAX_DEFINITION_CHARS = 200
+
+# Bold lead-ins that introduce a paragraph rather than name a concept
+LABELS = frozenset('''
+    advantage algorithm allocate analysis answer application approach behavior benefit but calculation
+    case challenge characteristic complexity component conclusion cons control correct cost critical
+    data default definition delay detail disadvantage effect example exception execution explanation feature
+    format formula function given goal hardware how idea impact implementation important input issue
+    key limitation logic meaning method note observation operation option output overhead performance
+    problem process property pros purpose question rationale reality reason release remember
+    requirement result role scenario score select solution step strategy structure summary task tip total
+    tradeoff type usage use warning what when where why
+'''.split()) | {'key idea', 'key insight', 'key observation', 'key point', 'real world example', 'trade off'}
+# Leading words of a bold phrase that make it a condition, not a term ("If hit:", "On miss:")
+FUNCTION_WORDS = frozenset('a all an and as at bad by for from good if in most of on or some the to when with'.split())
+# Trailing words that make a phrase a remark about a term ("Write-through advantages:")
+REMARK_WORDS = frozenset('advantage benefit disadvantage drawback example'.split())
+# Nouns a term is named with: "**Write-through policy** updates ..." defines "write-through"
+HEAD_NOUNS = frozenset('mechanism path policy protocol scheme technique'.split())
+
+NUMBER_PREFIX_RE = re.compile(r'^\d+(?:\.\d+)*\s+')
+PARENTHETICAL_RE = re.compile(r'\s*\([^)]*\)')
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+DIGIT_RE = re.compile(r'\d')
+CALCULATION_RE = re.compile('[=\u2248\u2264\u2265]')
+# Separator between a bold lead-in and its definition: "**Term**: ...", "**Term** (abbr) - ..."
+SEPARATOR_RE = re.compile(r'^\s*(?:\([^)]*\)\s*)?(?:[:\u2014\u2013]|-\s)')
+# "**Term** is ...", "**Terms** (abbr) are ..."
+DEFINING_VERB_RE = re.compile(r'^\s*(?:\([^)]*\)\s*)?(?:is|are|refers to|means|describes)\b')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+DEFINITION_HEADING_RE = re.compile(r'^(.+?)\s+Definition$', re.I)
+APOSTROPHE_RE = re.compile("['\u2019]")
+# Bold text without markup inside, as the HTML renderer writes it
+STRONG_RE = re.compile(r'<strong(?: data-term="[^"]*")?>([^<]+)</strong>')
+PROSE_WORD_RE = re.compile(r'\b[A-Za-z]?[a-z]+\b')
+
+
+def term_key(text):
+    """
+    Normalized form of a term: lower case, hyphens as spaces, punctuation and
+    parentheticals dropped, last word singular ("Write-Buffers" -> "write buffer").
+    """
+    text = PARENTHETICAL_RE.sub('', text).lower().replace('-', ' ')
+    words = PUNCTUATION_RE.sub('', text).split()
+    if words:
+        last = words[-1]
+        if last.endswith('ies') and len(last) > 4:
+            words[-1] = last[:-3] + 'y'
+        elif last.endswith('sses'):
+            words[-1] = last[:-2]
+        elif len(last) > 3 and last.endswith('s') and not last.endswith(('ss', 'us', 'is')):
+            words[-1] = last[:-1]
+    return ' '.join(words)
+
+
+def is_term(text, key):
+    """Whether bold `text` (with normalized `key`) looks like the name of a concept."""
+    words = key.split()
+    return (0 < len(words) <= MAX_TERM_WORDS and len(text) <= MAX_TERM_CHARS and len(key) > 2
+            and text[0].isalpha() and not DIGIT_RE.search(text)
+            and not text.endswith(('!', '?')) and key not in LABELS and words[0] not in FUNCTION_WORDS
+            and words[-1] not in REMARK_WORDS
+            # "Gamers", "Accesses": a bare plural names a group of things, not a concept
+            and not (len(words) == 1 and not text.isupper() and key != PUNCTUATION_RE.sub('', text.lower())))
+
+
+def head_term(sentence):
+    """
+    The term named by "<term> <head noun> <verb> ...", e.g. "Write-through" for
+    "Write-through policy updates ..." or "Forwarding" for "Forwarding paths
+    connect ...", or None.
+    """
+    words = sentence.split()
+    for i in range(1, min(len(words) - 1, MAX_TERM_WORDS + 1)):
+        verb = words[i + 1]
+        if (term_key(words[i]) in HEAD_NOUNS and verb.isalpha() and verb.islower()
+                and verb not in FUNCTION_WORDS):
+            return ' '.join(words[:i])
+    return None
+
+
+def display_term(text):
+    """How a term is listed: "HIT RATE" reads as "Hit rate", acronyms stay."""
+    text = text.strip().rstrip(':').strip()
+    if text.isupper() and ' ' in text:
+        return text.capitalize()
+    return text
+
+
+def clean_definition(text):
+    """Collapse whitespace and cut a definition to MAX_DEFINITION_CHARS at a word boundary."""
+    text = ' '.join(text.split())
+    if len(text) <= MAX_DEFINITION_CHARS:
+        return text
+    return text[:MAX_DEFINITION_CHARS].rsplit(' ', 1)[0].rstrip(',;:') + '\u2026'
+
+
+def plain_text(nodes):
+    return ''.join(node.plain_text() for node in nodes)
+
+
+def text_blocks(doc):
+    """Headings and paragraphs in document order, without descending into inline content."""
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if node.type in ('heading', 'paragraph'):
+            yield node
+        elif node.type in ('document', 'blockquote', 'list', 'list_item'):
+            stack.extend(reversed(node.children))
+
+
+def is_definition(text):
+    """
+    Prose, not a list of values, a calculation ("IF, ID, EX = 3 cycles") or
+    the lead-in to a list ("Write policies manage consistency:").
+    """
+    return (text[:1].isalpha() and not CALCULATION_RE.search(text) and not text.endswith(':')
+            and len(PROSE_WORD_RE.findall(text)) >= MIN_DEFINITION_WORDS)
+
+
+def is_label(block):
+    """A paragraph holding nothing but a bold lead-in, e.g. "**Concept:**"."""
+    children = [child for child in block.children if child.plain_text().strip() not in ('', ':')]
+    return len(children) == 1 and children[0].type == 'strong'
+
+
+def first_sentence(block):
+    """The first sentence of a paragraph, without a bold lead-in ("**Policy Statement:** ...") or quotes."""
+    children = block.children
+    if children and children[0].type == 'strong' and children[0].plain_text().strip().endswith(':'):
+        children = children[1:]
+    text = plain_text(children).strip().strip('"\u201c\u201d').strip()
+    return SENTENCE_END_RE.split(text, 1)[0]
+
+
+def collect_terms(doc):
+    """
+    The terms a parsed lecture defines, one entry per key in document order.
+
+    The bold phrase that defines a term gets attrs['term'] (its key) and
+    attrs['defines'], for the HTML renderer. The walk runs once per tree;
+    later calls return the entries kept in doc.attrs['glossary'].
+    """
+    if 'glossary' in doc.attrs:
+        return doc.attrs['glossary']
+
+    texts = {}
+
+    def lecture_text(lower):
+        if not texts:
+            texts[False] = ' '.join(block.plain_text() for block in text_blocks(doc))
+            texts[True] = ' ' + APOSTROPHE_RE.sub('', texts[False].lower().replace('-', ' '))
+        return texts[lower]
+
+    def uses(key):
+        # Counted from the start of a word only, so that plurals and other forms count too
+        text = lecture_text(True)
+        return text.count(' ' + key) + text.count('(' + key)
+
+    def is_proper_noun(term):
+        # "Java", "Plateau": one capitalized word that never appears in lower case
+        return (term.isalpha() and term[0].isupper() and not term.isupper()
+                and not re.search(r'\b' + term.lower() + r'\b', lecture_text(False)))
+
+    entries = {}
+
+    def add(term, definition, anchor, heading, strong=None):
+        term = display_term(term)
+        key = term_key(term)
+        if (key in entries or not is_term(term, key) or not is_definition(definition)
+                or uses(key) < MIN_USES or is_proper_noun(term)):
+            return
+        if strong is not None:
+            strong.attrs.update(term=key, defines=True)
+        entries[key] = {'key': key, 'term': term, 'definition': clean_definition(definition),
+                        'anchor': anchor, 'heading': heading}
+
+    anchor = heading = ''
+    # Term of a "... Definition" heading, defined by the first paragraph under it
+    heading_term = None
+    for node in text_blocks(doc):
+        if node.type == 'heading':
+            if node.attrs['level'] > 1:
+                anchor, heading = node.attrs['id'], node.plain_text().strip()
+                match = DEFINITION_HEADING_RE.match(NUMBER_PREFIX_RE.sub('', heading))
+                heading_term = match.group(1) if match else None
+            continue
+        if heading_term is not None and not is_label(node):
+            add(heading_term, first_sentence(node), anchor, heading)
+            heading_term = None
+        children = node.children
+        for i, strong in enumerate(children):
+            if strong.type != 'strong':
+                continue
+            text = strong.plain_text().strip()
+            following = children[i + 1].plain_text() if i + 1 < len(children) else ''
+            rest = plain_text(children[i + 1:])
+            leads = i == 0 or (i == 1 and not children[0].plain_text().strip())
+            if term_key(display_term(text)) == 'definition':
+                # "**Definition:** ..." defines the heading it sits under; the label itself is no term
+                if leads:
+                    add(NUMBER_PREFIX_RE.sub('', heading), re.sub(r'^[\s:\u2014\u2013-]+', '', rest),
+                        anchor, heading)
+            elif leads and (text.endswith(':') or SEPARATOR_RE.match(following)):
+                add(text, SEPARATOR_RE.sub('', rest).strip(), anchor, heading, strong)
+            elif DEFINING_VERB_RE.match(following):
+                add(text, SENTENCE_END_RE.split(text + rest, 1)[0], anchor, heading, strong)
+            elif leads and head_term(text + rest):
+                add(head_term(text + rest), SENTENCE_END_RE.split(text + rest, 1)[0], anchor, heading, strong)
+
+    doc.attrs['glossary'] = list(entries.values())
+    return doc.attrs['glossary']
+
+
+def lecture_glossary(doc, lecture_num, title, url):
+    """The glossary file of one lecture."""
+    return {'lecture': lecture_num, 'title': title, 'url': url, 'terms': collect_terms(doc)}
+
+
+def dump_glossary(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def build_glossary(lectures):
+    """index.json for a list of lecture glossaries."""
+    lectures = sorted(lectures, key=lambda lecture: lecture['lecture'])
+    terms = {}
+    for lecture in lectures:
+        for entry in lecture['terms']:
+            found = terms.get(entry['key'])
+            if found is None:
+                terms[entry['key']] = dict(entry, lecture=lecture['lecture'], also=[])
+            elif found['lecture'] != lecture['lecture']:
+                found['also'].append({'lecture': lecture['lecture'], 'anchor': entry['anchor'],
+                                      'heading': entry['heading']})
+    return {
+        'lectures': [{'lecture': lecture['lecture'], 'title': lecture['title'], 'url': lecture['url']}
+                     for lecture in lectures],
+        'terms': [terms[key] for key in sorted(terms)],
+    }
+
+
+def glossary_keys(glossary):
+    return {entry['key'] for entry in glossary['terms']}
+
+
+def mark_terms(page, keys):
+    """
+    Give bold mentions of the glossary's terms their key (<strong data-term="...">)
+    and drop it from every other bold phrase; idempotent.
+
+    Runs on the final pages once the glossary is merged, so a mention links a
+    term whatever lecture defines it, and only terms that made it into the
+    glossary are marked.
+    """
+    def replace(match):
+        text = match.group(1)
+        key = term_key(display_term(html.unescape(text)))
+        if key not in keys and key.rpartition(' ')[2] in HEAD_NOUNS:
+            # "Write-through policy" mentions "write through"
+            key = key.rpartition(' ')[0]
+        if key in keys:
+            return f'<strong data-term="{html.escape(key)}">{text}</strong>'
+        return f'<strong>{text}</strong>'
+
+    return STRONG_RE.sub(replace, page)
+
+
+# =============================================================================
+# GLOSSARY PAGE
+# =============================================================================
+
+def load_template(path=TEMPLATE_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def render_glossary_page(glossary, template):
+    """Lectures/html/glossary.html: every term with its definition, grouped by first letter."""
+    page_dir = GLOSSARY_PAGE_PATH.parent.as_posix()
+    urls = {lecture['lecture']: posixpath.relpath(posixpath.normpath(
+        posixpath.join(GLOSSARY_DIR.as_posix(), lecture['url'])), page_dir)
+        for lecture in glossary['lectures']}
+
+    def source_link(num, anchor, heading):
+        label = f'Lecture {num}' + (f' \u203a {heading}' if heading else '')
+        href = urls[num] + (f'#{anchor}' if anchor else '')
+        return f'<a href="{html.escape(href)}">{html.escape(label)}</a>'
+
+    groups = {}
+    for entry in glossary['terms']:
+        letter = entry['key'][0].upper() if entry['key'][0].isalpha() else '#'
+        groups.setdefault(letter, []).append(entry)
+
+    letters = []
+    sections = []
+    for letter, entries in groups.items():
+        section_id = f'glossary-{slugify(letter) or "other"}'
+        letters.append(f'<a href="#{section_id}">{html.escape(letter)}</a>')
+        items = []
+        for entry in entries:
+            sources = source_link(entry['lecture'], entry['anchor'], entry['heading'])
+            if entry['also']:
+                sources += '; also ' + ', '.join(source_link(other['lecture'], other['anchor'], other['heading'])
+                                                 for other in entry['also'])
+            items.append(f'<dt id="term-{slugify(entry["key"])}">{html.escape(entry["term"])}</dt>\n'
+                         f'<dd><p>{html.escape(entry["definition"])}</p>'
+                         f'<p class="glossary-source">{sources}</p></dd>')
+        sections.append(f'<section class="glossary-section" id="{section_id}">\n'
+                        f'<h2>{html.escape(letter)}</h2>\n<dl class="glossary-list">\n'
+                        + '\n'.join(items) + '\n</dl>\n</section>')
+
+    return template.format(
+        count=len(glossary['terms']),
+        letters=' '.join(letters),
+        content='\n'.join(sections),
+    )
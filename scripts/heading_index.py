@@ -0,0 +1,43 @@
+"""
+Site-wide index of lecture headings, built from the parse pass.
+
+parse_markdown() assigns every heading its id and records the document's
+outline. The build writes each lecture's outline to
+Lectures/headings/lecture-NN.json and merges them into
+Lectures/headings/index.json:
+
+    {"lectures": [{"lecture": 7, "title": "...", "url": "../html/lecture-07.html",
+                   "headings": [{"level": 2, "id": "71-introduction",
+                                 "text": "7.1 Introduction", "number": "7.1"}, ...]},
+                  ...]}
+
+URLs are relative to Lectures/headings/. Tools that need the structure of the
+lectures (audit_numbering.py, cross-links) read the index instead of parsing
+markdown or scanning HTML again.
+"""
+
+import json
+from pathlib import Path
+
+HEADINGS_DIR = Path('Lectures/headings')
+HEADING_INDEX_PATH = HEADINGS_DIR / 'index.json'
+
+
+def lecture_outline(doc, lecture_num, title, url):
+    """The index entry of one lecture; the H1 page title is left out."""
+    return {'lecture': lecture_num, 'title': title, 'url': url,
+            'headings': [heading for heading in doc.attrs['outline'] if heading['level'] > 1]}
+
+
+def dump_outline(data):
+    return json.dumps(data, ensure_ascii=False, indent=1) + '\n'
+
+
+def build_heading_index(outlines):
+    """index.json for a list of lecture entries."""
+    return {'lectures': sorted(outlines, key=lambda outline: outline['lecture'])}
+
+
+def load_heading_index(path=HEADING_INDEX_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,184 @@
+"""
+Build-time syntax highlighting for fenced code blocks in the lecture notes.
+
+Code is split into tokens with one regular expression per language and
+emitted as `<span class="token TYPE">`, the markup Prism produces in the
+browser, so the token colours in assets/css/style.css apply unchanged and
+pages need no highlighting JavaScript.
+
+Grammars cover what the lectures contain: ARM assembly (with the MIPS-style
+`$reg` operands and `#` comments some pipeline examples use), C, Verilog and
+bash. Unknown languages are escaped and returned without spans.
+"""
+
+import html
+import re
+
+# Fence names accepted for each grammar
+LANGUAGE_ALIASES = {
+    'armasm': 'armasm',
+    'arm': 'armasm',
+    'asm': 'armasm',
+    'assembly': 'armasm',
+    's': 'armasm',
+    'c': 'c',
+    'h': 'c',
+    'verilog': 'verilog',
+    'v': 'verilog',
+    'systemverilog': 'verilog',
+    'sv': 'verilog',
+    'bash': 'bash',
+    'sh': 'bash',
+    'shell': 'bash',
+    'console': 'bash',
+}
+
+STRING = r'"(?:\\.|[^"\\\n])*"'
+CHAR = r"'(?:\\.|[^'\\\n])'"
+C_COMMENT = r'//.*|/\*[\s\S]*?\*/'
+WORD = r'[A-Za-z_][\w.]*'
+# Command names and arguments such as arm-linux-gnueabi-gcc or ./program
+SHELL_WORD = r'[A-Za-z_.~/][\w.~/+-]*'
+CALL_RE = re.compile(r'[ \t]*\(')
+
+ARM_REGISTERS = re.compile(
+    r'(?:r(?:1[0-5]|[0-9])|[xwvqdsbh](?:[12]?[0-9]|3[01])|sp|lr|pc|fp|ip|xzr|wzr|[ac]psr|spsr)$',
+    re.I)
+
+C_KEYWORDS = {
+    'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do', 'double', 'else',
+    'enum', 'extern', 'float', 'for', 'goto', 'if', 'inline', 'int', 'long', 'register',
+    'restrict', 'return', 'short', 'signed', 'sizeof', 'static', 'struct', 'switch', 'typedef',
+    'union', 'unsigned', 'void', 'volatile', 'while', 'bool', 'true', 'false', 'NULL',
+    'uint8_t', 'uint16_t', 'uint32_t', 'uint64_t', 'int8_t', 'int16_t', 'int32_t', 'int64_t',
+    'size_t',
+}
+
+VERILOG_KEYWORDS = {
+    'always', 'always_comb', 'always_ff', 'always_latch', 'and', 'assign', 'begin', 'case',
+    'casex', 'casez', 'default', 'else', 'end', 'endcase', 'endfunction', 'endgenerate',
+    'endmodule', 'endtask', 'for', 'function', 'generate', 'genvar', 'if', 'initial', 'inout',
+    'input', 'integer', 'localparam', 'logic', 'module', 'negedge', 'nand', 'nor', 'not', 'or',
+    'output', 'parameter', 'posedge', 'reg', 'signed', 'task', 'timescale', 'wire', 'xor',
+}
+
+BASH_KEYWORDS = {
+    'case', 'do', 'done', 'elif', 'else', 'esac', 'export', 'fi', 'for', 'function', 'if', 'in',
+    'local', 'return', 'select', 'then', 'until', 'while',
+}
+
+
+class Grammar:
+    """
+    Token patterns for one language, tried in order at each position.
+
+    Words that no pattern claims are passed to `classify(word, text, end,
+    first)`, where `first` is true for the first word of a line (labels and
+    punctuation aside), and that returns a token type or None.
+    """
+
+    def __init__(self, patterns, classify, word=WORD):
+        self.types = [token_type for token_type, _ in patterns] + ['word']
+        self.regex = re.compile('|'.join(f'({pattern})' for _, pattern in patterns) + f'|({word})',
+                                re.M)
+        self.classify = classify
+
+
+def classify_arm(word, text, end, first):
+    if text.startswith(':', end):
+        return 'function'
+    if ARM_REGISTERS.match(word):
+        return 'variable'
+    return 'keyword' if first else None
+
+
+def classify_c(word, text, end, first):
+    if word in C_KEYWORDS:
+        return 'keyword'
+    return 'function' if CALL_RE.match(text, end) else None
+
+
+def classify_verilog(word, text, end, first):
+    return 'keyword' if word in VERILOG_KEYWORDS else None
+
+
+def classify_bash(word, text, end, first):
+    if word in BASH_KEYWORDS:
+        return 'keyword'
+    # The command of each line
+    return 'function' if first else None
+
+
+GRAMMARS = {
+    'armasm': Grammar([
+        ('comment', C_COMMENT + r'|[;@].*|#(?=\s|$).*'),
+        ('string', STRING + '|' + CHAR),
+        ('builtin', r'(?<![\w.])\.[A-Za-z_]\w*'),
+        ('number', r'#?[-+]?(?:0[xX][\da-fA-F]+|0[bB][01]+|\d+)\b'),
+        ('variable', r'\$\w+'),
+        ('operator', r'[-+*/=<>^&|~!]'),
+        ('punctuation', r'[\[\]{}(),]'),
+    ], classify_arm),
+    'c': Grammar([
+        ('comment', C_COMMENT),
+        ('property', r'^[ \t]*#[ \t]*\w+.*'),
+        ('string', STRING),
+        ('char', CHAR),
+        ('number', r'\b(?:0[xX][\da-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?)[uUlLfF]*\b'),
+        ('operator', r'[-+*/%=<>!&|^~?:]+'),
+        ('punctuation', r'[\[\]{}();,.]'),
+    ], classify_c),
+    'verilog': Grammar([
+        ('comment', C_COMMENT),
+        ('property', r'`\w+'),
+        ('string', STRING),
+        ('builtin', r'\$\w+'),
+        ('number', r"\d*'[sS]?[bBoOdDhH][\da-fA-F_xXzZ?]+|\b\d[\d_]*(?:\.\d+)?\b"),
+        ('operator', r'[-+*/%=<>!&|^~?:]+'),
+        ('punctuation', r'[\[\]{}();,.@#]'),
+    ], classify_verilog),
+    'bash': Grammar([
+        ('comment', r'(?:^|(?<=\s))#.*'),
+        ('string', r'"(?:\\.|[^"\\])*"|\'[^\']*\''),
+        ('variable', r'\$(?:\{[^}\n]*\}|\w+|[@*#?$!0-9-])'),
+        ('operator', r'&&|\|\||[|&;<>]'),
+        ('number', r'(?<![\w-])\d+\b(?![\w.-])'),
+    ], classify_bash, word=SHELL_WORD),
+}
+
+
+def canonical_language(lang):
+    """The grammar name for a fence language, or None when there is none."""
+    return LANGUAGE_ALIASES.get(lang.lower())
+
+
+def highlight(code, lang):
+    """Return `code` as HTML, with token spans when `lang` has a grammar."""
+    grammar = GRAMMARS.get(canonical_language(lang) or '')
+    if grammar is None:
+        return html.escape(code, quote=False)
+
+    out = []
+    pos = 0
+    first = True
+    for match in grammar.regex.finditer(code):
+        start, end = match.span()
+        gap = code[pos:start]
+        if '\n' in gap:
+            first = True
+        out.append(html.escape(gap, quote=False))
+        token_type = grammar.types[match.lastindex - 1]
+        text = match.group()
+        if token_type == 'word':
+            token_type = grammar.classify(text, code, end, first)
+            # A label leaves the instruction after it first on its line
+            first = first and token_type == 'function' and code.startswith(':', end)
+        elif token_type != 'punctuation' or text not in '()':
+            first = first and token_type == 'comment'
+        if token_type == 'comment' and '\n' in text:
+            first = True
+        escaped = html.escape(text, quote=False)
+        out.append(f'<span class="token {token_type}">{escaped}</span>' if token_type else escaped)
+        pos = end
+    out.append(html.escape(code[pos:], quote=False))
+    return ''.join(out)
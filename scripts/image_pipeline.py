@@ -0,0 +1,297 @@
+"""
+Responsive image variants for the lecture diagrams in Lectures/img.
+
+Each source image is re-encoded at a few widths in modern formats (AVIF and
+WebP, whichever this Pillow build supports). Variant file names embed the
+source's content hash, so an existing file is always current and can be
+cached forever; a small JSON cache keyed by file stat avoids re-hashing
+unchanged sources on every build.
+
+Pixel sizes are read straight from the JPEG/PNG/GIF headers, so they are
+known even without Pillow. Each opaque image also gets a tiny blurred
+placeholder, kept in the cache as a data: URI, that pages paint behind the
+image until it arrives. Pillow is optional: without it no variants or
+placeholders are produced and pages keep their plain <img> tags.
+"""
+
+import base64
+import io
+import json
+import os
+import re
+import struct
+from pathlib import Path
+
+from build_manifest import hash_bytes, hash_file
+from parallel_jobs import run_in_order
+
+try:
+    from PIL import Image, ImageFilter, ImageOps, features
+except ImportError:
+    Image = None
+
+IMAGE_DIR = Path('Lectures/img')
+VARIANT_DIR = Path('Lectures/img-variants')
+CACHE_NAME = '.image-cache.json'
+CACHE_VERSION = 3
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+# Roughly phone, laptop and 2x laptop widths of the 740px content column
+VARIANT_WIDTHS = (480, 960, 1440)
+# Browsers use the first <source> whose type they support, so best first
+VARIANT_FORMATS = {
+    'avif': ('image/avif', {'quality': 55}),
+    'webp': ('image/webp', {'quality': 80, 'method': 6}),
+}
+
+
+# Placeholder width in pixels; the browser's upscaling does most of the blurring
+PLACEHOLDER_WIDTH = 24
+
+# JPEG start-of-frame markers; C4, C8 and CC share the range but are not frames
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+# EXIF orientations that rotate the image by 90 degrees
+EXIF_TRANSPOSED = {5, 6, 7, 8}
+
+
+def _exif_orientation(segment):
+    """Return the orientation tag of an APP1 Exif segment, or 1."""
+    if not segment.startswith(b'Exif\0\0') or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None:
+        return 1
+    offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = tiff[offset + 2 + 12 * i:offset + 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        tag, _, _, value = struct.unpack(endian + 'HHIH', entry[:10])
+        if tag == 0x0112:
+            return value
+    return 1
+
+
+def _jpeg_size(f):
+    orientation = 1
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            if orientation in EXIF_TRANSPOSED:
+                width, height = height, width
+            return width, height
+        if marker == 0xE1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path):
+    """
+    Return the displayed (width, height) of a JPEG, PNG or GIF from its header.
+
+    Only the header is read, never the pixel data. Returns None for other or
+    malformed files.
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(24)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head.startswith(b'\xff\xd8'):
+                return _jpeg_size(f)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def available_formats():
+    """Variant formats this Pillow build can encode, best first."""
+    if Image is None:
+        return []
+    return [fmt for fmt in VARIANT_FORMATS if features.check(fmt)]
+
+
+def variant_widths(width):
+    """Target widths for an image `width` pixels wide; never upscales."""
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    widths.append(min(width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def variant_name(source_name, sha, width, fmt):
+    stem = re.sub(r'[^A-Za-z0-9_-]+', '-', Path(source_name).stem).strip('-').lower()
+    return f'{stem}-{sha[:10]}-{width}.{fmt}'
+
+
+def make_placeholder(path):
+    """
+    Return a data: URI of a tiny blurred copy of an image (a few hundred bytes).
+
+    Returns None without Pillow and for images with transparency, where a
+    placeholder would show through the loaded image.
+    """
+    if Image is None:
+        return None
+    with Image.open(path) as image:
+        if 'A' in image.getbands() or 'transparency' in image.info:
+            return None
+        # JPEG draft mode decodes at a fraction of full size
+        image.draft('RGB', (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+        thumb = image.resize((PLACEHOLDER_WIDTH, height), Image.BOX).filter(ImageFilter.GaussianBlur(0.6))
+    fmt, mime = ('WEBP', 'image/webp') if features.check('webp') else ('JPEG', 'image/jpeg')
+    buffer = io.BytesIO()
+    thumb.save(buffer, fmt, quality=50)
+    return f'data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode("ascii")}'
+
+
+def make_variants(task):
+    """Encode the missing variants of one image (runs in a worker)."""
+    source, variant_dir, missing = task
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for fmt, width, name in missing:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            resized.save(Path(variant_dir) / name, fmt.upper(), **VARIANT_FORMATS[fmt][1])
+    return len(missing)
+
+
+class ImageCatalog:
+    """Source images with their pixel size and responsive variants."""
+
+    def __init__(self, image_dir=IMAGE_DIR, variant_dir=VARIANT_DIR):
+        self.image_dir = Path(image_dir)
+        self.variant_dir = Path(variant_dir)
+        self.cache_path = self.variant_dir / CACHE_NAME
+        self.images = {}
+        self.dirty = False
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == CACHE_VERSION:
+            self.images = data.get('images', {})
+        return self
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.variant_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'images': self.images}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.dirty = False
+
+    def source_files(self):
+        if not self.image_dir.is_dir():
+            return []
+        return sorted(path for path in self.image_dir.iterdir()
+                      if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file())
+
+    def describe(self, path, st):
+        """Hash and measure one source image."""
+        info = {'stamp': [st.st_mtime_ns, st.st_size], 'sha': hash_file(path), 'variants': {}}
+        size = read_image_size(path)
+        if size is not None:
+            info['width'], info['height'] = size
+        return info
+
+    def placeholder(self, path, info, previous):
+        """Placeholder for an image, reused while its content hash is unchanged."""
+        if previous is not None and previous['sha'] == info['sha'] and 'placeholder' in previous:
+            return previous['placeholder']
+        try:
+            return make_placeholder(path)
+        except OSError as e:
+            print(f"Failed: placeholder for {path.name}: {e}")
+            return None
+
+    def refresh(self, jobs=1):
+        """Bring the catalog and the variant files up to date; returns {file name: info}."""
+        formats = available_formats()
+        images = {}
+        tasks = []
+        for path in self.source_files():
+            st = path.stat()
+            previous = info = self.images.get(path.name)
+            if info is None or info['stamp'] != [st.st_mtime_ns, st.st_size]:
+                info = self.describe(path, st)
+                self.dirty = True
+            if Image is not None and 'placeholder' not in info:
+                info['placeholder'] = self.placeholder(path, info, previous)
+                self.dirty = True
+            images[path.name] = info
+
+            if 'width' not in info or not formats:
+                continue
+            variants = {fmt: [[width, variant_name(path.name, info['sha'], width, fmt)]
+                              for width in variant_widths(info['width'])]
+                        for fmt in formats}
+            if variants != info['variants']:
+                info['variants'] = variants
+                self.dirty = True
+            missing = [(fmt, width, name) for fmt, entries in variants.items()
+                       for width, name in entries if not (self.variant_dir / name).exists()]
+            if missing:
+                tasks.append((str(path), str(self.variant_dir), missing))
+
+        if tasks:
+            self.variant_dir.mkdir(parents=True, exist_ok=True)
+            for (source, _, missing), _, error in run_in_order(make_variants, tasks, jobs):
+                if error is not None:
+                    print(f"Failed: image variants for {Path(source).name}: {error}")
+                    images[Path(source).name]['variants'] = {}
+                else:
+                    print(f"Encoded {len(missing)} variant(s) of {Path(source).name}")
+
+        if images.keys() != self.images.keys():
+            self.dirty = True
+        self.images = images
+        self.remove_orphans()
+        self.save()
+        return images
+
+    def remove_orphans(self):
+        """Delete variant files that no current source refers to."""
+        if not self.variant_dir.is_dir():
+            return
+        wanted = {name for info in self.images.values()
+                  for entries in info['variants'].values() for _, name in entries}
+        for entry in os.scandir(self.variant_dir):
+            if entry.is_file() and not entry.name.startswith('.') and entry.name not in wanted:
+                os.unlink(entry.path)
+
+    def signature(self):
+        """Short hash of every image and variant, for the build manifest."""
+        parts = [f"{name}:{info['sha']}:{json.dumps(info['variants'], sort_keys=True)}:"
+                 f"{info.get('placeholder')}"
+                 for name, info in sorted(self.images.items())]
+        return hash_bytes(';'.join(parts))[:16]
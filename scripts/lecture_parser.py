@@ -0,0 +1,898 @@
+"""
+Single-pass Markdown parser for the lecture notes.
+
+Parses a lecture once into a small document tree. The HTML emitter in
+convert_lectures.py and the LaTeX emitter in md_to_latex_converter.py both
+walk the same tree instead of re-tokenizing the markdown themselves.
+
+Block structure is recognised in one forward scan over the lines; inline
+content is tokenized in one scan per block using a delimiter stack for
+emphasis, so the cost grows linearly with the size of the document.
+"""
+
+import html
+import re
+
+from tex_math import TexMathError, parse_math
+
+
+class Node:
+    """A node in the document tree."""
+
+    __slots__ = ('type', 'children', 'text', 'attrs')
+
+    def __init__(self, type, children=None, text='', **attrs):
+        self.type = type
+        self.children = children if children is not None else []
+        self.text = text
+        self.attrs = attrs
+
+    def __repr__(self):
+        if self.children:
+            return f'Node({self.type!r}, {self.children!r})'
+        return f'Node({self.type!r}, text={self.text!r})'
+
+    def walk(self):
+        """Yield this node and all of its descendants in document order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def plain_text(self):
+        """Return the concatenated text content of this node."""
+        if self.type in ('text', 'code', 'math'):
+            return self.text
+        if self.type == 'image':
+            return self.attrs.get('alt', '')
+        return ''.join(child.plain_text() for child in self.children)
+
+
+# =============================================================================
+# BLOCK PATTERNS
+# =============================================================================
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})\s*([^`\s]*)')
+HEADING_RE = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+HR_RE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+LIST_ITEM_RE = re.compile(r'^( {0,3})([-*+]|\d{1,9}[.)])([ \t]+|$)')
+BLOCKQUOTE_RE = re.compile(r'^ {0,3}> ?')
+TABLE_DELIM_RE = re.compile(r'^ {0,3}\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+HTML_BLOCK_RE = re.compile(
+    r'^ {0,3}</?(address|article|aside|blockquote|center|details|dialog|div|dl|'
+    r'figcaption|figure|footer|h[1-6]|header|hr|img|li|nav|ol|p|picture|pre|'
+    r'section|summary|table|tbody|td|tfoot|th|thead|tr|ul)(?=[\s/>]|$)',
+    re.IGNORECASE
+)
+
+
+def _indent_width(line):
+    """Return the visual indentation of a line, counting tabs as 4 columns."""
+    width = 0
+    for ch in line:
+        if ch == ' ':
+            width += 1
+        elif ch == '\t':
+            width += 4 - width % 4
+        else:
+            break
+    return width
+
+
+def _dedent(line, width):
+    """Remove up to `width` columns of leading indentation from a line."""
+    removed = 0
+    i = 0
+    while i < len(line) and removed < width:
+        if line[i] == ' ':
+            removed += 1
+        elif line[i] == '\t':
+            tab = 4 - removed % 4
+            if removed + tab > width:
+                return ' ' * (removed + tab - width) + line[i + 1:]
+            removed += tab
+        else:
+            break
+        i += 1
+    return line[i:]
+
+
+def _starts_block(line):
+    """Return True if a line would interrupt a running paragraph."""
+    if FENCE_RE.match(line) or HEADING_RE.match(line) or HR_RE.match(line):
+        return True
+    if BLOCKQUOTE_RE.match(line) or HTML_BLOCK_RE.match(line):
+        return True
+    stripped = line.strip()
+    if stripped.startswith('$$') or stripped.startswith('<!--'):
+        return True
+    match = LIST_ITEM_RE.match(line)
+    return bool(match and match.group(3))
+
+
+def _split_table_row(line):
+    """Split a table row into stripped cell strings."""
+    row = line.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|') and not row.endswith('\\|'):
+        row = row[:-1]
+    cells = []
+    current = []
+    i = 0
+    while i < len(row):
+        ch = row[i]
+        if ch == '\\' and i + 1 < len(row) and row[i + 1] == '|':
+            current.append('|')
+            i += 2
+            continue
+        if ch == '|':
+            cells.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    cells.append(''.join(current).strip())
+    return cells
+
+
+class BlockParser:
+    """Recognises block structure in one forward pass over the lines."""
+
+    def parse(self, lines):
+        """Parse a list of lines into a list of block nodes."""
+        blocks = []
+        i = 0
+        n = len(lines)
+
+        while i < n:
+            line = lines[i]
+            stripped = line.strip()
+
+            # Blank lines only separate blocks
+            if not stripped:
+                i += 1
+                continue
+
+            # Indented code block
+            if _indent_width(line) >= 4:
+                i = self._parse_indented_code(lines, i, blocks)
+                continue
+
+            fence = FENCE_RE.match(line)
+            if fence:
+                i = self._parse_fenced_code(lines, i, fence, blocks)
+                continue
+
+            heading = HEADING_RE.match(line)
+            if heading:
+                level = len(heading.group(1))
+                text = heading.group(2) or ''
+                blocks.append(Node('heading', parse_inline(text), level=level))
+                i += 1
+                continue
+
+            if HR_RE.match(line):
+                blocks.append(Node('hr'))
+                i += 1
+                continue
+
+            if stripped.startswith('$$'):
+                i = self._parse_math_block(lines, i, blocks)
+                continue
+
+            if stripped.startswith('<!--'):
+                i = self._parse_comment(lines, i, blocks)
+                continue
+
+            if HTML_BLOCK_RE.match(line):
+                i = self._parse_html_block(lines, i, blocks)
+                continue
+
+            if BLOCKQUOTE_RE.match(line):
+                i = self._parse_blockquote(lines, i, blocks)
+                continue
+
+            item = LIST_ITEM_RE.match(line)
+            if item:
+                i = self._parse_list(lines, i, item, blocks)
+                continue
+
+            if '|' in line and i + 1 < n and TABLE_DELIM_RE.match(lines[i + 1]) \
+                    and '-' in lines[i + 1]:
+                i = self._parse_table(lines, i, blocks)
+                continue
+
+            i = self._parse_paragraph(lines, i, blocks)
+
+        return blocks
+
+    def _parse_indented_code(self, lines, i, blocks):
+        code_lines = []
+        n = len(lines)
+        while i < n and (not lines[i].strip() or _indent_width(lines[i]) >= 4):
+            code_lines.append(_dedent(lines[i], 4))
+            i += 1
+        while code_lines and not code_lines[-1].strip():
+            code_lines.pop()
+        blocks.append(Node('code_block', text='\n'.join(code_lines), lang=''))
+        return i
+
+    def _parse_fenced_code(self, lines, i, fence, blocks):
+        marker = fence.group(1)
+        lang = fence.group(2).lower()
+        indent = _indent_width(lines[i])
+        closing = re.compile(r'^ {0,3}' + re.escape(marker[0]) + '{' + str(len(marker)) + r',}\s*$')
+        code_lines = []
+        i += 1
+        n = len(lines)
+        while i < n and not closing.match(lines[i]):
+            code_lines.append(_dedent(lines[i], indent))
+            i += 1
+        blocks.append(Node('code_block', text='\n'.join(code_lines), lang=lang))
+        return i + 1
+
+    def _parse_math_block(self, lines, i, blocks):
+        first = lines[i].strip()[2:]
+        # Single-line display math: $$ ... $$
+        if first.rstrip().endswith('$$') and len(first.rstrip()) >= 2:
+            blocks.append(Node('math_block', text=first.rstrip()[:-2].strip()))
+            return i + 1
+        body = [first] if first.strip() else []
+        i += 1
+        n = len(lines)
+        while i < n:
+            stripped = lines[i].rstrip()
+            if stripped.endswith('$$'):
+                tail = stripped[:-2]
+                if tail.strip():
+                    body.append(tail)
+                i += 1
+                break
+            body.append(lines[i])
+            i += 1
+        blocks.append(Node('math_block', text='\n'.join(body).strip('\n')))
+        return i
+
+    def _parse_comment(self, lines, i, blocks):
+        comment = []
+        n = len(lines)
+        while i < n:
+            comment.append(lines[i])
+            i += 1
+            if '-->' in comment[-1]:
+                break
+        blocks.append(Node('comment', text='\n'.join(comment)))
+        return i
+
+    def _parse_html_block(self, lines, i, blocks):
+        raw = []
+        n = len(lines)
+        while i < n and lines[i].strip():
+            raw.append(lines[i])
+            i += 1
+        blocks.append(Node('html_block', parse_html_fragment('\n'.join(raw))))
+        return i
+
+    def _parse_blockquote(self, lines, i, blocks):
+        inner = []
+        n = len(lines)
+        while i < n:
+            line = lines[i]
+            marker = BLOCKQUOTE_RE.match(line)
+            if marker:
+                inner.append(line[marker.end():])
+            elif line.strip() and inner and inner[-1].strip() and not _starts_block(line):
+                # Lazy continuation of a quoted paragraph
+                inner.append(line)
+            else:
+                break
+            i += 1
+        blocks.append(Node('blockquote', self.parse(inner)))
+        return i
+
+    def _parse_list(self, lines, i, first_item, blocks):
+        marker = first_item.group(2)
+        ordered = marker[0].isdigit()
+        delimiter = marker[-1] if ordered else marker
+        start = int(marker[:-1]) if ordered else None
+        base_indent = len(first_item.group(1))
+
+        items = []
+        loose = False
+        n = len(lines)
+
+        while i < n:
+            match = LIST_ITEM_RE.match(lines[i])
+            if not match or not self._same_list(match, ordered, delimiter, base_indent):
+                break
+            item_marker = match.group(2)
+
+            # Continuation lines must be indented past the marker and its padding
+            rest = lines[i][match.end():]
+            content_indent = len(match.group(1)) + len(item_marker)
+            if rest.strip() and _indent_width(match.group(3)) <= 4:
+                content_indent += _indent_width(match.group(3))
+            else:
+                content_indent += 1
+
+            item_lines = [rest]
+            i += 1
+            saw_blank = False
+
+            while i < n:
+                line = lines[i]
+                if not line.strip():
+                    item_lines.append('')
+                    saw_blank = True
+                    i += 1
+                    continue
+                if _indent_width(line) >= content_indent:
+                    item_lines.append(_dedent(line, content_indent))
+                    i += 1
+                    continue
+                if not saw_blank and item_lines[-1].strip() and not _starts_block(line):
+                    # Lazy paragraph continuation
+                    item_lines.append(line.strip())
+                    i += 1
+                    continue
+                break
+
+            # Trailing blank lines belong to the gap between items
+            trailing = 0
+            while item_lines and not item_lines[-1].strip():
+                item_lines.pop()
+                trailing += 1
+            if any(not line.strip() for line in item_lines):
+                # A blank line between two blocks inside the item
+                children = self.parse(item_lines)
+                if len(children) > 1:
+                    loose = True
+            else:
+                children = self.parse(item_lines)
+            items.append(Node('list_item', children))
+
+            if trailing:
+                next_item = LIST_ITEM_RE.match(lines[i]) if i < n else None
+                if next_item and self._same_list(next_item, ordered, delimiter, base_indent):
+                    loose = True
+                else:
+                    break
+
+        blocks.append(Node('list', items, ordered=ordered, start=start, tight=not loose))
+        return i
+
+    @staticmethod
+    def _same_list(match, ordered, delimiter, base_indent):
+        """Return True if a list item match continues the current list."""
+        marker = match.group(2)
+        if len(match.group(1)) > base_indent + 3 or ordered != marker[0].isdigit():
+            return False
+        return marker[-1] == delimiter
+
+    def _parse_table(self, lines, i, blocks):
+        header = _split_table_row(lines[i])
+        aligns = []
+        for cell in _split_table_row(lines[i + 1]):
+            left = cell.startswith(':')
+            right = cell.endswith(':')
+            if left and right:
+                aligns.append('center')
+            elif right:
+                aligns.append('right')
+            elif left:
+                aligns.append('left')
+            else:
+                aligns.append(None)
+        i += 2
+
+        rows = []
+        n = len(lines)
+        while i < n and lines[i].strip() and '|' in lines[i] and not _starts_block(lines[i]):
+            cells = _split_table_row(lines[i])
+            cells = (cells + [''] * len(header))[:len(header)]
+            rows.append(Node('table_row', [Node('table_cell', parse_inline(c)) for c in cells]))
+            i += 1
+
+        head = Node('table_row', [Node('table_cell', parse_inline(c)) for c in header])
+        blocks.append(Node('table', [head] + rows, aligns=aligns[:len(header)]))
+        return i
+
+    def _parse_paragraph(self, lines, i, blocks):
+        para = [lines[i]]
+        i += 1
+        n = len(lines)
+        while i < n and lines[i].strip() and not _starts_block(lines[i]):
+            if '|' in lines[i] and i + 1 < n and TABLE_DELIM_RE.match(lines[i + 1]) \
+                    and '-' in lines[i + 1]:
+                break
+            para.append(lines[i])
+            i += 1
+        # Trailing double spaces are kept so the inline pass can see hard breaks
+        text = '\n'.join(line.lstrip() for line in para)
+        blocks.append(Node('paragraph', parse_inline(text.rstrip())))
+        return i
+
+
+# =============================================================================
+# INLINE PARSING
+# =============================================================================
+
+ESCAPABLE = set('\\`*_{}[]()#+-.!|<>~"\'$&:;=?@^')
+PUNCTUATION = set('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+ENTITY_RE = re.compile(r'&(?:#\d{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});')
+TAG_RE = re.compile(
+    r'<(?:[A-Za-z][A-Za-z0-9-]*(?:\s+[A-Za-z_:][\w.:-]*(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))?)*\s*/?'
+    r'|/[A-Za-z][A-Za-z0-9-]*\s*)>'
+)
+ATTR_RE = re.compile(r'([A-Za-z_:][\w.:-]*)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'=<>`]+)))?')
+# Characters that may start inline markup; everything else is plain text
+SPECIAL_CHAR_RE = re.compile(r'[\\`*_\[\]!<&\n$]')
+AUTOLINK_RE = re.compile(r'<((?:https?|ftp|mailto):[^\s<>]*)>')
+
+
+def parse_tag(tag):
+    """Return the (name, attrs) of a raw HTML tag string."""
+    match = re.match(r'<\s*/?\s*([A-Za-z][A-Za-z0-9-]*)', tag)
+    name = match.group(1).lower() if match else ''
+    attrs = {}
+    body = tag[match.end():] if match else ''
+    for attr in ATTR_RE.finditer(body.rstrip('/>')):
+        value = next((v for v in attr.group(2, 3, 4) if v is not None), '')
+        attrs[attr.group(1).lower()] = html.unescape(value)
+    return name, attrs
+
+
+def _html_node(tag):
+    """Turn a raw inline tag into an image node or an opaque html node."""
+    name, attrs = parse_tag(tag)
+    if name == 'img' and 'src' in attrs:
+        src = attrs.pop('src')
+        alt = attrs.pop('alt', '')
+        return Node('image', src=src, alt=alt, html_attrs=attrs)
+    return Node('html', text=tag)
+
+
+def parse_html_fragment(text):
+    """Split raw HTML into tag, image and text nodes without markdown processing."""
+    nodes = []
+    pos = 0
+    for tag in TAG_RE.finditer(text):
+        if tag.start() > pos:
+            nodes.append(Node('text', text=html.unescape(text[pos:tag.start()])))
+        nodes.append(_html_node(tag.group(0)))
+        pos = tag.end()
+    if pos < len(text):
+        nodes.append(Node('text', text=html.unescape(text[pos:])))
+    return nodes
+
+
+class _Delimiter:
+    """A run of `*` or `_` characters on the emphasis delimiter stack."""
+
+    __slots__ = ('char', 'count', 'node', 'can_open', 'can_close')
+
+    def __init__(self, char, count, node, can_open, can_close):
+        self.char = char
+        self.count = count
+        self.node = node
+        self.can_open = can_open
+        self.can_close = can_close
+
+
+class InlineParser:
+    """Tokenizes inline markdown in a single left-to-right scan."""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.nodes = []
+        self.delimiters = []
+        self.brackets = []
+        self.buffer = []
+
+    def parse(self):
+        text = self.text
+        n = len(text)
+
+        while self.pos < n:
+            # Runs of ordinary characters are buffered as text in one step
+            special = SPECIAL_CHAR_RE.search(text, self.pos)
+            if special is None:
+                self.buffer.append(text[self.pos:])
+                break
+            if special.start() > self.pos:
+                self.buffer.append(text[self.pos:special.start()])
+                self.pos = special.start()
+            ch = text[self.pos]
+
+            if ch == '\\':
+                self._backslash()
+            elif ch == '`':
+                self._code_span()
+            elif ch in '*_':
+                self._delimiter_run(ch)
+            elif ch == '[':
+                self._open_bracket(image=False)
+            elif ch == '!' and self.pos + 1 < n and text[self.pos + 1] == '[':
+                self.pos += 1
+                self._open_bracket(image=True)
+            elif ch == ']':
+                self._close_bracket()
+            elif ch == '<':
+                self._angle()
+            elif ch == '&':
+                self._entity()
+            elif ch == '\n':
+                self._newline()
+            elif ch == '$' and text.startswith('$$', self.pos):
+                if not self._math('$$', '$$', display=True):
+                    self.buffer.append('$$')
+                    self.pos += 2
+            else:
+                self.buffer.append(ch)
+                self.pos += 1
+
+        self._flush()
+        self._process_emphasis(0)
+        return self._merge_text(self.nodes)
+
+    # -- helpers -------------------------------------------------------------
+
+    def _flush(self):
+        if self.buffer:
+            self.nodes.append(Node('text', text=''.join(self.buffer)))
+            self.buffer = []
+
+    def _push(self, node):
+        self._flush()
+        self.nodes.append(node)
+
+    def _backslash(self):
+        text = self.text
+        nxt = text[self.pos + 1] if self.pos + 1 < len(text) else ''
+        if nxt in '([' and self._math('\\' + nxt, '\\)' if nxt == '(' else '\\]', nxt == '['):
+            return
+        if nxt == '\n':
+            self._push(Node('linebreak'))
+            self.pos += 2
+            return
+        if nxt and nxt in ESCAPABLE:
+            self.buffer.append(nxt)
+            self.pos += 2
+            return
+        self.buffer.append('\\')
+        self.pos += 1
+
+    def _math(self, opener, closer, display):
+        """Consume a math span; leave the position untouched if it is unclosed."""
+        end = self.text.find(closer, self.pos + len(opener))
+        if end == -1:
+            return False
+        body = self.text[self.pos + len(opener):end]
+        self._push(Node('math', text=body, display=display))
+        self.pos = end + len(closer)
+        return True
+
+    def _code_span(self):
+        text = self.text
+        start = self.pos
+        while self.pos < len(text) and text[self.pos] == '`':
+            self.pos += 1
+        ticks = text[start:self.pos]
+        search = self.pos
+        while True:
+            end = text.find(ticks, search)
+            if end == -1:
+                # No matching run: the backticks are literal
+                self.buffer.append(ticks)
+                return
+            after = end + len(ticks)
+            if after < len(text) and text[after] == '`':
+                # Longer run than the opener; keep looking past it
+                while after < len(text) and text[after] == '`':
+                    after += 1
+                search = after
+                continue
+            break
+        code = text[self.pos:end].replace('\n', ' ')
+        if len(code) > 2 and code[0] == ' ' and code[-1] == ' ' and code.strip():
+            code = code[1:-1]
+        self._push(Node('code', text=code))
+        self.pos = end + len(ticks)
+
+    def _delimiter_run(self, ch):
+        text = self.text
+        start = self.pos
+        while self.pos < len(text) and text[self.pos] == ch:
+            self.pos += 1
+        before = text[start - 1] if start > 0 else ' '
+        after = text[self.pos] if self.pos < len(text) else ' '
+
+        left_flanking = not after.isspace() and (
+            after not in PUNCTUATION or before.isspace() or before in PUNCTUATION)
+        right_flanking = not before.isspace() and (
+            before not in PUNCTUATION or after.isspace() or after in PUNCTUATION)
+
+        if ch == '*':
+            can_open, can_close = left_flanking, right_flanking
+        else:
+            can_open = left_flanking and (not right_flanking or before in PUNCTUATION)
+            can_close = right_flanking and (not left_flanking or after in PUNCTUATION)
+
+        node = Node('text', text=text[start:self.pos])
+        self._push(node)
+        if can_open or can_close:
+            self.delimiters.append(
+                _Delimiter(ch, self.pos - start, node, can_open, can_close))
+
+    def _open_bracket(self, image):
+        node = Node('text', text='![' if image else '[')
+        self._push(node)
+        self.brackets.append((node, image, len(self.delimiters)))
+        self.pos += 1
+
+    def _close_bracket(self):
+        self.pos += 1
+        if not self.brackets:
+            self.buffer.append(']')
+            return
+
+        opener, image, delim_index = self.brackets[-1]
+        dest = self._link_destination()
+        if dest is None:
+            self.brackets.pop()
+            self.buffer.append(']')
+            return
+
+        self._flush()
+        self.brackets.pop()
+        index = next(k for k in range(len(self.nodes) - 1, -1, -1) if self.nodes[k] is opener)
+        self._process_emphasis(delim_index)
+        children = self._merge_text(self.nodes[index + 1:])
+        del self.nodes[index:]
+
+        url, title = dest
+        if image:
+            alt = ''.join(child.plain_text() for child in children)
+            self.nodes.append(Node('image', src=url, alt=alt, title=title, html_attrs={}))
+        else:
+            self.nodes.append(Node('link', children, href=url, title=title))
+            # Links may not contain other links
+            self.brackets = [b for b in self.brackets if b[1]]
+
+    def _link_destination(self):
+        """Parse `(url "title")` after a closing bracket; return None if absent."""
+        text = self.text
+        if self.pos >= len(text) or text[self.pos] != '(':
+            return None
+        i = self.pos + 1
+        depth = 0
+        start = i
+        while i < len(text):
+            ch = text[i]
+            if ch == '\\' and i + 1 < len(text):
+                i += 2
+                continue
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                if depth == 0:
+                    break
+                depth -= 1
+            elif ch == '\n' and depth == 0 and not text[start:i].strip():
+                return None
+            i += 1
+        else:
+            return None
+
+        inner = text[start:i].strip()
+        title = ''
+        title_match = re.match(r'^(.*?)\s+(?:"([^"]*)"|\'([^\']*)\')$', inner, re.DOTALL)
+        if title_match:
+            inner = title_match.group(1)
+            title = title_match.group(2) if title_match.group(2) is not None else title_match.group(3)
+        if inner.startswith('<') and inner.endswith('>'):
+            inner = inner[1:-1]
+        self.pos = i + 1
+        return inner, title
+
+    def _angle(self):
+        text = self.text
+        auto = AUTOLINK_RE.match(text, self.pos)
+        if auto:
+            url = auto.group(1)
+            self._push(Node('link', [Node('text', text=url)], href=url, title=''))
+            self.pos = auto.end()
+            return
+        tag = TAG_RE.match(text, self.pos)
+        if tag:
+            self._push(_html_node(tag.group(0)))
+            self.pos = tag.end()
+            return
+        self.buffer.append('<')
+        self.pos += 1
+
+    def _entity(self):
+        entity = ENTITY_RE.match(self.text, self.pos)
+        if entity:
+            self.buffer.append(html.unescape(entity.group(0)))
+            self.pos = entity.end()
+        else:
+            self.buffer.append('&')
+            self.pos += 1
+
+    def _newline(self):
+        # Two trailing spaces make a hard line break
+        pending = ''.join(self.buffer)
+        if pending.endswith('  '):
+            self.buffer = [pending.rstrip(' ')]
+            self._push(Node('linebreak'))
+        else:
+            self.buffer = [pending.rstrip(' ')] if pending else []
+            self.buffer.append('\n')
+        self.pos += 1
+
+    # -- emphasis ------------------------------------------------------------
+
+    def _process_emphasis(self, bottom):
+        """Match delimiter runs above `bottom` into em/strong nodes."""
+        delimiters = self.delimiters
+        openers_bottom = {}
+        k = bottom
+        while k < len(delimiters):
+            closer = delimiters[k]
+            if not closer.can_close:
+                k += 1
+                continue
+
+            key = (closer.char, closer.can_open, closer.count % 3)
+            floor = max(bottom, openers_bottom.get(key, bottom))
+            j = k - 1
+            opener = None
+            while j >= floor:
+                candidate = delimiters[j]
+                if candidate.char == closer.char and candidate.can_open:
+                    odd_match = (candidate.can_close or closer.can_open) and \
+                        (candidate.count + closer.count) % 3 == 0 and \
+                        not (candidate.count % 3 == 0 and closer.count % 3 == 0)
+                    if not odd_match:
+                        opener = candidate
+                        break
+                j -= 1
+
+            if opener is None:
+                openers_bottom[key] = k
+                if not closer.can_open:
+                    del delimiters[k]
+                else:
+                    k += 1
+                continue
+
+            use = 2 if opener.count >= 2 and closer.count >= 2 else 1
+            opener.count -= use
+            closer.count -= use
+            opener.node.text = opener.node.text[:-use]
+            closer.node.text = closer.node.text[:-use]
+
+            start = self._index_of(opener.node)
+            end = self._index_of(closer.node)
+            wrapped = Node('strong' if use == 2 else 'em', self._merge_text(self.nodes[start + 1:end]))
+            self.nodes[start + 1:end] = [wrapped]
+
+            # Delimiters between opener and closer can no longer match
+            del delimiters[j + 1:k]
+            k = j + 1
+            if opener.count == 0:
+                self.nodes.remove(opener.node)
+                del delimiters[j]
+                k -= 1
+            if closer.count == 0:
+                self.nodes.remove(closer.node)
+                del delimiters[k]
+
+        del delimiters[bottom:]
+
+    def _index_of(self, node):
+        for index in range(len(self.nodes) - 1, -1, -1):
+            if self.nodes[index] is node:
+                return index
+        raise ValueError('delimiter node not found')
+
+    @staticmethod
+    def _merge_text(nodes):
+        """Join adjacent text nodes and drop empty ones."""
+        merged = []
+        for node in nodes:
+            if node.type == 'text':
+                if not node.text:
+                    continue
+                if merged and merged[-1].type == 'text':
+                    merged[-1] = Node('text', text=merged[-1].text + node.text)
+                    continue
+            merged.append(node)
+        return merged
+
+
+def parse_inline(text):
+    """Parse inline markdown into a list of inline nodes."""
+    if not text:
+        return []
+    return InlineParser(text).parse()
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+def parse_markdown(md_content):
+    """
+    Parse a markdown document into a tree rooted at a 'document' node.
+
+    The document's attrs['outline'] lists its headings, as returned by
+    assign_heading_ids().
+    """
+    lines = md_content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    document = Node('document', BlockParser().parse(lines))
+    attach_math(document)
+    document.attrs['outline'] = assign_heading_ids(document)
+    return document
+
+
+SLUG_STRIP_RE = re.compile(r'[^\w\- ]')
+# Section number at the start of a heading: "5.1 Title", "18.16.3 Title"
+HEADING_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)*)\s')
+
+
+def slugify(text):
+    """GitHub-style anchor for a heading: lowercase, punctuation dropped, spaces to hyphens."""
+    return SLUG_STRIP_RE.sub('', text.strip().lower()).replace(' ', '-')
+
+
+def assign_heading_ids(document):
+    """
+    Give every heading an id in attrs['id'] and return the document's outline.
+
+    Ids are the heading's slug, with repeats numbered as GitHub does (-1, -2,
+    ...), so links into the markdown on GitHub and into the pages agree. A
+    number is skipped when another heading's own slug already took it, which
+    keeps every id unique. The outline has one dict per heading, in document
+    order: level, id, text and number (the leading section number, or None).
+    """
+    headings = [node for node in document.walk() if node.type == 'heading']
+    texts = [node.plain_text().strip() for node in headings]
+    slugs = [slugify(text) or 'section' for text in texts]
+    taken = set(slugs)
+    used = set()
+    seen = {}
+    outline = []
+    for node, text, slug in zip(headings, texts, slugs):
+        anchor = slug
+        if anchor in used:
+            count = seen.get(slug, 1)
+            while f'{slug}-{count}' in taken or f'{slug}-{count}' in used:
+                count += 1
+            seen[slug] = count + 1
+            anchor = f'{slug}-{count}'
+        used.add(anchor)
+        node.attrs['id'] = anchor
+        number = HEADING_NUMBER_RE.match(text)
+        outline.append({'level': node.attrs['level'], 'id': anchor, 'text': text,
+                        'number': number.group(1) if number else None})
+    return outline
+
+
+def attach_math(document):
+    """
+    Parse the TeX of every math node into attrs['math'].
+
+    Formulas outside the subset tex_math supports get None and are left for
+    KaTeX to render in the browser.
+    """
+    for node in document.walk():
+        if node.type in ('math', 'math_block'):
+            try:
+                node.attrs['math'] = parse_math(node.text)
+            except TexMathError:
+                node.attrs['math'] = None
@@ -3,12 +3,18 @@ Advanced Markdown to LaTeX converter for lecture notes.
 Handles complex markdown syntax while preserving exact content.
 """
 
-import os
+import argparse
 import re
 from pathlib import Path
+from urllib.parse import unquote
 
-MARKDOWN_DIR = Path(r"d:\Academics\Projects\isuru sir\CO224-Web\Lectures\markdown")
-LATEX_DIR = Path(r"d:\Academics\Projects\isuru sir\CO224-Web\Lectures\latex")
+from lecture_parser import Node, parse_markdown
+from parallel_jobs import add_jobs_argument, run_in_order
+from tex_math import to_latex
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MARKDOWN_DIR = REPO_ROOT / "Lectures" / "markdown"
+LATEX_DIR = REPO_ROOT / "Lectures" / "latex"
 
 # Correct lecture order mapping
 LECTURE_ORDER = [
@@ -35,216 +41,265 @@ LECTURE_ORDER = [
 ]
 
 
+# Unicode symbols that need math mode in LaTeX
+SYMBOL_REPLACEMENTS = {
+    '→': r'$\rightarrow$',
+    '←': r'$\leftarrow$',
+    '↔': r'$\leftrightarrow$',
+    '×': r'$\times$',
+    '÷': r'$\div$',
+    '≤': r'$\leq$',
+    '≥': r'$\geq$',
+    '≠': r'$\neq$',
+}
+
+# Fenced code languages that the listings package knows about
+LISTINGS_LANGUAGES = {
+    'c': 'C',
+    'bash': 'bash',
+    'sh': 'bash',
+    'verilog': 'Verilog',
+}
+
+LATEX_ESCAPES = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+}
+LATEX_ESCAPE_RE = re.compile('[' + re.escape(''.join(LATEX_ESCAPES) + ''.join(SYMBOL_REPLACEMENTS)) + ']')
+
+
+def math_source(node):
+    """TeX for a math node, from the formula parsed with the HTML output when there is one."""
+    tree = node.attrs.get('math')
+    return node.text if tree is None else to_latex(tree)
+
+
 class MarkdownToLatexConverter:
-    def __init__(self):
-        self.in_code_block = False
-        self.in_list = False
-        self.in_table = False
-        self.list_stack = []
-        
+    """Emit LaTeX by walking a tree from lecture_parser."""
+
+    HEADING_COMMANDS = {
+        1: 'section',
+        2: 'subsection',
+        3: 'subsubsection',
+        4: 'paragraph',
+        5: 'subparagraph',
+        6: 'subparagraph',
+    }
+
     def escape_text(self, text):
-        """Escape special LaTeX characters."""
-        # Special characters that need escaping
-        text = text.replace('\\', r'\textbackslash{}')
-        text = text.replace('&', r'\&')
-        text = text.replace('%', r'\%')
-        text = text.replace('$', r'\$')
-        text = text.replace('#', r'\#')
-        text = text.replace('_', r'\_')
-        text = text.replace('{', r'\{')
-        text = text.replace('}', r'\}')
-        text = text.replace('~', r'\textasciitilde{}')
-        text = text.replace('^', r'\textasciicircum{}')
-        return text
-    
-    def process_inline_formatting(self, text):
-        """Process inline markdown formatting (bold, italic, code)."""
-        # Don't process if we're in a code block
-        if self.in_code_block:
-            return text
-        
-        # Handle inline code first (to avoid processing markdown inside code)
-        text = re.sub(r'`([^`]+)`', r'\\texttt{\1}', text)
-        
-        # Handle bold (**text**)
-        text = re.sub(r'\*\*([^\*]+)\*\*', lambda m: r'\textbf{' + self.escape_text(m.group(1)) + '}', text)
-        
-        # Handle italic (*text* but not ** and not in middle of word)
-        text = re.sub(r'(?<!\*)\*(?!\*)([^\*]+)\*(?!\*)', lambda m: r'\emph{' + self.escape_text(m.group(1)) + '}', text)
-        
-        # Handle arrows
-        text = text.replace('→', r'$\rightarrow$')
-        text = text.replace('←', r'$\leftarrow$')
-        text = text.replace('↔', r'$\leftrightarrow$')
-        
-        # Handle special symbols
-        text = text.replace('×', r'$\times$')
-        text = text.replace('÷', r'$\div$')
-        text = text.replace('≤', r'$\leq$')
-        text = text.replace('≥', r'$\geq$')
-        text = text.replace('≠', r'$\neq$')
-        
-        return text
-    
-    def convert_line(self, line):
-        """Convert a single line of markdown to LaTeX."""
-        result = []
-        
-        # Handle code block delimiters
-        if line.strip().startswith('```'):
-            if not self.in_code_block:
-                self.in_code_block = True
-                # Check if language is specified
-                lang = line.strip()[3:].strip()
-                if lang:
-                    result.append(f'\\begin{{lstlisting}}[language={lang}]')
-                else:
-                    result.append(r'\begin{verbatim}')
-            else:
-                if '\\begin{lstlisting}' in str(result):
-                    result.append(r'\end{lstlisting}')
-                else:
-                    result.append(r'\end{verbatim}')
-                self.in_code_block = False
-            return result
-        
-        # If in code block, return line as-is
-        if self.in_code_block:
-            return [line]
-        
-        # Handle headings
-        if line.startswith('# '):
-            title = line[2:].strip().replace('*', '')
-            return [f'\\section{{{self.escape_text(title)}}}', '']
-        elif line.startswith('## '):
-            title = line[3:].strip()
-            return [f'\\subsection{{{self.escape_text(title)}}}', '']
-        elif line.startswith('### '):
-            title = line[4:].strip()
-            return [f'\\subsubsection{{{self.escape_text(title)}}}', '']
-        elif line.startswith('#### '):
-            title = line[5:].strip()
-            return [f'\\paragraph{{{self.escape_text(title)}}}', '']
-        
-        # Handle author line (e.g., *By Dr. Isuru Nawinne*)
-        if re.match(r'^\*By [^\*]+\*$', line.strip()):
-            author = line.strip()[1:-1]
-            return [f'\\emph{{{self.escape_text(author)}}}', '']
-        
-        # Handle images
-        img_match = re.search(r'<img src="([^"]+)"[^>]*alt="([^"]+)"[^>]*>', line)
-        if img_match:
-            img_path = img_match.group(1)
-            caption = img_match.group(2)
-            return [
-                r'\begin{figure}[h]',
-                r'\centering',
-                f'\\includegraphics[width=0.7\\textwidth]{{{img_path}}}',
-                f'\\caption{{{self.escape_text(caption)}}}',
-                r'\end{figure}',
-                ''
-            ]
-        
-        # Handle lists
-        if line.strip().startswith('- '):
-            if not self.in_list:
-                result.append(r'\begin{itemize}')
-                self.in_list = True
-            item_text = line.strip()[2:]
-            processed_text = self.process_inline_formatting(item_text)
-            result.append(f'\\item {processed_text}')
-            return result
-        elif line.strip().startswith(('1. ', '2. ', '3. ', '4. ', '5. ', '6. ', '7. ', '8. ', '9. ')):
-            # Numbered list
-            if not self.in_list or 'enumerate' not in str(self.list_stack):
-                if self.in_list:
-                    result.append(r'\end{itemize}')
-                result.append(r'\begin{enumerate}')
-                self.in_list = True
-                self.list_stack.append('enumerate')
-            item_text = re.sub(r'^\d+\.\s+', '', line.strip())
-            processed_text = self.process_inline_formatting(item_text)
-            result.append(f'\\item {processed_text}')
-            return result
-        else:
-            # Not a list item, close list if open
-            if self.in_list:
-                if self.list_stack and self.list_stack[-1] == 'enumerate':
-                    result.append(r'\end{enumerate}')
-                    self.list_stack.pop()
-                else:
-                    result.append(r'\end{itemize}')
-                result.append('')
-                self.in_list = False
-        
-        # Handle horizontal rules
-        if line.strip() in ['---', '***', '___']:
-            return [r'\hrule', '']
-        
-        # Handle blank lines
-        if not line.strip():
-            return ['']
-        
-        # Handle regular text paragraphs
-        processed_line = self.process_inline_formatting(line)
-        result.append(processed_line)
-        
-        return result
-    
+        """Escape special LaTeX characters and map Unicode symbols in one pass."""
+        return LATEX_ESCAPE_RE.sub(
+            lambda m: LATEX_ESCAPES.get(m.group(0)) or SYMBOL_REPLACEMENTS[m.group(0)], text)
+
     def convert(self, markdown_text):
         """Convert entire markdown document to LaTeX."""
-        lines = markdown_text.split('\n')
-        latex_lines = []
-        
-        for line in lines:
-            converted = self.convert_line(line)
-            latex_lines.extend(converted)
-        
-        # Close any open environments
-        if self.in_list:
-            if self.list_stack and self.list_stack[-1] == 'enumerate':
-                latex_lines.append(r'\end{enumerate}')
+        return self.render(parse_markdown(markdown_text))
+
+    def render(self, document):
+        """Render a parsed document to LaTeX."""
+        return '\n'.join(self.render_blocks(document.children))
+
+    def render_blocks(self, blocks):
+        lines = []
+        for block in blocks:
+            lines.extend(self.render_block(block))
+        return lines
+
+    def render_block(self, node):
+        kind = node.type
+        if kind == 'heading':
+            command = self.HEADING_COMMANDS[node.attrs['level']]
+            children = node.children
+            if node.attrs['level'] == 1:
+                # Section titles drop emphasis markers
+                children = [Node('text', text=node.plain_text())]
+            return [f'\\{command}{{{self.render_inline(children)}}}', '']
+        if kind == 'paragraph':
+            return [self.render_inline(node.children), '']
+        if kind == 'list':
+            return self.render_list(node)
+        if kind == 'code_block':
+            return self.render_code_block(node)
+        if kind == 'blockquote':
+            return [r'\begin{quote}'] + self.render_blocks(node.children) + [r'\end{quote}', '']
+        if kind == 'table':
+            return self.render_table(node)
+        if kind == 'hr':
+            return [r'\hrule', '']
+        if kind == 'html_block':
+            return self.render_html_block(node)
+        if kind == 'comment':
+            return []
+        if kind == 'math_block':
+            body = math_source(node).strip()
+            if body.startswith('\\begin{'):
+                return [body, '']
+            return [r'\[', body, r'\]', '']
+        raise ValueError(f'Unknown block type: {kind}')
+
+    def render_list(self, node):
+        env = 'enumerate' if node.attrs['ordered'] else 'itemize'
+        lines = [f'\\begin{{{env}}}']
+        start = node.attrs.get('start')
+        if node.attrs['ordered'] and start not in (None, 1):
+            lines.append(f'\\setcounter{{enumi}}{{{start - 1}}}')
+        for item in node.children:
+            body = self.render_blocks(item.children)
+            while body and not body[-1]:
+                body.pop()
+            if node.attrs['tight']:
+                body = [line for line in body if line]
+            if body:
+                lines.append(f'\\item {body[0]}')
+                lines.extend(body[1:])
             else:
-                latex_lines.append(r'\end{itemize}')
-        if self.in_code_block:
-            latex_lines.append(r'\end{verbatim}')
-        
-        return '\n'.join(latex_lines)
+                lines.append(r'\item')
+        lines.extend([f'\\end{{{env}}}', ''])
+        return lines
+
+    def render_code_block(self, node):
+        language = LISTINGS_LANGUAGES.get(node.attrs.get('lang', ''))
+        if language:
+            return [f'\\begin{{lstlisting}}[language={language}]', node.text, r'\end{lstlisting}', '']
+        return [r'\begin{verbatim}', node.text, r'\end{verbatim}', '']
+
+    def render_table(self, node):
+        aligns = node.attrs['aligns']
+        spec = '|' + '|'.join({'center': 'c', 'right': 'r'}.get(a, 'l') for a in aligns) + '|'
+        lines = [r'\begin{center}', f'\\begin{{tabular}}{{{spec}}}', r'\hline']
+        for index, row in enumerate(node.children):
+            cells = [self.render_inline(cell.children) for cell in row.children]
+            if index == 0:
+                cells = [f'\\textbf{{{cell}}}' if cell else cell for cell in cells]
+            lines.append(' & '.join(cells) + r' \\')
+            lines.append(r'\hline')
+        lines.extend([r'\end{tabular}', r'\end{center}', ''])
+        return lines
+
+    def render_html_block(self, node):
+        """Keep the images and text of raw HTML; drop the markup itself."""
+        lines = []
+        text = []
+        for child in node.children:
+            if child.type == 'image':
+                if ''.join(text).strip():
+                    lines.extend([self.escape_text(''.join(text).strip()), ''])
+                text = []
+                lines.extend(self.render_figure(child))
+            elif child.type == 'text':
+                text.append(child.text)
+        if ''.join(text).strip():
+            lines.extend([self.escape_text(' '.join(''.join(text).split())), ''])
+        return lines
+
+    def render_figure(self, node):
+        # The LaTeX build resolves images through \graphicspath
+        img_path = 'img/' + unquote(node.attrs['src']).rsplit('/', 1)[-1]
+        lines = [
+            r'\begin{figure}[h]',
+            r'\centering',
+            f'\\includegraphics[width=0.7\\textwidth]{{{img_path}}}',
+        ]
+        caption = node.attrs.get('alt')
+        if caption:
+            lines.append(f'\\caption{{{self.escape_text(caption)}}}')
+        lines.extend([r'\end{figure}', ''])
+        return lines
+
+    def render_inline(self, nodes):
+        """Process inline formatting (bold, italic, code, links, math)."""
+        out = []
+        for node in nodes:
+            kind = node.type
+            if kind == 'text':
+                out.append(self.escape_text(node.text))
+            elif kind == 'strong':
+                out.append(f'\\textbf{{{self.render_inline(node.children)}}}')
+            elif kind == 'em':
+                out.append(f'\\emph{{{self.render_inline(node.children)}}}')
+            elif kind == 'code':
+                out.append(f'\\texttt{{{self.escape_text(node.text)}}}')
+            elif kind == 'link':
+                href = node.attrs['href'].replace('%', r'\%').replace('#', r'\#')
+                out.append(f'\\href{{{href}}}{{{self.render_inline(node.children)}}}')
+            elif kind == 'image':
+                # Images inside running text cannot float; keep just the alt text
+                out.append(self.escape_text(node.attrs.get('alt', '')))
+            elif kind == 'math':
+                if node.attrs.get('display'):
+                    out.append(f'\\[{math_source(node)}\\]')
+                else:
+                    out.append(f'${math_source(node)}$')
+            elif kind == 'linebreak':
+                out.append('\\\\\n')
+            elif kind == 'html':
+                continue
+            else:
+                raise ValueError(f'Unknown inline type: {kind}')
+        return ''.join(out)
+
+
+def convert_lecture_file(md_file):
+    """Convert one markdown lecture to LaTeX (runs in a worker)."""
+    with open(md_file, 'r', encoding='utf-8') as f:
+        markdown_content = f.read()
+    return MarkdownToLatexConverter().convert(markdown_content)
+
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Convert markdown lectures to LaTeX.')
+    add_jobs_argument(parser)
+    return parser.parse_args(argv)
 
-def main():
+
+def main(argv=None):
     """Convert all markdown lectures to LaTeX."""
+    args = parse_args(argv)
+
     # Ensure output directory exists
     LATEX_DIR.mkdir(parents=True, exist_ok=True)
     
-    print(f"Converting {len(LECTURE_ORDER)} lectures to LaTeX...")
+    total = len(LECTURE_ORDER)
+    print(f"Converting {total} lectures to LaTeX...")
     print(f"Input: {MARKDOWN_DIR}")
     print(f"Output: {LATEX_DIR}\n")
-    
+
+    # Lecture numbers come from LECTURE_ORDER, not from worker completion order
+    numbers = {}
     for idx, filename in enumerate(LECTURE_ORDER, 1):
-        print(f"[{idx:2d}/20] Processing: {filename}")
-        
-        # Read markdown file
         md_file = MARKDOWN_DIR / filename
         if not md_file.exists():
-            print(f"  ⚠️  File not found: {filename}")
+            print(f"[{idx:2d}/{total}] ⚠️  File not found: {filename}")
+            continue
+        numbers[md_file] = idx
+
+    created = 0
+    for md_file, latex_content, error in run_in_order(convert_lecture_file, numbers, args.jobs):
+        idx = numbers[md_file]
+        if error is not None:
+            print(f"[{idx:2d}/{total}] ❌ Failed: {md_file.name}: {error}")
             continue
-        
-        with open(md_file, 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
-        
-        # Convert to LaTeX
-        converter = MarkdownToLatexConverter()
-        latex_content = converter.convert(markdown_content)
-        
+
         # Write LaTeX file
         latex_file = LATEX_DIR / f"lecture-{idx:02d}.tex"
         with open(latex_file, 'w', encoding='utf-8') as f:
             f.write(latex_content)
-        
+
+        created += 1
+        print(f"[{idx:2d}/{total}] {md_file.name}")
         print(f"         → Created: lecture-{idx:02d}.tex")
-    
-    print(f"\n✅ Successfully created all 20 LaTeX files in {LATEX_DIR}")
+
+    print(f"\n✅ Successfully created {created} of {total} LaTeX files in {LATEX_DIR}")
+    if created < total:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
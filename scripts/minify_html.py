@@ -0,0 +1,67 @@
+"""
+Conservative HTML minifier for the generated lecture pages.
+
+Strips comments and indentation, collapses whitespace runs and drops
+whitespace next to block-level tags, where browsers ignore it anyway. The
+contents of <pre>, <textarea>, <script> and <style> are left untouched, and a
+whitespace run that contained a line break stays a line break so TeX `%`
+comments inside math keep ending where they did.
+"""
+
+import re
+
+# Elements whose surrounding whitespace never renders
+BLOCK_TAGS = {
+    'html', 'head', 'body', 'title', 'meta', 'link', 'script', 'style', 'noscript',
+    'header', 'footer', 'main', 'nav', 'section', 'article', 'aside',
+    'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'br', 'pre', 'blockquote',
+    'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'figure', 'figcaption', 'picture', 'source',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td', 'caption', 'colgroup', 'col',
+    '!doctype',
+}
+
+_BLOCK_NAMES = '|'.join(sorted(BLOCK_TAGS, key=len, reverse=True))
+
+RAW_TEXT_RE = re.compile(r'(<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>)', re.S | re.I)
+COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+# Tags wrapped over several lines, as in the page template
+LOOSE_TAG_RE = re.compile(r'<[^>]*\n[^>]*>')
+TAG_SPACE_RE = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+# The patterns below start with a literal so the regex engine can skip ahead;
+# after INDENT_RE every whitespace run next to a tag is a single '\n' or ' '.
+INDENT_RE = re.compile(r'\n\s+')
+SPACES_RE = re.compile(r'  +')
+BREAK_BEFORE_BLOCK_RE = re.compile(r'\n(?=</?(?:' + _BLOCK_NAMES + r')[\s/>])', re.I)
+BREAK_AFTER_BLOCK_RE = re.compile(r'(<(?=[^>]*>\n)/?(?:' + _BLOCK_NAMES + r')(?:\s[^>]*)?/?>)\n', re.I)
+
+
+def _minify_tag(match):
+    tag = TAG_SPACE_RE.sub(lambda m: m.group(1) or ' ', match.group())
+    return tag.replace(' >', '>').replace(' />', '/>')
+
+
+def _minify_markup(markup):
+    markup = COMMENT_RE.sub('', markup)
+    markup = LOOSE_TAG_RE.sub(_minify_tag, markup)
+    markup = markup.replace('\t', ' ').replace('\r', '')
+    markup = INDENT_RE.sub('\n', markup)
+    while ' \n' in markup:
+        markup = markup.replace(' \n', '\n')
+    markup = SPACES_RE.sub(' ', markup)
+    markup = BREAK_BEFORE_BLOCK_RE.sub('', markup)
+    return BREAK_AFTER_BLOCK_RE.sub(r'\1', markup)
+
+
+def minify_html(html):
+    """Return `html` with insignificant whitespace and comments removed."""
+    parts = RAW_TEXT_RE.split(html)
+    out = []
+    # split() interleaves: markup, raw element, its tag name, markup, ...
+    for i in range(0, len(parts), 3):
+        # Raw elements are block-level, so whitespace around them never renders
+        out.append(_minify_markup(parts[i]).strip())
+        if i + 1 < len(parts):
+            raw = parts[i + 1]
+            end = raw.index('>') + 1
+            out.append(LOOSE_TAG_RE.sub(_minify_tag, raw[:end]) + raw[end:])
+    return ''.join(out)
@@ -0,0 +1,51 @@
+"""
+Fan per-lecture work out over a process pool.
+
+Results are always yielded in task order, whatever order the workers finish
+in, so output files and console progress stay deterministic.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_jobs(jobs):
+    """Turn a --jobs value into a worker count; 0 means one per CPU."""
+    if jobs is None or jobs < 0:
+        return 1
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def add_jobs_argument(parser):
+    """Add the shared --jobs option to an argparse parser."""
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='convert lectures in N worker processes (0 = one per CPU)')
+
+
+def run_in_order(func, tasks, jobs=1):
+    """
+    Apply `func` to every task and yield (task, result, error) in task order.
+
+    `func` must be a module-level function so it can be sent to a worker
+    process. Exceptions are captured per task instead of aborting the batch.
+    """
+    tasks = list(tasks)
+    jobs = min(resolve_jobs(jobs), len(tasks))
+
+    if jobs <= 1:
+        for task in tasks:
+            try:
+                yield task, func(task), None
+            except Exception as e:
+                yield task, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(func, task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            try:
+                yield task, future.result(), None
+            except Exception as e:
+                yield task, None, e
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Write precompressed .gz and .br siblings next to the site's text and PDF assets.
+
+Compression runs once at build time at maximum level, so the preview server
+(or any host that understands precompressed files) can send them as-is.
+A sibling carries its source's mtime; matching mtimes mean it is up to date.
+Brotli output needs the optional `brotli` package and is skipped without it.
+
+Run from the repository root:
+
+    python scripts/precompress.py
+"""
+
+import gzip
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Files served to browsers that compress well enough to be worth a sibling
+PRECOMPRESS_PATTERNS = [
+    'index.html',
+    'sw.js',
+    'Lectures/html/*.html',
+    'Lectures/search/*.bin',
+    'Lectures/headings/*.json',
+    'Lectures/glossary/*.json',
+    'assets/css/*.css',
+    'assets/js/*.js',
+    'assets/img/*.svg',
+    'assets/dist/*.css',
+    'assets/dist/*.js',
+    'assets/dist/*.svg',
+    'materials/*.pdf',
+]
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the output byte-identical across rebuilds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+# Content-Encoding token -> (file suffix, compressor); br is preferred when both are accepted
+ENCODINGS = {'br': ('.br', brotli_compress), 'gzip': ('.gz', gzip_compress)}
+
+
+def available_encodings():
+    """Encodings this build can produce, in order of preference."""
+    return [name for name in ENCODINGS if name != 'br' or brotli is not None]
+
+
+def sibling_path(path, encoding):
+    path = Path(path)
+    return path.with_name(path.name + ENCODINGS[encoding][0])
+
+
+def is_up_to_date(path, sibling):
+    """A sibling is current when it exists and carries its source's mtime."""
+    try:
+        return os.stat(sibling).st_mtime_ns == os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def find_assets(root='.', patterns=PRECOMPRESS_PATTERNS):
+    root = Path(root)
+    assets = []
+    for pattern in patterns:
+        assets.extend(sorted(path for path in root.glob(pattern) if path.is_file()))
+    return assets
+
+
+def precompress(paths, encodings=None):
+    """
+    Write missing or stale siblings for `paths`.
+
+    Returns a list of (path, encoding, original_size, compressed_size) for the
+    siblings that were written.
+    """
+    encodings = available_encodings() if encodings is None else encodings
+    written = []
+    for path in paths:
+        path = Path(path)
+        data = None
+        for encoding in encodings:
+            sibling = sibling_path(path, encoding)
+            if is_up_to_date(path, sibling):
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = ENCODINGS[encoding][1](data)
+            sibling.write_bytes(compressed)
+            st = path.stat()
+            os.utime(sibling, ns=(st.st_atime_ns, st.st_mtime_ns))
+            written.append((path, encoding, len(data), len(compressed)))
+    return written
+
+
+def remove_orphans(root='.', patterns=PRECOMPRESS_PATTERNS):
+    """Delete siblings whose source file no longer exists."""
+    root = Path(root)
+    removed = []
+    for pattern in patterns:
+        for suffix, _ in ENCODINGS.values():
+            for sibling in root.glob(pattern + suffix):
+                if not sibling.with_suffix('').exists():
+                    sibling.unlink()
+                    removed.append(sibling)
+    return removed
+
+
+def main():
+    if brotli is None:
+        print("brotli is not installed; writing .gz siblings only (pip install brotli)")
+    written = precompress(find_assets())
+    for path, encoding, original, compressed in written:
+        print(f"{sibling_path(path, encoding)}: {original:,} -> {compressed:,} bytes")
+    for sibling in remove_orphans():
+        print(f"Removed stale {sibling}")
+    if not written:
+        print("All precompressed files are up to date.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Prefetch hints for reading the lectures in order.
+
+create_lecture_html() puts `<link rel="prefetch">` for the next lecture's page
+into each page's <head>. Which image the next page shows first is only known
+once that page is built, so a site stage then adds a second hint for it with
+set_image_prefetch(), reading the next page's final HTML.
+
+For a <picture>, the hinted file is the candidate of its first <source> that a
+1x screen picks for the slot width in `sizes`, and the hint carries that
+source's type: a browser that cannot decode the type (AVIF, say) does not
+fetch it. Such a browser and screens of another density load a different
+file, so for them the hint is skipped or wasted.
+"""
+
+import posixpath
+import re
+
+NEXT_LINK_RE = re.compile(r'<a\b[^>]*\srel="next"[^>]*>')
+# The first lecture image: a <picture>, or an <img> served from the site itself
+IMAGE_RE = re.compile(r'<picture>.*?</picture>|<img\b[^>]*>', re.S)
+SOURCE_RE = re.compile(r'<source\b[^>]*>')
+ATTR_RE = re.compile(r'\s([\w-]+)="([^"]*)"')
+SLOT_WIDTH_RE = re.compile(r'(\d+)px\s*$')
+IMAGE_PREFETCH_RE = re.compile(r'<link rel="prefetch" href="[^"]*" as="image"(?: type="[^"]*")?>')
+
+
+def next_page_href(html):
+    """href of a page's rel="next" link, or None on the last page."""
+    match = NEXT_LINK_RE.search(html)
+    return dict(ATTR_RE.findall(match.group())).get('href') if match else None
+
+
+def pick_candidate(srcset, sizes):
+    """The srcset URL a 1x screen loads for the slot width given by `sizes`."""
+    candidates = []
+    for candidate in srcset.split(','):
+        url, _, descriptor = candidate.strip().partition(' ')
+        width = descriptor.strip()[:-1]
+        candidates.append((int(width) if width.isdigit() else 0, url))
+    candidates.sort()
+    slot = SLOT_WIDTH_RE.search(sizes or '')
+    slot = int(slot.group(1)) if slot else candidates[-1][0]
+    for width, url in candidates:
+        if width >= slot:
+            return url
+    return candidates[-1][1]
+
+
+def first_image(html):
+    """
+    (URL relative to the page, MIME type or None) of the first image a page
+    loads from the site, or None.
+    """
+    for match in IMAGE_RE.finditer(html):
+        tag = match.group()
+        source = SOURCE_RE.search(tag) if tag.startswith('<picture>') else None
+        if source:
+            attrs = dict(ATTR_RE.findall(source.group()))
+            if attrs.get('srcset'):
+                return pick_candidate(attrs['srcset'], attrs.get('sizes')), attrs.get('type')
+        src = dict(ATTR_RE.findall(tag.rsplit('<img', 1)[-1])).get('src', '')
+        if src and '://' not in src and not src.startswith(('//', 'data:')):
+            return src, None
+    return None
+
+
+def relative_url(url, from_dir, to_dir):
+    """Re-base a relative URL written in `from_dir` onto `to_dir`."""
+    return posixpath.relpath(posixpath.normpath(posixpath.join(from_dir, url)), to_dir)
+
+
+def set_image_prefetch(html, url, mime_type=None):
+    """Replace a page's image prefetch hint with one for `url` (or none); idempotent."""
+    html = IMAGE_PREFETCH_RE.sub('', html)
+    if url is None:
+        return html
+    head_end = html.find('</head>')
+    if head_end < 0:
+        return html
+    type_attr = f' type="{mime_type}"' if mime_type else ''
+    return html[:head_end] + f'<link rel="prefetch" href="{url}" as="image"{type_attr}>' + html[head_end:]
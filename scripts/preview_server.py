@@ -2,44 +2,551 @@
 """
 Simple local web server to preview the Lectures on Computer Architecture website before deployment.
 Run this script and open http://localhost:8000 in your browser.
+
+Requests are served on separate threads, so a large PDF download never blocks
+pages, images or CSS. Open pages reload themselves (via server-sent events)
+whenever a file under the site changes, e.g. while `build.py --watch` runs.
+
+With --render, lecture pages are rendered from the markdown on every request
+instead of being read from Lectures/html, so edits show up without a build.
+
+With --production, files are served the way a static host would serve them:
+strong ETags, conditional requests answered with 304, byte ranges for the PDFs
+and a Cache-Control policy per asset class. The service worker (sw.js) is only
+served in this mode; during development it would answer from its cache.
+
+In every mode, files with an up-to-date .br or .gz sibling written by the build
+(see precompress.py) are sent precompressed to clients that accept it.
 """
 
+import argparse
+import email.utils
 import http.server
-import socketserver
-import webbrowser
+import io
 import os
+import re
+import threading
+import time
+import webbrowser
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from build import SiteBuilder
+from glossary import GLOSSARY_INDEX_PATH
+from build_manifest import hash_file
+from precompress import ENCODINGS, is_up_to_date, sibling_path
+from file_watcher import PollingWatcher
 
 PORT = 8000
+SITE_ROOT = Path(__file__).resolve().parent.parent
+
+LIVE_RELOAD_PATH = '/__livereload'
+SERVICE_WORKER_URL = '/sw.js'
+# Files whose changes are pushed to open tabs
+WATCHED_PATHS = ['index.html', 'Lectures/html', 'Lectures/img', 'assets']
+# Extra inputs watched when pages are rendered on request
+RENDER_WATCHED_PATHS = ['Lectures/markdown', 'scripts/templates']
+# Everything a rendered page is planned from; the manifests are the ones the last build saved
+RENDER_INPUT_PATHS = ['Lectures/markdown', 'scripts/templates', 'assets/css/style.css',
+                      'assets/dist/manifest.json', 'Lectures/img-variants/.image-cache.json',
+                      GLOSSARY_INDEX_PATH.as_posix()]
+KEEPALIVE_SECONDS = 15
+
+LECTURE_PAGE_RE = re.compile(r'/Lectures/html/lecture-(\d+)\.html')
+RENDER_CACHE_SIZE = 32
+
+# --production Cache-Control per asset class. Pages revalidate on every visit;
+# assets that are not fingerprinted get bounded lifetimes.
+CACHE_POLICIES = {
+    '.html': 'no-cache',
+    '.css': 'public, max-age=3600',
+    '.js': 'public, max-age=3600',
+    '.json': 'public, max-age=3600',
+    '.jpg': 'public, max-age=86400',
+    '.jpeg': 'public, max-age=86400',
+    '.png': 'public, max-age=86400',
+    '.svg': 'public, max-age=86400',
+    '.pdf': 'public, max-age=604800',
+}
+DEFAULT_CACHE_POLICY = 'public, max-age=3600'
+# Everything under these directories has its content hash in the file name
+FINGERPRINTED_DIRS = ('assets/dist/', 'Lectures/img-variants/')
+IMMUTABLE_CACHE_POLICY = 'public, max-age=31536000, immutable'
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+# Injected before </body> of every HTML page; CSS changes are swapped in place
+LIVE_RELOAD_SNIPPET = b"""<script>
+(function () {
+    var source = new EventSource('""" + LIVE_RELOAD_PATH.encode() + b"""');
+    source.addEventListener('reload', function (event) {
+        if (/\\.css$/.test(event.data)) {
+            document.querySelectorAll('link[rel="stylesheet"]').forEach(function (link) {
+                var url = new URL(link.href);
+                url.searchParams.set('livereload', Date.now());
+                link.href = url.href;
+            });
+        } else {
+            location.reload();
+        }
+    });
+})();
+</script>
+"""
+
+
+class ReloadBroadcaster:
+    """Wakes every connected live-reload client when a watched file changes."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.last_path = ''
+        self.closed = False
+
+    def publish(self, path):
+        with self.condition:
+            self.version += 1
+            self.last_path = path
+            self.condition.notify_all()
+
+    def wait(self, seen_version, timeout):
+        """Block until a change newer than `seen_version`; returns (version, path)."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen_version or self.closed, timeout)
+            return self.version, self.last_path
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class RenderedPageCache:
+    """
+    Renders lecture pages on request and keeps the most recent ones in a bounded LRU.
+
+    Pages are keyed by the same inputs the build manifest records. The lectures
+    are planned once, read-only (see SiteBuilder.lectures), and planned again
+    only when the watcher over RENDER_INPUT_PATHS reports a change, so a cache
+    hit costs a few stat calls and nothing is ever written to disk.
+    """
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.pages = OrderedDict()
+        self.builder = SiteBuilder()
+        self.watcher = PollingWatcher(RENDER_INPUT_PATHS)
+        self.lectures = None
+        # SiteBuilder keeps unsynchronised caches; render one page at a time
+        self.lock = threading.Lock()
+
+    def plan(self):
+        """{lecture number: lecture}, re-read only after one of the inputs changed."""
+        changed = self.watcher.poll()
+        if GLOSSARY_INDEX_PATH in changed:
+            # Rendered pages link the glossary's terms
+            self.pages.clear()
+        if self.lectures is None or changed:
+            # Pick up the image catalog and asset manifest of a build that ran meanwhile
+            self.builder.images.load()
+            self.builder.assets.load()
+            self.lectures = {lecture['lecture_num']: lecture
+                             for lecture in self.builder.lectures(refresh=False)}
+        return self.lectures
+
+    def get(self, lecture_num):
+        """Return (html, timings, hit) for a lecture, or None if there is no such lecture."""
+        with self.lock:
+            start = time.perf_counter()
+            lecture = self.plan().get(lecture_num)
+            if lecture is None:
+                return None
+            key = (lecture_num, tuple(sorted(self.builder.output_inputs('html', lecture).items())))
+            timings = {'lookup': time.perf_counter() - start}
+
+            html = self.pages.get(key)
+            if html is not None:
+                self.pages.move_to_end(key)
+                return html, timings, True
+
+            html, stage_timings = self.builder.render_page(lecture)
+            timings['parse'] = stage_timings.pop('parse')
+            timings['render'] = sum(stage_timings.values())
+            # One entry per lecture: a newer render replaces the stale one
+            for old_key in [k for k in self.pages if k[0] == lecture_num]:
+                del self.pages[old_key]
+            self.pages[key] = html
+            while len(self.pages) > self.maxsize:
+                self.pages.popitem(last=False)
+            return html, timings, False
+
+
+class ETagCache:
+    """Strong ETags from file content hashes, recomputed only when a file's stat changes."""
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, path, st):
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            cached = self.entries.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, f'"{hash_file(path)[:32]}"')
+            with self.lock:
+                self.entries[path] = cached
+        return cached[1]
+
+
+def cache_policy(path):
+    """Cache-Control for a file under the site root in --production mode."""
+    relative = Path(path).relative_to(SITE_ROOT).as_posix()
+    if relative.startswith(FINGERPRINTED_DIRS):
+        return IMMUTABLE_CACHE_POLICY
+    if '/' + relative == SERVICE_WORKER_URL:
+        # Browsers compare sw.js on every check for an update; never let it go stale
+        return 'no-cache'
+    return CACHE_POLICIES.get(Path(path).suffix.lower(), DEFAULT_CACHE_POLICY)
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single `bytes=` range, inclusive.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.fullmatch(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def accepted_encodings(header):
+    """Content-codings a client accepts, from its Accept-Encoding header."""
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def negotiate_encoding(header, path):
+    """Return (path to serve, Content-Encoding or None), using an up-to-date precompressed sibling if accepted."""
+    accepted = accepted_encodings(header)
+    for encoding in ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            sibling = sibling_path(path, encoding)
+            if is_up_to_date(path, sibling):
+                return str(sibling), encoding
+    return path, None
+
+
+def watch_site(broadcaster, paths, interval=0.25):
+    """Poll the site and publish a reload for every change."""
+    watcher = PollingWatcher([SITE_ROOT / p for p in paths])
+    while not broadcaster.closed:
+        changed = watcher.wait(interval)
+        print(f"   ↻ Changed: {', '.join(sorted(p.name for p in changed))}")
+        # A CSS-only change can be applied without a full page reload
+        if all(path.suffix == '.css' for path in changed):
+            broadcaster.publish(min(changed).relative_to(SITE_ROOT).as_posix())
+        else:
+            broadcaster.publish('page')
+
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Set by main(); None disables live reload / render-on-request / production caching
+    broadcaster = None
+    render_cache = None
+    etags = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(SITE_ROOT), **kwargs)
+
     def end_headers(self):
         # Add headers to prevent caching during development
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Expires', '0')
+        if self.etags is None:
+            self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+            self.send_header('Expires', '0')
         super().end_headers()
 
-def main():
-    # Change to the project directory
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, 'index.html')
+            if not self.path.split('?', 1)[0].endswith('/') or not os.path.isfile(index):
+                return super().send_head()  # redirect or directory listing
+            path = index
+        if not os.path.isfile(path):
+            return super().send_head()  # 404
+        return self.send_file(path)
+
+    def send_file(self, path):
+        """Send headers for a static file, preferring a precompressed sibling; returns the body to copy, if any."""
+        headers = [('Content-Type', self.guess_type(path)), ('Vary', 'Accept-Encoding')]
+        served = path
+        # Byte ranges refer to the identity encoding, so ranged requests skip the siblings
+        if self.etags is None or 'Range' not in self.headers:
+            served, encoding = negotiate_encoding(self.headers.get('Accept-Encoding'), path)
+            if encoding is not None:
+                headers.append(('Content-Encoding', encoding))
+
+        st = os.stat(served)
+        if self.etags is None:
+            self.send_response(200)
+            self.send_header('Content-Length', str(st.st_size))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return open(served, 'rb')
+        return self.send_production_head(path, served, st, headers)
+
+    def send_production_head(self, path, served, st, headers):
+        """Send headers for `path` (read from `served`) like a production host; returns the body to copy, if any."""
+        etag = self.etags.get(served, st)
+        last_modified = self.date_time_string(int(st.st_mtime))
+        validators = [
+            ('ETag', etag),
+            ('Last-Modified', last_modified),
+            ('Cache-Control', cache_policy(path)),
+        ]
+
+        if self.not_modified(etag, st.st_mtime):
+            self.send_response(304)
+            for name, value in validators + [('Vary', 'Accept-Encoding')]:
+                self.send_header(name, value)
+            self.end_headers()
+            return None
+
+        byte_range = None
+        if_range = self.headers.get('If-Range')
+        if if_range is None or if_range in (etag, last_modified):
+            try:
+                byte_range = parse_range(self.headers.get('Range'), st.st_size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{st.st_size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return None
+
+        f = open(served, 'rb')
+        if byte_range is None:
+            self.send_response(200)
+            length = st.st_size
+            body = f
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            f.seek(start)
+            body = io.BytesIO(f.read(length))
+            f.close()
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{st.st_size}')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        for name, value in headers + validators:
+            self.send_header(name, value)
+        self.end_headers()
+        return body
+
+    def not_modified(self, etag, mtime):
+        """Evaluate If-None-Match (preferred) or If-Modified-Since against the current file."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == LIVE_RELOAD_PATH and self.broadcaster is not None:
+            self.serve_live_reload()
+            return
+        if path == SERVICE_WORKER_URL and self.etags is None:
+            # A cache-first worker would hide every rebuild; a 404 also unregisters an installed one
+            self.send_error(404, 'The service worker is only served with --production')
+            return
+        if self.render_cache is not None and LECTURE_PAGE_RE.fullmatch(path):
+            self.serve_rendered_page(int(LECTURE_PAGE_RE.fullmatch(path).group(1)))
+            return
+        if self.broadcaster is not None and self.serve_html_with_reload():
+            return
+        super().do_GET()
+
+    def send_html(self, body, headers=()):
+        """Send a complete HTML response, with the live-reload client when enabled."""
+        if self.broadcaster is not None:
+            marker = body.rfind(b'</body>')
+            if marker == -1:
+                body += LIVE_RELOAD_SNIPPET
+            else:
+                body = body[:marker] + LIVE_RELOAD_SNIPPET + body[marker:]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_rendered_page(self, lecture_num):
+        """Render a lecture page from its markdown source, reporting timings in Server-Timing."""
+        try:
+            result = self.render_cache.get(lecture_num)
+        except Exception as e:
+            self.send_error(500, f'Failed to render lecture {lecture_num}: {e}')
+            return
+        if result is None:
+            self.send_error(404, f'No lecture {lecture_num}')
+            return
+
+        html, timings, hit = result
+        metrics = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+        metrics.append(f'cache;desc="{"hit" if hit else "miss"}"')
+        self.send_html(html.encode('utf-8'), [('Server-Timing', ', '.join(metrics))])
+
+    def serve_html_with_reload(self):
+        """Serve an HTML page with the live-reload client injected; False if not an HTML page."""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split('?', 1)[0].endswith('/'):
+                return False  # let SimpleHTTPRequestHandler redirect
+            path = os.path.join(path, 'index.html')
+        if not path.endswith('.html') or not os.path.isfile(path):
+            return False
+
+        with open(path, 'rb') as f:
+            self.send_html(f.read())
+        return True
+
+    def serve_live_reload(self):
+        """Hold a server-sent-events stream open and push reload events down it."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+
+        seen = self.broadcaster.version
+        try:
+            self.wfile.write(b': connected\n\n')
+            self.wfile.flush()
+            while not self.broadcaster.closed:
+                version, path = self.broadcaster.wait(seen, KEEPALIVE_SECONDS)
+                if version == seen:
+                    self.wfile.write(b': keep-alive\n\n')
+                else:
+                    seen = version
+                    self.wfile.write(f'event: reload\ndata: {path}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        # The live-reload stream would otherwise log one line per open tab
+        if LIVE_RELOAD_PATH not in self.path:
+            super().log_message(format, *args)
+
+
+class PreviewServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Preview the lecture site locally.')
+    parser.add_argument('--port', type=int, default=PORT, help=f'port to listen on (default: {PORT})')
+    parser.add_argument('--no-browser', action='store_true', help='do not open a browser window')
+    parser.add_argument('--no-reload', action='store_true', help='disable live reload')
+    parser.add_argument('--render', action='store_true',
+                        help='render lecture pages from the markdown on each request instead of reading Lectures/html')
+    parser.add_argument('--production', action='store_true',
+                        help='serve files with production caching (ETag, 304, Range); implies --no-reload')
+    args = parser.parse_args(argv)
+    if args.production and args.render:
+        parser.error('--production serves the built files and cannot be combined with --render')
+    if args.production:
+        args.no_reload = True
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    port = args.port
+
     print("=" * 60)
     print("Lectures on Computer Architecture — Local Preview Server")
     print("=" * 60)
-    print(f"\n🌐 Starting server at http://localhost:{PORT}")
+    print(f"\n🌐 Starting server at http://localhost:{port}")
     print("\n📱 Preview your website:")
-    print(f"   • Main page: http://localhost:{PORT}/")
-    print(f"   • Lecture 1: http://localhost:{PORT}/lectures/lecture-01.html")
+    print(f"   • Main page: http://localhost:{port}/")
+    print(f"   • Lecture 1: http://localhost:{port}/Lectures/html/lecture-01.html")
+    if args.production:
+        print("\n📦 Production mode: ETags, 304s, byte ranges and per-asset Cache-Control")
+    if args.render:
+        print("\n🛠  Render mode: lecture pages are rendered from Lectures/markdown on request")
+    if not args.no_reload:
+        print("\n🔄 Live reload is on: open pages refresh when site files change")
     print("\n💡 Press Ctrl+C to stop the server\n")
     print("=" * 60)
-    
+
+    # The build helpers use paths relative to the repository root
+    os.chdir(SITE_ROOT)
+
+    broadcaster = None
+    if not args.no_reload:
+        broadcaster = ReloadBroadcaster()
+        paths = WATCHED_PATHS + (RENDER_WATCHED_PATHS if args.render else [])
+        threading.Thread(target=watch_site, args=(broadcaster, paths), daemon=True).start()
+    MyHTTPRequestHandler.broadcaster = broadcaster
+    MyHTTPRequestHandler.render_cache = RenderedPageCache() if args.render else None
+    MyHTTPRequestHandler.etags = ETagCache() if args.production else None
+
     # Open browser automatically
-    webbrowser.open(f'http://localhost:{PORT}/')
-    
+    if not args.no_browser:
+        webbrowser.open(f'http://localhost:{port}/')
+
     # Start server
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+    with PreviewServer(("", port), MyHTTPRequestHandler) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
+            if broadcaster is not None:
+                broadcaster.close()
             print("\n\n🛑 Server stopped. Goodbye!")
 
 if __name__ == "__main__":
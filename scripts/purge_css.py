@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Remove the rules of assets/css/style.css that no generated page can use.
+
+style.css is shared by index.html and the lecture pages. Every tag, class and
+id that occurs in the generated HTML is collected, together with classes that
+scripts add at run time (PURGE_ALLOWLIST and any classList.add/toggle calls
+in the pages), and only rules whose selectors may match them are kept.
+Matching follows critical_css.selector_matches, so combinators, attribute
+selectors and pseudo-classes never cause a rule to be dropped.
+
+The build writes the result as a fingerprinted copy in assets/dist/ and points
+the pages at it. Run from the repository root for a report of what would be
+removed:
+
+    python scripts/purge_css.py
+"""
+
+import fnmatch
+import re
+import sys
+from pathlib import Path
+
+from critical_css import KEYFRAMES_RE, compact_css, parse_stylesheet, selector_matches, split_selectors
+from glossary import GLOSSARY_PAGE_PATH
+
+STYLESHEET_PATH = Path('assets/css/style.css')
+PURGED_KEY = 'assets/css/style.purged.css'
+# Classes added by scripts rather than present in the markup; fnmatch patterns
+PURGE_ALLOWLIST = [
+    # KaTeX auto-render
+    'katex', 'katex-*',
+    # Search results (assets/js/search.js)
+    'search-result-*',
+    # Glossary definitions (assets/js/glossary.js)
+    'glossary-*',
+]
+
+TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)')
+# Attributes always follow whitespace; a leading \b would make the scan several times slower
+NAME_ATTR_RE = re.compile(r'\s(class|id)="([^"]*)"')
+SCRIPT_CLASS_RE = re.compile(r'classList\.(?:add|toggle)\(\s*[\'"]([\w-]+)[\'"]')
+
+
+class NameSet(set):
+    """A set of names that also contains everything matching its patterns."""
+
+    def __init__(self, names=(), patterns=()):
+        super().__init__(names)
+        self.pattern = re.compile('|'.join(fnmatch.translate(p) for p in patterns) or r'(?!)')
+
+    def __contains__(self, name):
+        return super().__contains__(name) or self.pattern.match(name) is not None
+
+
+def collect_names(pages):
+    """Return (tags, classes, ids) used by the given HTML documents."""
+    tags = {'html', 'body'}
+    classes = set()
+    ids = set()
+    for html in pages:
+        tags.update(tag.lower() for tag in set(TAG_RE.findall(html)))
+        for attr, value in NAME_ATTR_RE.findall(html):
+            if attr == 'class':
+                classes.update(value.split())
+            else:
+                ids.add(value)
+        classes.update(SCRIPT_CLASS_RE.findall(html))
+    return tags, NameSet(classes, PURGE_ALLOWLIST), ids
+
+
+def _purge(rules, tags, classes, ids, removed):
+    out = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = _purge(body, tags, classes, ids, removed)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @font-face and friends are kept; @keyframes are decided below
+            if not KEYFRAMES_RE.match(prelude):
+                out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = split_selectors(prelude)
+            kept = [s for s in selectors if selector_matches(s, tags, classes, ids, interactive=True)]
+            removed.extend(s for s in selectors if s not in kept)
+            if kept:
+                out.append(f"{','.join(kept)}{{{body}}}")
+    return ''.join(out)
+
+
+def purge_css(css, pages):
+    """
+    Return (pruned_css, removed) for a stylesheet and the pages using it.
+
+    `removed` lists the selectors and @keyframes that were dropped.
+    """
+    rules = parse_stylesheet(css)
+    tags, classes, ids = collect_names(pages)
+    removed = []
+    pruned = compact_css(_purge(rules, tags, classes, ids, removed))
+    for prelude, body in rules:
+        match = KEYFRAMES_RE.match(prelude)
+        if not match:
+            continue
+        if re.search(r'\b' + re.escape(match.group(1)) + r'\b', pruned):
+            pruned += compact_css(f'{prelude}{{{body}}}')
+        else:
+            removed.append(prelude)
+    return pruned, removed
+
+
+def site_pages():
+    """index.html, the generated lecture pages and the glossary page, as currently on disk."""
+    # The same pages the build's purge-css stage reads (site['pages'] in build.py)
+    paths = [Path('index.html')] + sorted(Path('Lectures/html').glob('lecture-*.html')) + [GLOSSARY_PAGE_PATH]
+    return [path.read_text(encoding='utf-8') for path in paths if path.is_file()]
+
+
+def main():
+    if not STYLESHEET_PATH.is_file():
+        print(f"{STYLESHEET_PATH} not found; run from the repository root")
+        return 1
+    css = STYLESHEET_PATH.read_text(encoding='utf-8')
+    pruned, removed = purge_css(css, site_pages())
+    for selector in removed:
+        print(f"Removed: {selector}")
+    original = len(css.encode('utf-8'))
+    size = len(pruned.encode('utf-8'))
+    print(f"\n{len(removed)} selector(s) removed; {STYLESHEET_PATH}: "
+          f"{original:,} -> {size:,} bytes (-{original - size:,}, comments and whitespace included)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,522 @@
+"""
+Binary encoding of the search index written by scripts/build.py.
+
+The dictionary and the shards described in search_index.py are stored as
+compact byte strings instead of JSON:
+
+- numbers are unsigned LEB128 varints (7 bits per byte, high bit set on all
+  but the last byte), so the small deltas that dominate the index take one byte;
+- strings are a varint byte length followed by UTF-8;
+- the dictionary's terms are sorted and front coded in buckets of
+  BUCKET_SIZE: each term is stored as the number of leading bytes it shares
+  with the previous term plus the remaining suffix, and the first term of a
+  bucket is stored whole. A table of bucket offsets lets a reader
+  binary-search the first terms and decode a single bucket to find a term,
+  instead of the whole list;
+- each term's value is a byte slice of a separate data block, located
+  through its length in the term's entry and the bucket's data offset;
+- shards hold no terms at all. A shard's posting lists are stored in the
+  order of the lecture's sorted terms, and the dictionary records, for every
+  bucket and lecture, how many of the bucket's terms the lecture contains, so
+  the position of a term in a shard follows from one dictionary bucket. The
+  counts are single bytes, as a bucket has fewer than 128 terms;
+- a posting list packs each (section_delta, count) pair into
+  section_delta * 2 + 1 followed by count - 2 when the term occurs more than
+  once in the section, and into section_delta * 2 when it occurs once;
+- a section's anchor is left out (stored as 0) when it is the slug of its
+  ASCII heading, which is how lecture_parser.slugify() makes most of them.
+
+Dictionary (terms.bin), each value the lectures containing the term as
+varints, the first lecture number and then deltas:
+
+    "LSD" version:str
+    lectures:varint  (num:varint title:str) * lectures
+    count:varint bucket_size:varint
+    (entries_offset_delta:varint data_offset_delta:varint) * buckets
+    entries_size:varint  (shared:varint suffix_size:varint suffix value_size:varint) * count
+    data_size:varint  values
+    (terms:byte * lectures) * buckets
+
+Shard (lecture-NN.bin):
+
+    "LSS" version:str lecture:varint title:str url:str
+    strings:varint  str * strings
+    sections:varint  (heading:varint anchor:varint) * sections
+    count:varint bucket_size:varint  data_offset_delta:varint * buckets
+    data_size:varint  (size:varint postings) * count
+
+decode_dictionary() and decode_shard() return the same structures as the JSON
+format, except that the dictionary's "terms" is a TermTable, a read-only
+mapping that decodes terms on lookup, a shard's "sections" a ShardSections,
+which derives an anchor when its section is read, and its "postings" a
+ShardPostings, which finds a term's posting list through the dictionary and
+returns it as undecoded bytes until search_index.decode_postings() reads it.
+The decoded dictionary also has "ranks", the terms each lecture has before
+each bucket.
+assets/js/search.js contains the matching JavaScript decoder.
+"""
+
+import bisect
+from itertools import accumulate
+
+from lecture_parser import slugify
+
+DICTIONARY_MAGIC = b'LSD'
+SHARD_MAGIC = b'LSS'
+# Terms per bucket: larger buckets compress slightly better, smaller ones look up faster.
+# Below 128, so that a count of a bucket's terms is one byte
+BUCKET_SIZE = 16
+
+
+class SearchFormatError(ValueError):
+    """Raised when a file is not a search index of the expected kind."""
+
+
+# =============================================================================
+# ENCODING
+# =============================================================================
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_string(out, text):
+    data = text.encode('utf-8')
+    write_varint(out, len(data))
+    out += data
+
+
+def write_varints(values):
+    out = bytearray()
+    for value in values:
+        write_varint(out, value)
+    return bytes(out)
+
+
+def deltas(numbers):
+    """The first of a sorted list of numbers, then the differences between neighbours."""
+    return numbers[:1] + [b - a for a, b in zip(numbers, numbers[1:])]
+
+
+def write_postings(postings):
+    """Pack a posting list, [section_delta, count, ...], as described above."""
+    out = bytearray()
+    for i in range(0, len(postings), 2):
+        delta, count = postings[i], postings[i + 1]
+        write_varint(out, delta * 2 + (count > 1))
+        if count > 1:
+            write_varint(out, count - 2)
+    return bytes(out)
+
+
+def derived_anchor(heading):
+    """The anchor a section gets by default, or None if it is not derived from the heading."""
+    return slugify(heading) if heading.isascii() else None
+
+
+def write_term_table(out, values):
+    """Write a {term: bytes} mapping as a bucketed, front-coded term table."""
+    offsets = bytearray()
+    entries = bytearray()
+    data = bytearray()
+    last_entries = last_data = 0
+    previous = b''
+    for i, term in enumerate(sorted(values)):
+        encoded = term.encode('utf-8')
+        if i % BUCKET_SIZE == 0:
+            write_varint(offsets, len(entries) - last_entries)
+            write_varint(offsets, len(data) - last_data)
+            last_entries, last_data = len(entries), len(data)
+            previous = b''
+        shared = 0
+        limit = min(len(previous), len(encoded))
+        while shared < limit and previous[shared] == encoded[shared]:
+            shared += 1
+        write_varint(entries, shared)
+        write_varint(entries, len(encoded) - shared)
+        entries += encoded[shared:]
+        write_varint(entries, len(values[term]))
+        data += values[term]
+        previous = encoded
+    write_varint(out, len(values))
+    write_varint(out, BUCKET_SIZE)
+    out += offsets
+    write_varint(out, len(entries))
+    out += entries
+    write_varint(out, len(data))
+    out += data
+
+
+def encode_dictionary(dictionary):
+    out = bytearray(DICTIONARY_MAGIC)
+    write_string(out, dictionary['version'])
+    write_varint(out, len(dictionary['lectures']))
+    for num, title in dictionary['lectures']:
+        write_varint(out, num)
+        write_string(out, title)
+    terms = dictionary['terms']
+    write_term_table(out, {term: write_varints(deltas(lectures)) for term, lectures in terms.items()})
+    # Terms each lecture has in each bucket, from which a term's position in a shard follows
+    ordered = sorted(terms)
+    for start in range(0, len(ordered), BUCKET_SIZE):
+        bucket = [set(terms[term]) for term in ordered[start:start + BUCKET_SIZE]]
+        out += bytes(sum(1 for lectures in bucket if num in lectures) for num, _ in dictionary['lectures'])
+    return bytes(out)
+
+
+def encode_shard(shard, version):
+    out = bytearray(SHARD_MAGIC)
+    write_string(out, version)
+    write_varint(out, shard['lecture'])
+    write_string(out, shard['title'])
+    write_string(out, shard['url'])
+
+    strings = {}
+    for anchor, heading in shard['sections']:
+        strings.setdefault(heading, len(strings))
+        if anchor != derived_anchor(heading):
+            strings.setdefault(anchor, len(strings))
+    write_varint(out, len(strings))
+    for text in strings:
+        write_string(out, text)
+    write_varint(out, len(shard['sections']))
+    for anchor, heading in shard['sections']:
+        write_varint(out, strings[heading])
+        write_varint(out, 0 if anchor == derived_anchor(heading) else strings[anchor] + 1)
+
+    # Posting lists in term order, each with its size; the terms themselves are in the dictionary
+    postings = shard['postings']
+    offsets = bytearray()
+    data = bytearray()
+    last = 0
+    for i, term in enumerate(sorted(postings)):
+        if i % BUCKET_SIZE == 0:
+            write_varint(offsets, len(data) - last)
+            last = len(data)
+        value = write_postings(postings[term])
+        write_varint(data, len(value))
+        data += value
+    write_varint(out, len(postings))
+    write_varint(out, BUCKET_SIZE)
+    out += offsets
+    write_varint(out, len(data))
+    out += data
+    return bytes(out)
+
+
+# =============================================================================
+# DECODING
+# =============================================================================
+
+class Reader:
+    """Sequential reader over an encoded index file."""
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.pos = 0
+
+    def varint(self):
+        return self.varints(1)[0]
+
+    def varints(self, count):
+        """The next `count` varints; most are a single byte, which takes the fast path."""
+        data = self.data
+        pos = self.pos
+        values = []
+        append = values.append
+        try:
+            for _ in range(count):
+                byte = data[pos]
+                pos += 1
+                if byte < 0x80:
+                    append(byte)
+                    continue
+                value = byte & 0x7f
+                shift = 7
+                while True:
+                    byte = data[pos]
+                    pos += 1
+                    value |= (byte & 0x7f) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
+                append(value)
+        except IndexError:
+            raise SearchFormatError('truncated search index') from None
+        self.pos = pos
+        return values
+
+    def raw(self, size):
+        start = self.pos
+        self.pos += size
+        if self.pos > len(self.data):
+            raise SearchFormatError('truncated search index')
+        return self.data[start:self.pos]
+
+    def string(self):
+        return self.raw(self.varint()).decode('utf-8')
+
+    def strings(self, count):
+        """The next `count` strings, with the single-byte lengths of short ones on a fast path."""
+        data = self.data
+        strings = []
+        for _ in range(count):
+            size = data[self.pos] if self.pos < len(data) else 0x80
+            if size < 0x80:
+                self.pos += 1
+                strings.append(self.raw(size).decode('utf-8'))
+            else:
+                strings.append(self.string())
+        return strings
+
+    def header(self, magic):
+        if self.raw(len(magic)) != magic:
+            raise SearchFormatError(f'not a search index file (expected {magic.decode()})')
+        return self.string()
+
+
+def read_varints(data):
+    """The varints packed in `data`, in order."""
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            yield value
+            value = shift = 0
+        else:
+            shift += 7
+
+
+def read_postings(data):
+    """A packed posting list as [section_delta, count, ...]."""
+    postings = []
+    values = read_varints(data)
+    for value in values:
+        postings += [value >> 1, next(values) + 2 if value & 1 else 1]
+    return postings
+
+
+class TermTable:
+    """
+    Read-only mapping over a term table: term -> decoded value.
+
+    Only the first term of each bucket is decoded when the table is read;
+    looking up a term decodes (and keeps) one bucket.
+    """
+
+    def __init__(self, reader, decode_value):
+        self.count, self.bucket_size = reader.varints(2)
+        offsets = reader.varints(2 * -(-self.count // self.bucket_size))
+        self.entry_offsets = list(accumulate(offsets[0::2]))
+        self.data_offsets = list(accumulate(offsets[1::2]))
+        self.entries = reader.raw(reader.varint())
+        self.data = reader.raw(reader.varint())
+        self.decode_value = decode_value
+        # Decoded buckets and their values, kept for later lookups
+        self.buckets = {}
+        self.values = {}
+        self.heads = [self._head(i) for i in range(len(self.entry_offsets))]
+
+    def _bucket(self, index):
+        """(term, start, end) of every entry in a bucket, values as data block offsets."""
+        if index in self.buckets:
+            return self.buckets[index]
+        reader = Reader(self.entries)
+        reader.pos = self.entry_offsets[index]
+        end = self.data_offsets[index]
+        term = b''
+        entries = []
+        for _ in range(min(self.bucket_size, self.count - index * self.bucket_size)):
+            shared, size = reader.varints(2)
+            term = term[:shared] + reader.raw(size)
+            start = end
+            end += reader.varint()
+            entries.append((term.decode('utf-8'), start, end))
+        self.buckets[index] = entries
+        return entries
+
+    def _head(self, index):
+        """The first term of a bucket, which is stored whole."""
+        reader = Reader(self.entries)
+        reader.pos = self.entry_offsets[index]
+        reader.varint()
+        return reader.string()
+
+    def _find(self, term):
+        index = bisect.bisect_right(self.heads, term) - 1
+        if index >= 0:
+            for found, start, end in self._bucket(index):
+                if found == term:
+                    return start, end
+                if found > term:
+                    break
+        return None
+
+    def bucket_values(self, term):
+        """(bucket index, values of the bucket's terms up to `term`), or None if `term` is absent."""
+        index = bisect.bisect_right(self.heads, term) - 1
+        if index >= 0:
+            entries = self._bucket(index)
+            for i, (found, _, _) in enumerate(entries):
+                if found == term:
+                    if index not in self.values:
+                        self.values[index] = [self.decode_value(self.data[start:end]) for _, start, end in entries]
+                    return index, self.values[index][:i + 1]
+                if found > term:
+                    break
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, term):
+        return self._find(term) is not None
+
+    def __getitem__(self, term):
+        span = self._find(term)
+        if span is None:
+            raise KeyError(term)
+        return self.decode_value(self.data[span[0]:span[1]])
+
+    def get(self, term, default=None):
+        span = self._find(term)
+        return default if span is None else self.decode_value(self.data[span[0]:span[1]])
+
+    def __iter__(self):
+        for index in range(len(self.heads)):
+            for term, _, _ in self._bucket(index):
+                yield term
+
+    def items(self):
+        for index in range(len(self.heads)):
+            for term, start, end in self._bucket(index):
+                yield term, self.decode_value(self.data[start:end])
+
+    def with_prefix(self, prefix, limit):
+        """Up to `limit` terms starting with `prefix`, in order."""
+        found = []
+        for index in range(max(bisect.bisect_right(self.heads, prefix) - 1, 0), len(self.heads)):
+            for term, _, _ in self._bucket(index):
+                if term < prefix:
+                    continue
+                if not term.startswith(prefix) or len(found) == limit:
+                    return found
+                found.append(term)
+        return found
+
+
+def decode_lectures(data):
+    return list(accumulate(read_varints(data)))
+
+
+def decode_dictionary(data):
+    reader = Reader(data)
+    version = reader.header(DICTIONARY_MAGIC)
+    lectures = []
+    for _ in range(reader.varint()):
+        num = reader.varint()
+        lectures.append([num, reader.string()])
+    terms = TermTable(reader, decode_lectures)
+    counts = reader.raw(len(terms.heads) * len(lectures))
+    # lecture -> terms the lecture has before each bucket
+    ranks = {num: [0, *accumulate(counts[i::len(lectures)])] for i, (num, _) in enumerate(lectures)}
+    return {'version': version, 'lectures': lectures, 'terms': terms, 'ranks': ranks}
+
+
+def term_rank(dictionary, term, lecture):
+    """The position of `term` among the sorted terms of `lecture`, or None if the lecture lacks it."""
+    found = dictionary['terms'].bucket_values(term)
+    if found is None or lecture not in found[1][-1]:
+        return None
+    index, values = found
+    return dictionary['ranks'][lecture][index] + sum(1 for lectures in values[:-1] if lecture in lectures)
+
+
+class ShardPostings:
+    """
+    Read-only mapping over a shard's posting lists: term -> packed bytes.
+
+    Terms are looked up in the dictionary, which must come from the same build.
+    """
+
+    def __init__(self, reader, dictionary, lecture):
+        self.count, self.bucket_size = reader.varints(2)
+        self.offsets = list(accumulate(reader.varints(-(-self.count // self.bucket_size))))
+        self.data = reader.raw(reader.varint())
+        self.dictionary = dictionary
+        self.lecture = lecture
+        self.ranks = {}
+
+    def _rank(self, term):
+        if term not in self.ranks:
+            self.ranks[term] = term_rank(self.dictionary, term, self.lecture)
+        return self.ranks[term]
+
+    def _value(self, rank):
+        reader = Reader(self.data)
+        reader.pos = self.offsets[rank // self.bucket_size]
+        for _ in range(rank % self.bucket_size):
+            size = reader.varint()
+            reader.pos += size
+        return reader.raw(reader.varint())
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, term):
+        return self._rank(term) is not None
+
+    def __getitem__(self, term):
+        rank = self._rank(term)
+        if rank is None:
+            raise KeyError(term)
+        return self._value(rank)
+
+    def get(self, term, default=None):
+        rank = self._rank(term)
+        return default if rank is None else self._value(rank)
+
+    def __iter__(self):
+        for term, _ in self.items():
+            yield term
+
+    def items(self):
+        rank = 0
+        for term, lectures in self.dictionary['terms'].items():
+            if self.lecture in lectures:
+                yield term, self._value(rank)
+                rank += 1
+
+
+class ShardSections:
+    """Read-only sequence of a shard's [anchor, heading] sections; derived anchors are made on access."""
+
+    def __init__(self, strings, records):
+        self.strings = strings
+        self.records = records
+
+    def __len__(self):
+        return len(self.records) // 2
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        heading = self.strings[self.records[2 * index]]
+        anchor = self.records[2 * index + 1]
+        return [self.strings[anchor - 1] if anchor else derived_anchor(heading), heading]
+
+
+def decode_shard(data, dictionary):
+    """A shard; `dictionary` is the decoded dictionary of the same build."""
+    reader = Reader(data)
+    reader.header(SHARD_MAGIC)
+    lecture = reader.varint()
+    title = reader.string()
+    url = reader.string()
+    strings = reader.strings(reader.varint())
+    sections = ShardSections(strings, reader.varints(2 * reader.varint()))
+    return {'lecture': lecture, 'title': title, 'url': url, 'sections': sections,
+            'postings': ShardPostings(reader, dictionary, lecture)}
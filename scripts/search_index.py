@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Full-text search index for the lecture notes, sharded per lecture.
+
+The build tokenizes each lecture from its parsed tree and writes one shard,
+Lectures/search/lecture-NN.bin, next to a small dictionary,
+Lectures/search/terms.bin, that maps every term to the lectures containing
+it. A query reads the dictionary, intersects the lecture lists of its words
+and fetches only the shards of the lectures that can match. The dictionary
+is built from Lectures/search/vocabulary/lecture-NN.json, each lecture's
+sorted terms, because the binary shards leave the terms to the dictionary.
+
+A shard holds, shown as JSON (search_format.py describes the binary encoding
+the build writes):
+
+    {"lecture": 7, "title": "...", "url": "../html/lecture-07.html",
+     "sections": [[anchor, heading], ...],
+     "postings": {term: [section, count, section_delta, count, ...]}}
+
+Section 0 is the text before the first heading (anchor ""), and section i
+its heading and the text up to the next one. A posting list has one pair per
+section containing the term, in order: the section, as the first section
+number and then the difference to the previous one, and how often the term
+occurs there. There are no word positions; the heading and phrase bonuses
+are worked out from the heading text when a section matches.
+
+Queries match every word (the last one also as a prefix, for search as you
+type) within one section, and rank sections by occurrences, with bonuses for
+the words appearing in the heading and as a phrase in it. assets/js/search.js
+runs the same algorithm in the browser. For testing from the repository root:
+
+    python scripts/search_index.py write-back        # results and query time
+    python scripts/search_index.py --stats           # index size, raw and gzipped
+
+scripts/bench_search_index.py compares the binary format with plain JSON.
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from search_format import decode_dictionary, decode_shard, read_postings
+
+SEARCH_DIR = Path('Lectures/search')
+DICTIONARY_NAME = 'terms.bin'
+SHARD_NAME = 'lecture-{num:02d}.bin'
+VOCABULARY_DIR = SEARCH_DIR / 'vocabulary'
+# Bump whenever tokenizing or the file format changes
+INDEX_VERSION = '3'
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+# Too common to narrow a search, so they are left out of the index
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have if in into is it its of on or so such '
+    'than that the their then there these this to was were which will with'.split())
+# Nodes whose text is markup or TeX rather than prose
+SKIPPED_NODES = {'math', 'math_block', 'html', 'comment'}
+# Expansions considered for the prefix of the last query word
+MAX_PREFIX_TERMS = 50
+PHRASE_BONUS = 5
+HEADING_BONUS = 10
+MAX_RESULTS = 20
+
+
+def tokenize(text):
+    """Lowercase word tokens of `text`, stopwords included."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def query_words(text):
+    """The words of a query that take part in matching."""
+    return [word for word in tokenize(text) if word not in STOPWORDS]
+
+
+def _fragments(node):
+    """Text of a node and its descendants, one fragment per text-bearing node."""
+    if node.type in SKIPPED_NODES:
+        return
+    if node.type == 'image':
+        yield node.attrs.get('alt', '')
+    elif node.text:
+        yield node.text
+    for child in node.children:
+        yield from _fragments(child)
+
+
+# =============================================================================
+# BUILDING
+# =============================================================================
+
+def lecture_shard(doc, lecture_num, title, url):
+    """Build the shard of one lecture from its parsed tree."""
+    sections = [['', title]]
+    # term -> {section: occurrences}
+    counts = {}
+
+    def add(text):
+        section = len(sections) - 1
+        for token in tokenize(text):
+            if token not in STOPWORDS:
+                hits = counts.setdefault(token, {})
+                hits[section] = hits.get(section, 0) + 1
+
+    for block in doc.children:
+        # The H1 is the page title, shown in the header rather than as a section
+        if block.type == 'heading' and block.attrs['level'] > 1:
+            heading = block.plain_text().strip()
+            sections.append([block.attrs['id'], heading])
+            add(heading)
+            continue
+        for fragment in _fragments(block):
+            add(fragment)
+
+    postings = {term: section_postings(counts[term]) for term in sorted(counts)}
+    return {'lecture': lecture_num, 'title': title, 'url': url, 'sections': sections,
+            'postings': postings}
+
+
+def section_postings(hits):
+    """A posting list from a term's {section: occurrences}."""
+    postings = []
+    previous = 0
+    for section in sorted(hits):
+        postings += [section - previous, hits[section]]
+        previous = section
+    return postings
+
+
+def lecture_vocabulary(shard):
+    """What the dictionary needs from a shard: its lecture, title and sorted terms."""
+    return {'lecture': shard['lecture'], 'title': shard['title'], 'terms': sorted(shard['postings'])}
+
+
+def dump_vocabulary(vocabulary):
+    return json.dumps(vocabulary, ensure_ascii=False, indent=1) + '\n'
+
+
+def build_dictionary(vocabularies):
+    """The term dictionary for a list of lecture vocabularies."""
+    lectures = []
+    terms = {}
+    for vocabulary in sorted(vocabularies, key=lambda vocabulary: vocabulary['lecture']):
+        lectures.append([vocabulary['lecture'], vocabulary['title']])
+        for term in vocabulary['terms']:
+            terms.setdefault(term, []).append(vocabulary['lecture'])
+    return {'version': INDEX_VERSION, 'lectures': lectures,
+            'terms': {term: terms[term] for term in sorted(terms)}}
+
+
+# =============================================================================
+# QUERYING
+# =============================================================================
+
+def decode_postings(postings):
+    """(section, occurrences) from a posting list, as a list or its packed bytes."""
+    if isinstance(postings, bytes):
+        postings = read_postings(postings)
+    section = 0
+    for i in range(0, len(postings), 2):
+        section += postings[i]
+        yield section, postings[i + 1]
+
+
+class SearchIndex:
+    """
+    Queries a directory written by the build, loading shards on first use.
+
+    `dictionary` is as returned by search_format.decode_dictionary(); its
+    terms only need `in`, item access and with_prefix(). `load_shard(num)`
+    returns a decoded shard.
+    """
+
+    def __init__(self, dictionary, load_shard):
+        self.dictionary = dictionary
+        self.load_shard = load_shard
+        self.shards = {}
+
+    @classmethod
+    def load(cls, directory=SEARCH_DIR):
+        directory = Path(directory)
+        dictionary = decode_dictionary((directory / DICTIONARY_NAME).read_bytes())
+
+        def load_shard(num):
+            return decode_shard((directory / SHARD_NAME.format(num=num)).read_bytes(), dictionary)
+        return cls(dictionary, load_shard)
+
+    def shard(self, num):
+        if num not in self.shards:
+            self.shards[num] = self.load_shard(num)
+        return self.shards[num]
+
+    def expand(self, word, prefix):
+        """Dictionary terms a query word stands for."""
+        terms = self.dictionary['terms']
+        if not prefix:
+            return [word] if word in terms else []
+        return terms.with_prefix(word, MAX_PREFIX_TERMS)
+
+    def query(self, text, limit=MAX_RESULTS):
+        """
+        Ranked matches for `text`, best first.
+
+        Each result is a dict with lecture, title, anchor, heading, url and score;
+        `url` is relative to the index directory.
+        """
+        words = query_words(text)
+        if not words:
+            return []
+        expansions = [self.expand(word, i == len(words) - 1) for i, word in enumerate(words)]
+        lectures = None
+        for terms in expansions:
+            found = set()
+            for term in terms:
+                found.update(self.dictionary['terms'][term])
+            lectures = found if lectures is None else lectures & found
+        term_sets = [set(terms) for terms in expansions]
+        results = []
+        for num in sorted(lectures):
+            shard = self.shard(num)
+            # section -> occurrences, one map per query word
+            hits = []
+            for terms in expansions:
+                merged = {}
+                for term in terms:
+                    for section, count in decode_postings(shard['postings'].get(term, b'')):
+                        merged[section] = merged.get(section, 0) + count
+                hits.append(merged)
+            for section in sorted(set.intersection(*(set(merged) for merged in hits))):
+                anchor, heading = shard['sections'][section]
+                score = sum(merged[section] for merged in hits)
+                # Section 0's heading is the lecture title, which is not part of its text
+                if section:
+                    tokens = tokenize(heading)
+                    score += HEADING_BONUS * sum(1 for terms in term_sets if not terms.isdisjoint(tokens))
+                    score += PHRASE_BONUS * count_phrases(tokens, term_sets)
+                url = shard['url'] + (f'#{anchor}' if anchor else '')
+                results.append({'lecture': num, 'title': shard['title'], 'anchor': anchor,
+                                'heading': heading, 'url': url, 'score': score})
+        results.sort(key=lambda r: (-r['score'], r['lecture']))
+        return results[:limit]
+
+
+def count_phrases(tokens, term_sets):
+    """How often `tokens` contain one term of each set, one after another."""
+    if len(term_sets) < 2:
+        return 0
+    return sum(1 for start in range(len(tokens) - len(term_sets) + 1)
+               if all(tokens[start + i] in terms for i, terms in enumerate(term_sets)))
+
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+
+def gzipped_size(path):
+    return len(gzip.compress(Path(path).read_bytes(), 9))
+
+
+def print_stats(directory):
+    directory = Path(directory)
+    shards = sorted(directory.glob(SHARD_NAME.replace('{num:02d}', '*')))
+    terms = len(decode_dictionary((directory / DICTIONARY_NAME).read_bytes())['terms'])
+    dictionary = gzipped_size(directory / DICTIONARY_NAME)
+    sizes = sorted(gzipped_size(path) for path in shards)
+    raw = sum(path.stat().st_size for path in [directory / DICTIONARY_NAME, *shards])
+    print(f"{directory}: {terms:,} terms, {raw:,} bytes ({dictionary + sum(sizes):,} gzipped)")
+    print(f"  dictionary {dictionary:,} bytes gzipped; {len(sizes)} shard(s), "
+          f"median {sizes[len(sizes) // 2]:,}, largest {sizes[-1]:,} bytes gzipped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the lecture search index.')
+    parser.add_argument('query', nargs='*', help='words to search for')
+    parser.add_argument('--stats', action='store_true', help='print the size of the index')
+    parser.add_argument('--dir', default=str(SEARCH_DIR), help=f'index directory (default: {SEARCH_DIR})')
+    args = parser.parse_args(argv)
+
+    if not (Path(args.dir) / DICTIONARY_NAME).is_file():
+        print(f"{Path(args.dir) / DICTIONARY_NAME} not found; run scripts/build.py first")
+        return 1
+    if args.stats:
+        print_stats(args.dir)
+    if args.query:
+        index = SearchIndex.load(args.dir)
+        text = ' '.join(args.query)
+        start = time.perf_counter()
+        results = index.query(text)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        index.query(text)
+        warm = time.perf_counter() - start
+        for result in results:
+            print(f"{result['score']:4d}  Lecture {result['lecture']:2d}  {result['heading']}  ({result['url']})")
+        fetched = gzipped_size(Path(args.dir) / DICTIONARY_NAME) + sum(
+            gzipped_size(Path(args.dir) / SHARD_NAME.format(num=num)) for num in index.shards)
+        print(f"\n{len(results)} result(s) in {cold * 1000:.2f} ms ({warm * 1000:.2f} ms with shards loaded), "
+              f"{len(index.shards)} shard(s) read, {fetched:,} bytes gzipped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Service worker and precache manifest for reading the lectures offline.
+
+Each build writes /sw.js from scripts/templates/sw.js with a precache manifest
+listing index.html, every lecture page and every content-hashed asset those
+pages reference (the purged stylesheet, the icon sprite and the lecture
+images). Pages carry a revision, a hash of their final HTML; fingerprinted
+assets need none because the hash is already part of their name.
+
+Browsers re-install the worker whenever sw.js changes, and the worker only
+downloads the entries whose URL or revision is not in its cache yet, so a
+build that changes one lecture costs returning readers one page.
+"""
+
+import json
+import posixpath
+import re
+from html import unescape
+from pathlib import Path
+from urllib.parse import unquote
+
+from build_manifest import hash_bytes
+from fingerprint_assets import FINGERPRINT_DIR, HASH_LENGTH, URL_ATTR_RE
+
+SERVICE_WORKER_PATH = Path('sw.js')
+TEMPLATE_PATH = Path(__file__).resolve().parent / 'templates' / 'sw.js'
+MANIFEST_PLACEHOLDER = '/* PRECACHE_MANIFEST */[]'
+MANIFEST_LINE_RE = re.compile(r'^const PRECACHE_MANIFEST = (.*);$', re.M)
+
+
+def referenced_assets(html, page_dir):
+    """Repository paths of the fingerprinted copies a page links to."""
+    paths = set()
+    prefix = FINGERPRINT_DIR.as_posix() + '/'
+    for _, url, _ in URL_ATTR_RE.findall(html):
+        if '://' in url or url.startswith(('//', 'data:')):
+            continue
+        path = posixpath.normpath(posixpath.join(page_dir, unquote(unescape(url))))
+        if path.startswith(prefix):
+            paths.add(path)
+    return paths
+
+
+def precache_manifest(pages, pending=()):
+    """
+    Return the manifest entries for `pages`, a dict of Path -> final HTML.
+
+    Entries are {'url': ..., 'revision': ...} with URLs relative to the site
+    root, sorted by URL; fingerprinted assets have a revision of None.
+    `pending` holds the paths the build is about to write, which count as
+    present although they are not on disk yet.
+    """
+    pending = {Path(path).as_posix() for path in pending}
+    revisions = {}
+    for path, html in pages.items():
+        revisions[path.as_posix()] = hash_bytes(html)[:HASH_LENGTH]
+        for asset in referenced_assets(html, path.parent.as_posix()):
+            revisions[asset] = None
+    # Assets that disappeared since the pages were written are left to the network
+    return [{'url': url, 'revision': revision} for url, revision in sorted(revisions.items())
+            if revision is not None or url in pending or Path(url).is_file()]
+
+
+def render_service_worker(manifest, template):
+    """sw.js with `manifest` in place of the template's placeholder."""
+    if MANIFEST_PLACEHOLDER not in template:
+        raise ValueError(f'{TEMPLATE_PATH} has no {MANIFEST_PLACEHOLDER} placeholder')
+    return template.replace(MANIFEST_PLACEHOLDER, json.dumps(manifest, separators=(',', ':')), 1)
+
+
+def read_manifest(service_worker):
+    """The precache manifest of an existing sw.js, or [] when there is none."""
+    match = MANIFEST_LINE_RE.search(service_worker or '')
+    if not match:
+        return []
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return []
+
+
+def changed_entries(old, new):
+    """URLs in manifest `new` that a worker holding manifest `old` has to download."""
+    cached = {(entry['url'], entry['revision']) for entry in old}
+    return [entry['url'] for entry in new if (entry['url'], entry['revision']) not in cached]
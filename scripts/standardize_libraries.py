@@ -1,37 +1,44 @@
 #!/usr/bin/env python3
 """
-Standardize KaTeX and Prism.js libraries across all lecture HTML files.
-Uses consistent CDN (cdnjs.cloudflare.com) and all required components.
+Standardize the KaTeX includes across all lecture HTML files.
+KaTeX is only included in pages that contain math delimiters, and auto-render
+only scans the elements the converter wraps math in. Code blocks are
+highlighted at build time (see highlight.py), so Prism.js includes left over
+in older pages are removed rather than replaced.
 """
 
 import re
 import os
 from pathlib import Path
 
-# Standard library block to insert
-STANDARD_LIBRARIES = """    <!-- KaTeX for math rendering -->
+# Elements the converter puts math in; auto-render only scans these
+MATH_SELECTOR = '.math-display, .math-inline'
+
+# Standard library block to insert into pages with math
+STANDARD_LIBRARIES = f"""    <!-- KaTeX for math rendering -->
     <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/katex.min.css">
     <script defer src="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/katex.min.js"></script>
-    <script defer src="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/contrib/auto-render.min.js" onload="renderMathInElement(document.body);"></script>
-
-    <!-- Prism.js for code syntax highlighting -->
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/themes/prism.min.css">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/prism.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/components/prism-c.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/components/prism-asm6502.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/components/prism-bash.min.js"></script>
+    <script defer src="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/contrib/auto-render.min.js" onload="document.querySelectorAll('{MATH_SELECTOR}').forEach(function (el) {{ renderMathInElement(el); }});"></script>
 """
 
-def standardize_lecture(file_path):
-    """Remove existing library includes and add standardized ones."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+# Delimiters auto-render looks for; inline $...$ is not enabled
+MATH_DELIMITER_RE = re.compile(r'\\\(|\\\[|\$\$')
+# Content where delimiters are literal text
+NO_MATH_RE = re.compile(r'<(pre|code|script|style)\b.*?</\1>', re.S | re.I)
+
+
+def has_math(content):
+    """Whether the body of a page contains math delimiters outside code and scripts."""
+    body = content.partition('</head>')[2] or content
+    return MATH_DELIMITER_RE.search(NO_MATH_RE.sub('', body)) is not None
+
+
+def standardize_html(content):
+    """Return page HTML with its KaTeX includes replaced by the standard block (pages with math only) and Prism removed, or None if it has no </head>."""
     # Find the </head> tag
     head_end_match = re.search(r'</head>', content)
     if not head_end_match:
-        print(f"  ⚠️  Warning: No </head> tag found in {file_path}")
-        return False
+        return None
     
     # Remove all existing KaTeX and Prism references
     # Remove KaTeX lines
@@ -45,7 +52,19 @@ def standardize_lecture(file_path):
     content = re.sub(r'    <script.*?prism.*?></script>\n', '', content, flags=re.IGNORECASE)
     
     # Insert standard libraries before </head>
-    content = content.replace('</head>', f'{STANDARD_LIBRARIES}</head>')
+    if not has_math(content):
+        return content
+    return content.replace('</head>', f'{STANDARD_LIBRARIES}</head>')
+
+def standardize_lecture(file_path):
+    """Remove existing library includes and add standardized ones."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    content = standardize_html(content)
+    if content is None:
+        print(f"  ⚠️  Warning: No </head> tag found in {file_path}")
+        return False
     
     # Write back
     with open(file_path, 'w', encoding='utf-8') as f:
@@ -0,0 +1,117 @@
+// Service worker for offline reading. scripts/build.py writes /sw.js from this
+// template, with the precache manifest filled in; edit the template, not sw.js.
+//
+// Every manifest entry is cached under its URL plus revision, so a new build
+// only downloads the entries whose revision changed. Pages are served from the
+// cache and revalidated in the background; content-hashed assets never change
+// and are served from the cache without revalidation.
+
+const PRECACHE_MANIFEST = /* PRECACHE_MANIFEST */[];
+
+const PRECACHE = 'precache-v1';
+const RUNTIME = 'runtime-v1';
+// Directories whose file names carry a content hash
+const IMMUTABLE_RE = /\/(?:assets\/dist|Lectures\/img-variants)\//;
+// Lectures/img-variants/<name>-<hash>-<width>.<format> -> assets/dist/<name>.<hash>.<ext>
+const VARIANT_RE = /\/Lectures\/img-variants\/(.+)-([0-9a-f]{10})-\d+\.\w+$/;
+const ORIGINAL_RE = /\/assets\/dist\/(.+)\.([0-9a-f]{10})\.(?:jpe?g|png)$/;
+
+const scope = new URL(self.registration.scope);
+// URL -> cache key of the revision this build expects
+const precacheKeys = new Map();
+// <name>-<hash> of each precached image -> its URL, for offline variant requests
+const originals = new Map();
+for (const entry of PRECACHE_MANIFEST) {
+  const url = new URL(entry.url, scope);
+  const key = new URL(url);
+  if (entry.revision) key.searchParams.set('__rev', entry.revision);
+  precacheKeys.set(url.href, key.href);
+  const original = ORIGINAL_RE.exec(url.pathname);
+  if (original) originals.set(`${original[1]}-${original[2]}`, url.href);
+}
+
+self.addEventListener('install', (event) => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE);
+    const cached = new Set((await cache.keys()).map((request) => request.url));
+    // Entries fetched by an interrupted install stay cached, so a retry resumes
+    await Promise.all([...precacheKeys].filter(([, key]) => !cached.has(key)).map(async ([url, key]) => {
+      const response = await fetch(url, { cache: 'no-cache' });
+      if (!response.ok) throw new Error(`Precaching ${url} failed: ${response.status}`);
+      await cache.put(key, response);
+    }));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const wanted = new Set(precacheKeys.values());
+    const precache = await caches.open(PRECACHE);
+    for (const request of await precache.keys()) {
+      if (!wanted.has(request.url)) await precache.delete(request);
+    }
+    // Image variants of sources that are no longer in the site
+    const runtime = await caches.open(RUNTIME);
+    for (const request of await runtime.keys()) {
+      const variant = VARIANT_RE.exec(new URL(request.url).pathname);
+      if (variant && !originals.has(`${variant[1]}-${variant[2]}`)) await runtime.delete(request);
+    }
+    await self.clients.claim();
+  })());
+});
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== scope.origin) return;
+  url.hash = '';
+  if (request.mode === 'navigate') {
+    url.search = '';
+    if (url.pathname.endsWith('/')) url.pathname += 'index.html';
+    const key = precacheKeys.get(url.href);
+    if (key) event.respondWith(staleWhileRevalidate(event, request, key));
+    return;
+  }
+  const key = precacheKeys.get(url.href);
+  if (key && key !== url.href) {
+    // A page fetched by a script (lecture-nav.js), kept as fresh as navigations
+    event.respondWith(staleWhileRevalidate(event, request, key));
+  } else if (key) {
+    event.respondWith(cacheFirst(request, PRECACHE, key));
+  } else if (IMMUTABLE_RE.test(url.pathname)) {
+    event.respondWith(cacheFirst(request, RUNTIME, request.url).catch(() => originalImage(url)));
+  }
+});
+
+async function staleWhileRevalidate(event, request, key) {
+  const cache = await caches.open(PRECACHE);
+  const update = fetch(request).then(async (response) => {
+    if (response.ok) await cache.put(key, response.clone());
+    return response;
+  });
+  const cached = await cache.match(key);
+  if (cached) {
+    event.waitUntil(update.catch(() => {}));
+    return cached;
+  }
+  return update;
+}
+
+async function cacheFirst(request, cacheName, key) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(key);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) await cache.put(key, response.clone());
+  return response;
+}
+
+// Offline, a <picture> source that was never fetched falls back to the precached original
+async function originalImage(url) {
+  const variant = VARIANT_RE.exec(url.pathname);
+  const original = variant && originals.get(`${variant[1]}-${variant[2]}`);
+  const cached = original && await caches.match(precacheKeys.get(original));
+  return cached || Response.error();
+}
@@ -0,0 +1,673 @@
+"""
+TeX-subset math parser with MathML and LaTeX output.
+
+Math in the lecture notes is parsed once into a small tree. The HTML converter
+turns the tree into static MathML, so pages with math need no KaTeX download
+or client-side parse, and the LaTeX converter serializes the same tree back to
+TeX, so both outputs come from one parse. Unicode symbols typed directly in
+math (×, →, ≤, ...) become the matching TeX commands in the LaTeX output.
+
+The subset covers what lecture notes use: numbers, identifiers and operators,
+fractions, roots, sub/superscripts, Greek letters, arrows and relations,
+\\text and font commands, \\left/\\right, accents, and the align, cases,
+matrix and array environments. Anything else raises TexMathError; callers
+then keep the TeX source for KaTeX to render in the browser.
+"""
+
+import html
+import re
+
+
+class TexMathError(ValueError):
+    """Raised for math outside the supported TeX subset."""
+
+
+class MathNode:
+    """A node in a parsed formula."""
+
+    __slots__ = ('kind', 'text', 'tex', 'children', 'attrs')
+
+    def __init__(self, kind, text='', tex='', children=None, **attrs):
+        self.kind = kind
+        self.text = text
+        self.tex = tex
+        self.children = children if children is not None else []
+        self.attrs = attrs
+
+    def __repr__(self):
+        if self.children:
+            return f'MathNode({self.kind!r}, {self.children!r})'
+        return f'MathNode({self.kind!r}, text={self.text!r})'
+
+
+# =============================================================================
+# SYMBOLS
+# =============================================================================
+
+GREEK = {
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ', 'epsilon': 'ϵ', 'varepsilon': 'ε',
+    'zeta': 'ζ', 'eta': 'η', 'theta': 'θ', 'vartheta': 'ϑ', 'iota': 'ι', 'kappa': 'κ',
+    'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ', 'pi': 'π', 'varpi': 'ϖ', 'rho': 'ρ',
+    'varrho': 'ϱ', 'sigma': 'σ', 'varsigma': 'ς', 'tau': 'τ', 'upsilon': 'υ', 'phi': 'ϕ',
+    'varphi': 'φ', 'chi': 'χ', 'psi': 'ψ', 'omega': 'ω',
+    'Gamma': 'Γ', 'Delta': 'Δ', 'Theta': 'Θ', 'Lambda': 'Λ', 'Xi': 'Ξ', 'Pi': 'Π',
+    'Sigma': 'Σ', 'Upsilon': 'Υ', 'Phi': 'Φ', 'Psi': 'Ψ', 'Omega': 'Ω',
+}
+
+# Binary operators, relations and arrows: \command -> character
+OPERATORS = {
+    'times': '×', 'div': '÷', 'cdot': '⋅', 'pm': '±', 'mp': '∓', 'ast': '∗', 'star': '⋆',
+    'circ': '∘', 'bullet': '∙', 'oplus': '⊕', 'ominus': '⊖', 'otimes': '⊗', 'cup': '∪',
+    'cap': '∩', 'wedge': '∧', 'land': '∧', 'vee': '∨', 'lor': '∨', 'neg': '¬', 'lnot': '¬',
+    'setminus': '∖', 'bmod': 'mod',
+    'leq': '≤', 'le': '≤', 'geq': '≥', 'ge': '≥', 'neq': '≠', 'ne': '≠', 'approx': '≈',
+    'equiv': '≡', 'sim': '∼', 'simeq': '≃', 'cong': '≅', 'propto': '∝', 'll': '≪', 'gg': '≫',
+    'in': '∈', 'notin': '∉', 'ni': '∋', 'subset': '⊂', 'subseteq': '⊆', 'supset': '⊃',
+    'supseteq': '⊇', 'mid': '∣', 'parallel': '∥', 'perp': '⊥', 'coloneqq': '≔',
+    'rightarrow': '→', 'to': '→', 'leftarrow': '←', 'gets': '←', 'leftrightarrow': '↔',
+    'Rightarrow': '⇒', 'Leftarrow': '⇐', 'Leftrightarrow': '⇔', 'implies': '⟹', 'iff': '⟺',
+    'longrightarrow': '⟶', 'longleftarrow': '⟵', 'longleftrightarrow': '⟷', 'mapsto': '↦',
+    'uparrow': '↑', 'downarrow': '↓', 'updownarrow': '↕', 'nearrow': '↗', 'searrow': '↘',
+    'ldots': '…', 'cdots': '⋯', 'vdots': '⋮', 'ddots': '⋱', 'dots': '…', 'prime': '′',
+    'forall': '∀', 'exists': '∃', 'angle': '∠', 'triangle': '△',
+}
+
+# Symbols that behave as identifiers
+IDENTIFIERS = {
+    'infty': '∞', 'partial': '∂', 'nabla': '∇', 'emptyset': '∅', 'varnothing': '∅',
+    'hbar': 'ℏ', 'ell': 'ℓ', 'Re': 'ℜ', 'Im': 'ℑ', 'aleph': 'ℵ',
+}
+
+# Operators whose scripts become limits in display math
+LARGE_OPERATORS = {
+    'sum': '∑', 'prod': '∏', 'coprod': '∐', 'int': '∫', 'iint': '∬', 'oint': '∮',
+    'bigcup': '⋃', 'bigcap': '⋂', 'bigoplus': '⨁', 'bigotimes': '⨂',
+}
+
+FUNCTIONS = {
+    'log', 'ln', 'lg', 'exp', 'sin', 'cos', 'tan', 'sec', 'csc', 'cot', 'arcsin', 'arccos',
+    'arctan', 'sinh', 'cosh', 'tanh', 'deg', 'dim', 'ker', 'arg', 'hom',
+}
+LIMIT_FUNCTIONS = {'lim', 'liminf', 'limsup', 'max', 'min', 'sup', 'inf', 'det', 'gcd', 'Pr'}
+
+# Spacing commands -> width
+SPACES = {
+    ',': '0.1667em', ':': '0.2222em', '>': '0.2222em', ';': '0.2778em', '!': '-0.1667em',
+    ' ': '0.25em', 'quad': '1em', 'qquad': '2em', 'enspace': '0.5em', 'thinspace': '0.1667em',
+}
+
+# Characters that follow a backslash to stand for themselves
+ESCAPED = {'{': '{', '}': '}', '%': '%', '$': '$', '#': '#', '&': '&', '_': '_', '|': '‖'}
+
+# Delimiters for \left, \right and \big...
+DELIMITERS = {
+    '(': '(', ')': ')', '[': '[', ']': ']', '|': '|', '/': '/', '.': '',
+    '\\{': '{', '\\}': '}', '\\|': '‖', '\\langle': '⟨', '\\rangle': '⟩',
+    '\\lfloor': '⌊', '\\rfloor': '⌋', '\\lceil': '⌈', '\\rceil': '⌉', '\\vert': '|', '\\Vert': '‖',
+}
+BIG_SIZES = {
+    'big': '1.2em', 'bigl': '1.2em', 'bigr': '1.2em', 'Big': '1.8em', 'Bigl': '1.8em',
+    'Bigr': '1.8em', 'bigg': '2.4em', 'biggl': '2.4em', 'biggr': '2.4em', 'Bigg': '3em',
+    'Biggl': '3em', 'Biggr': '3em',
+}
+# Plain delimiters keep their size, as in TeX
+NON_STRETCHY = set('()[]{}|‖')
+
+# \command -> (character, placed under the base)
+ACCENTS = {
+    'hat': ('^', False), 'widehat': ('^', False), 'bar': ('¯', False), 'overline': ('‾', False),
+    'vec': ('→', False), 'overrightarrow': ('→', False), 'dot': ('˙', False),
+    'ddot': ('¨', False), 'tilde': ('~', False), 'widetilde': ('~', False),
+    'underline': ('_', True),
+}
+STRETCHY_ACCENTS = {'widehat', 'widetilde', 'overline', 'overrightarrow', 'underline'}
+
+FONTS = {
+    'mathrm': 'normal', 'mathbf': 'bold', 'mathit': 'italic', 'mathsf': 'sans-serif',
+    'mathtt': 'monospace', 'mathcal': 'script', 'mathscr': 'script', 'mathbb': 'double-struck',
+    'mathfrak': 'fraktur', 'boldsymbol': 'bold-italic', 'bm': 'bold-italic',
+}
+TEXT_COMMANDS = {'text': '', 'textrm': '', 'mbox': '', 'textnormal': '',
+                 'textbf': 'font-weight: bold', 'textit': 'font-style: italic'}
+FRACTIONS = {'frac', 'dfrac', 'tfrac', 'cfrac', 'binom'}
+# Commands that only affect equation numbering
+IGNORED = {'nonumber', 'notag', 'displaystyle', 'limits'}
+
+# Environment -> (column alignment pattern, opening and closing fence)
+ENVIRONMENTS = {
+    'align': ('right left', None), 'align*': ('right left', None),
+    'aligned': ('right left', None), 'split': ('right left', None),
+    'alignat': ('right left', None), 'alignat*': ('right left', None),
+    'gather': ('center', None), 'gather*': ('center', None), 'gathered': ('center', None),
+    'equation': ('center', None), 'equation*': ('center', None),
+    'cases': ('left left', ('{', '')),
+    'matrix': ('center', None), 'pmatrix': ('center', ('(', ')')),
+    'bmatrix': ('center', ('[', ']')), 'Bmatrix': ('center', ('{', '}')),
+    'vmatrix': ('center', ('|', '|')), 'Vmatrix': ('center', ('‖', '‖')),
+    'array': (None, None),
+}
+ALIGNED_ENVIRONMENTS = {'align', 'align*', 'aligned', 'split', 'alignat', 'alignat*'}
+
+# Unicode typed directly in math -> the TeX command for the LaTeX output
+UNICODE_COMMANDS = {}
+for _table in (OPERATORS, IDENTIFIERS, GREEK):
+    for _name, _char in _table.items():
+        UNICODE_COMMANDS.setdefault(_char, '\\' + _name)
+UNICODE_COMMANDS['−'] = '-'
+
+ASCII_OPERATORS = set('+-=<>/*()[]|,;:!?.')
+
+COMMAND_RE = re.compile(r'\\([A-Za-z]+|.)', re.S)
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+SPACE_RE = re.compile(r'\s+')
+
+
+# =============================================================================
+# PARSER
+# =============================================================================
+
+class _Parser:
+    def __init__(self, tex):
+        self.tex = tex
+        self.pos = 0
+
+    def error(self, message):
+        raise TexMathError(f'{message} at offset {self.pos} in {self.tex!r}')
+
+    def skip_space(self):
+        match = SPACE_RE.match(self.tex, self.pos)
+        if match:
+            self.pos = match.end()
+
+    def at(self, stop):
+        """Whether the input continues with `stop` (a command only when whole)."""
+        if not self.tex.startswith(stop, self.pos):
+            return False
+        end = self.pos + len(stop)
+        return not (stop[-1].isalpha() and end < len(self.tex) and self.tex[end].isalpha())
+
+    def expect(self, text):
+        self.skip_space()
+        if not self.tex.startswith(text, self.pos):
+            self.error(f'expected {text!r}')
+        self.pos += len(text)
+
+    def parse(self):
+        row = self.parse_row(())
+        if self.pos < len(self.tex):
+            self.error(f'unexpected {self.tex[self.pos]!r}')
+        return row
+
+    def parse_row(self, stops):
+        items = []
+        while True:
+            self.skip_space()
+            if self.pos >= len(self.tex) or any(self.at(stop) for stop in stops):
+                break
+            atom = self.parse_atom()
+            if atom is not None:
+                items.append(self.parse_scripts(atom))
+        return MathNode('row', children=items)
+
+    def parse_group(self):
+        """The contents of a {...} group; the opening brace is next."""
+        self.expect('{')
+        row = self.parse_row(('}',))
+        self.expect('}')
+        return row
+
+    def parse_arg(self):
+        """A command argument: a group or a single token."""
+        self.skip_space()
+        if self.tex.startswith('{', self.pos):
+            return self.parse_group()
+        if self.pos >= len(self.tex):
+            self.error('missing argument')
+        if self.tex[self.pos].isdigit():
+            self.pos += 1
+            return MathNode('row', children=[MathNode('mn', self.tex[self.pos - 1], self.tex[self.pos - 1])])
+        atom = self.parse_atom()
+        return MathNode('row', children=[atom] if atom is not None else [])
+
+    def read_raw_group(self):
+        """The source text of a {...} group, braces balanced."""
+        self.expect('{')
+        depth = 1
+        start = self.pos
+        while self.pos < len(self.tex):
+            char = self.tex[self.pos]
+            if char == '\\':
+                self.pos += 2
+                continue
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if not depth:
+                    self.pos += 1
+                    return self.tex[start:self.pos - 1]
+            self.pos += 1
+        self.error('unclosed group')
+
+    def parse_scripts(self, base):
+        sub = sup = None
+        while True:
+            self.skip_space()
+            if self.pos >= len(self.tex) or self.tex[self.pos] not in '^_\'':
+                break
+            char = self.tex[self.pos]
+            self.pos += 1
+            if char == "'":
+                prime = MathNode('mo', '′', "'")
+                sup = MathNode('row', children=(sup.children if sup else []) + [prime], primes=True)
+                continue
+            if char == '_':
+                if sub is not None:
+                    self.error('double subscript')
+                sub = self.parse_arg()
+            elif sup is None:
+                sup = self.parse_arg()
+            elif sup.attrs.get('primes'):
+                # f'^2 is f^{\prime 2}
+                group = MathNode('row', children=self.parse_arg().children, group=True)
+                sup = MathNode('row', children=sup.children + [group], primes=True)
+            else:
+                self.error('double superscript')
+        if sub is None and sup is None:
+            return base
+        return MathNode('scripts', children=[base], sub=sub, sup=sup)
+
+    def parse_atom(self):
+        tex = self.tex
+        char = tex[self.pos]
+        if char == '{':
+            row = self.parse_group()
+            row.attrs['group'] = True
+            return row
+        if char == '}':
+            self.error('unmatched }')
+        if char in '^_':
+            # A script with nothing before it attaches to an empty base
+            return MathNode('row')
+        if char == '&':
+            self.error('& outside an alignment')
+        if char == '\\':
+            match = COMMAND_RE.match(tex, self.pos)
+            self.pos = match.end()
+            return self.command(match.group(1))
+        number = NUMBER_RE.match(tex, self.pos)
+        if number:
+            self.pos = number.end()
+            return MathNode('mn', number.group(), number.group())
+        self.pos += 1
+        if char == '~':
+            return MathNode('space', tex='~', width='0.25em')
+        if char in UNICODE_COMMANDS:
+            name = UNICODE_COMMANDS[char][1:]
+            kind = 'mi' if name in IDENTIFIERS or name in GREEK else 'mo'
+            return MathNode(kind, char, UNICODE_COMMANDS[char])
+        if char.isalpha():
+            return MathNode('mi', char, char)
+        if char in ASCII_OPERATORS:
+            return MathNode('mo', '−' if char == '-' else char, char)
+        return MathNode('mo', char, char)
+
+    def parse_delimiter(self):
+        self.skip_space()
+        for tex, char in DELIMITERS.items():
+            if self.at(tex):
+                self.pos += len(tex)
+                return MathNode('mo', char, tex)
+        self.error('expected a delimiter')
+
+    def command(self, name):
+        tex = '\\' + name
+        if name in GREEK:
+            return MathNode('mi', GREEK[name], tex)
+        if name in IDENTIFIERS:
+            return MathNode('mi', IDENTIFIERS[name], tex)
+        if name in OPERATORS:
+            return MathNode('mo', OPERATORS[name], tex)
+        if name in LARGE_OPERATORS:
+            return MathNode('mo', LARGE_OPERATORS[name], tex, largeop=True)
+        if name in FUNCTIONS or name in LIMIT_FUNCTIONS:
+            return MathNode('mi', name, tex, limits=name in LIMIT_FUNCTIONS)
+        if name in SPACES:
+            return MathNode('space', tex=tex, width=SPACES[name])
+        if name in ESCAPED:
+            return MathNode('mo' if name in '|&' else 'mi', ESCAPED[name], tex)
+        if name in IGNORED:
+            return None
+        if name in FRACTIONS:
+            return MathNode('frac', tex=tex, children=[self.parse_arg(), self.parse_arg()])
+        if name == 'sqrt':
+            self.skip_space()
+            index = None
+            if self.tex.startswith('[', self.pos):
+                self.pos += 1
+                index = self.parse_row((']',))
+                self.expect(']')
+            body = self.parse_arg()
+            return MathNode('sqrt', tex=tex, children=[body] if index is None else [body, index])
+        if name in TEXT_COMMANDS:
+            return MathNode('mtext', self.read_raw_group(), tex, style=TEXT_COMMANDS[name])
+        if name == 'operatorname':
+            return MathNode('mi', self.read_raw_group(), tex, operatorname=True)
+        if name in FONTS:
+            return MathNode('style', tex=tex, children=[self.parse_arg()], variant=FONTS[name])
+        if name in ACCENTS:
+            char, under = ACCENTS[name]
+            return MathNode('accent', char, tex, children=[self.parse_arg()], under=under,
+                            stretchy=name in STRETCHY_ACCENTS)
+        if name == 'not':
+            self.skip_space()
+            negated = self.parse_atom()
+            if negated is None or negated.kind != 'mo':
+                self.error('\\not before a non-operator')
+            return MathNode('mo', negated.text + '\u0338', f'\\not{negated.tex}')
+        if name == 'left':
+            opener = self.parse_delimiter()
+            body = self.parse_row(('\\right',))
+            self.expect('\\right')
+            closer = self.parse_delimiter()
+            return MathNode('fenced', children=[body], open=opener, close=closer)
+        if name in BIG_SIZES:
+            delimiter = self.parse_delimiter()
+            return MathNode('mo', delimiter.text, f'{tex}{delimiter.tex}', size=BIG_SIZES[name])
+        if name == 'begin':
+            return self.environment()
+        self.error(f'unsupported command {tex}')
+
+    def environment(self):
+        env = self.read_raw_group()
+        if env not in ENVIRONMENTS:
+            self.error(f'unsupported environment {env}')
+        colspec = None
+        if env == 'array':
+            colspec = self.read_raw_group()
+        elif env in ('alignat', 'alignat*'):
+            colspec = self.read_raw_group()
+        rows = []
+        cells = []
+        while True:
+            cells.append(self.parse_row(('&', '\\\\', '\\end')))
+            if self.at('&'):
+                self.pos += 1
+                continue
+            rows.append(MathNode('tr', children=cells))
+            cells = []
+            if self.at('\\\\'):
+                self.pos += 2
+                self.skip_space()
+                # Optional extra row spacing, e.g. \\[2pt]
+                if self.tex.startswith('[', self.pos):
+                    self.pos = self.tex.index(']', self.pos) + 1
+                continue
+            if self.at('\\end'):
+                self.pos += len('\\end')
+                if self.read_raw_group() != env:
+                    self.error(f'\\end does not match \\begin{{{env}}}')
+                break
+            self.error(f'unclosed environment {env}')
+        # A trailing \\ leaves an empty last row
+        if len(rows) > 1 and len(rows[-1].children) == 1 and not rows[-1].children[0].children:
+            rows.pop()
+        return MathNode('table', tex=env, children=rows, env=env, colspec=colspec)
+
+
+def parse_math(tex):
+    """Parse TeX math into a MathNode tree; raises TexMathError outside the subset."""
+    return _Parser(tex).parse()
+
+
+# =============================================================================
+# MATHML
+# =============================================================================
+
+# Offsets of the Mathematical Alphanumeric Symbols block for each variant (A, a, 0)
+VARIANT_BASES = {
+    'bold': (0x1D400, 0x1D41A, 0x1D7CE),
+    'italic': (0x1D434, 0x1D44E, None),
+    'bold-italic': (0x1D468, 0x1D482, 0x1D7CE),
+    'script': (0x1D49C, 0x1D4B6, None),
+    'fraktur': (0x1D504, 0x1D51E, None),
+    'double-struck': (0x1D538, 0x1D552, 0x1D7D8),
+    'sans-serif': (0x1D5A0, 0x1D5BA, 0x1D7E2),
+    'monospace': (0x1D670, 0x1D68A, 0x1D7F6),
+}
+# Letters that live in the Letterlike Symbols block instead
+VARIANT_HOLES = {
+    ('italic', 'h'): 'ℎ',
+    ('script', 'B'): 'ℬ', ('script', 'E'): 'ℰ', ('script', 'F'): 'ℱ', ('script', 'H'): 'ℋ',
+    ('script', 'I'): 'ℐ', ('script', 'L'): 'ℒ', ('script', 'M'): 'ℳ', ('script', 'R'): 'ℛ',
+    ('script', 'e'): 'ℯ', ('script', 'g'): 'ℊ', ('script', 'o'): 'ℴ',
+    ('fraktur', 'C'): 'ℭ', ('fraktur', 'H'): 'ℌ', ('fraktur', 'I'): 'ℑ', ('fraktur', 'R'): 'ℜ',
+    ('fraktur', 'Z'): 'ℨ',
+    ('double-struck', 'C'): 'ℂ', ('double-struck', 'H'): 'ℍ', ('double-struck', 'N'): 'ℕ',
+    ('double-struck', 'P'): 'ℙ', ('double-struck', 'Q'): 'ℚ', ('double-struck', 'R'): 'ℝ',
+    ('double-struck', 'Z'): 'ℤ',
+}
+
+
+def styled_text(text, variant):
+    """Map ASCII letters and digits to their mathematical alphanumeric forms."""
+    upper, lower, digit = VARIANT_BASES[variant]
+    out = []
+    for char in text:
+        if (variant, char) in VARIANT_HOLES:
+            out.append(VARIANT_HOLES[variant, char])
+        elif 'A' <= char <= 'Z':
+            out.append(chr(upper + ord(char) - ord('A')))
+        elif 'a' <= char <= 'z':
+            out.append(chr(lower + ord(char) - ord('a')))
+        elif digit is not None and '0' <= char <= '9':
+            out.append(chr(digit + ord(char) - ord('0')))
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+def _escape(text):
+    return html.escape(text, quote=False)
+
+
+class _MathMLWriter:
+    def __init__(self, display):
+        self.display = display
+
+    def write(self, node, variant=None):
+        method = getattr(self, 'write_' + node.kind)
+        return method(node, variant)
+
+    def write_row(self, node, variant, leading_operator_fix=False):
+        parts = [self.write(child, variant) for child in node.children]
+        # A relation first in an alignment cell keeps its spacing, as with TeX's {}=
+        if leading_operator_fix and node.children and node.children[0].kind == 'mo':
+            parts.insert(0, '<mi></mi>')
+        if len(parts) == 1:
+            return parts[0]
+        return f'<mrow>{"".join(parts)}</mrow>'
+
+    def write_mi(self, node, variant):
+        text = node.text
+        if variant and variant != 'normal' and len(text) == 1:
+            return f'<mi>{_escape(styled_text(text, variant))}</mi>'
+        if variant == 'normal' and len(text) == 1:
+            return f'<mi mathvariant="normal">{_escape(text)}</mi>'
+        return f'<mi>{_escape(text)}</mi>'
+
+    def write_mn(self, node, variant):
+        text = styled_text(node.text, variant) if variant and variant in VARIANT_BASES else node.text
+        return f'<mn>{_escape(text)}</mn>'
+
+    def write_mo(self, node, variant):
+        attrs = ''
+        if 'size' in node.attrs:
+            attrs = f' minsize="{node.attrs["size"]}" maxsize="{node.attrs["size"]}"'
+        elif node.text in NON_STRETCHY:
+            attrs = ' stretchy="false"'
+        if node.attrs.get('largeop') and self.display:
+            attrs += ' largeop="true"'
+        return f'<mo{attrs}>{_escape(node.text)}</mo>'
+
+    def write_mtext(self, node, variant):
+        # Leading and trailing spaces would otherwise collapse away
+        text = node.text
+        stripped = text.strip(' ')
+        text = '\u00a0' * (len(text) - len(text.lstrip(' '))) + stripped + \
+            '\u00a0' * (len(text) - len(text.rstrip(' '))) if stripped else '\u00a0' * len(text)
+        style = f' style="{node.attrs["style"]}"' if node.attrs.get('style') else ''
+        return f'<mtext{style}>{_escape(text)}</mtext>'
+
+    def write_space(self, node, variant):
+        return f'<mspace width="{node.attrs["width"]}"></mspace>'
+
+    def write_frac(self, node, variant):
+        numerator, denominator = (self.write(child, variant) for child in node.children)
+        if node.tex == '\\binom':
+            return (f'<mrow><mo>(</mo><mfrac linethickness="0">{numerator}{denominator}</mfrac>'
+                    f'<mo>)</mo></mrow>')
+        fraction = f'<mfrac>{numerator}{denominator}</mfrac>'
+        if node.tex == '\\dfrac':
+            return f'<mstyle displaystyle="true">{fraction}</mstyle>'
+        if node.tex == '\\tfrac':
+            return f'<mstyle displaystyle="false">{fraction}</mstyle>'
+        return fraction
+
+    def write_sqrt(self, node, variant):
+        body = self.write(node.children[0], variant)
+        if len(node.children) == 2:
+            return f'<mroot>{body}{self.write(node.children[1], variant)}</mroot>'
+        return f'<msqrt>{body}</msqrt>'
+
+    def write_scripts(self, node, variant):
+        base_node = node.children[0]
+        base = self.write(base_node, variant)
+        sub = node.attrs['sub']
+        sup = node.attrs['sup']
+        limits = self.display and (base_node.attrs.get('largeop') or base_node.attrs.get('limits'))
+        if sub is not None and sup is not None:
+            tag = 'munderover' if limits else 'msubsup'
+            return f'<{tag}>{base}{self.write(sub, variant)}{self.write(sup, variant)}</{tag}>'
+        if sub is not None:
+            tag = 'munder' if limits else 'msub'
+            return f'<{tag}>{base}{self.write(sub, variant)}</{tag}>'
+        tag = 'mover' if limits else 'msup'
+        return f'<{tag}>{base}{self.write(sup, variant)}</{tag}>'
+
+    def write_style(self, node, variant):
+        return self.write(node.children[0], node.attrs['variant'])
+
+    def write_accent(self, node, variant):
+        body = self.write(node.children[0], variant)
+        stretchy = 'true' if node.attrs['stretchy'] else 'false'
+        accent = f'<mo stretchy="{stretchy}">{_escape(node.text)}</mo>'
+        if node.attrs['under']:
+            return f'<munder accentunder="true">{body}{accent}</munder>'
+        return f'<mover accent="true">{body}{accent}</mover>'
+
+    def write_fenced(self, node, variant):
+        parts = []
+        if node.attrs['open'].text:
+            parts.append(f'<mo fence="true" form="prefix">{_escape(node.attrs["open"].text)}</mo>')
+        parts.append(self.write(node.children[0], variant))
+        if node.attrs['close'].text:
+            parts.append(f'<mo fence="true" form="postfix">{_escape(node.attrs["close"].text)}</mo>')
+        return f'<mrow>{"".join(parts)}</mrow>'
+
+    def write_table(self, node, variant):
+        env = node.attrs['env']
+        pattern, fences = ENVIRONMENTS[env]
+        if env == 'array':
+            pattern = ' '.join({'l': 'left', 'c': 'center', 'r': 'right'}[c]
+                               for c in node.attrs['colspec'] if c in 'lcr')
+        aligned = env in ALIGNED_ENVIRONMENTS
+        attrs = f' columnalign="{pattern}"'
+        if aligned:
+            # Each right/left pair sits flush; pairs are spread apart
+            attrs += ' columnspacing="0em 2em" displaystyle="true"'
+        rows = []
+        for row in node.children:
+            cells = [f'<mtd>{self.write_row(cell, variant, aligned and i % 2 == 1)}</mtd>'
+                     for i, cell in enumerate(row.children)]
+            rows.append(f'<mtr>{"".join(cells)}</mtr>')
+        table = f'<mtable{attrs}>{"".join(rows)}</mtable>'
+        if fences is None:
+            return table
+        opener, closer = fences
+        parts = [f'<mo fence="true" form="prefix">{_escape(opener)}</mo>', table]
+        if closer:
+            parts.append(f'<mo fence="true" form="postfix">{_escape(closer)}</mo>')
+        return f'<mrow>{"".join(parts)}</mrow>'
+
+
+def to_mathml(tree, display=False, source=None):
+    """Render a parsed formula as a <math> element; `source` becomes its alttext."""
+    attrs = ' display="block"' if display else ''
+    if source is not None:
+        attrs += f' alttext="{html.escape(" ".join(source.split()), quote=True)}"'
+    return f'<math{attrs}>{_MathMLWriter(display).write(tree)}</math>'
+
+
+# =============================================================================
+# LATEX
+# =============================================================================
+
+def _join(parts):
+    """Concatenate TeX fragments, spacing only where a command name would run on."""
+    out = ''
+    for part in parts:
+        if not part:
+            continue
+        if out and re.search(r'\\[A-Za-z]+$', out) and part[0].isalpha():
+            out += ' '
+        out += part
+    return out
+
+
+def _braced(node):
+    latex = to_latex(node)
+    return latex if len(latex) == 1 else f'{{{latex}}}'
+
+
+def to_latex(node):
+    """Serialize a parsed formula back to TeX for the LaTeX output."""
+    kind = node.kind
+    if kind == 'row':
+        latex = _join(to_latex(child) for child in node.children)
+        return f'{{{latex}}}' if node.attrs.get('group') else latex
+    if kind == 'mtext':
+        return f'{node.tex}{{{node.text}}}'
+    if kind == 'mi' and node.attrs.get('operatorname'):
+        return f'\\operatorname{{{node.text}}}'
+    if kind in ('mi', 'mn', 'mo', 'space'):
+        return node.tex
+    if kind == 'frac':
+        return f'{node.tex}{{{to_latex(node.children[0])}}}{{{to_latex(node.children[1])}}}'
+    if kind == 'sqrt':
+        index = f'[{to_latex(node.children[1])}]' if len(node.children) == 2 else ''
+        return f'\\sqrt{index}{{{to_latex(node.children[0])}}}'
+    if kind == 'scripts':
+        latex = to_latex(node.children[0])
+        sub, sup = node.attrs['sub'], node.attrs['sup']
+        if sub is not None:
+            latex += '_' + _braced(sub)
+        if sup is not None:
+            if all(child.tex == "'" for child in sup.children):
+                latex += to_latex(sup)
+            elif sup.attrs.get('primes'):
+                latex += '^{' + _join('\\prime' if child.tex == "'" else to_latex(child)
+                                      for child in sup.children) + '}'
+            else:
+                latex += '^' + _braced(sup)
+        return latex
+    if kind in ('style', 'accent'):
+        return f'{node.tex}{{{to_latex(node.children[0])}}}'
+    if kind == 'fenced':
+        return f'\\left{node.attrs["open"].tex} {to_latex(node.children[0])} \\right{node.attrs["close"].tex}'
+    if kind == 'table':
+        env = node.attrs['env']
+        colspec = f'{{{node.attrs["colspec"]}}}' if node.attrs['colspec'] is not None else ''
+        rows = [' & '.join(to_latex(cell) for cell in row.children) for row in node.children]
+        return f'\\begin{{{env}}}{colspec}\n' + ' \\\\\n'.join(rows) + f'\n\\end{{{env}}}'
+    raise ValueError(f'Unknown math node: {kind}')
@@ -80,6 +80,44 @@ VIDEO_IDS = {
     '20': 'https://www.youtube.com/watch?v=hte_h1SxhYY',  # Lecture 20: Storage and Interfacing
 }
 
+# =============================================================================
+# LINK REWRITING
+# =============================================================================
+
+def resolve_video_ids(video_ids=None):
+    """Return a copy of VIDEO_IDS with every URL reduced to its video ID."""
+    video_ids = VIDEO_IDS if video_ids is None else video_ids
+    return {num: extract_video_id(url_or_id) for num, url_or_id in video_ids.items()}
+
+def apply_index_video_links(content, video_ids):
+    """Point the index.html video buttons at YouTube; returns (content, updated numbers)."""
+    updated = []
+    for num, video_id in video_ids.items():
+        if 'YOUR_VIDEO_ID_HERE' in video_id:
+            continue
+        
+        # Replace #video-XX with actual YouTube URL
+        old_href = f'href="#video-{num}"'
+        if old_href in content:
+            content = content.replace(old_href, f'href="https://www.youtube.com/watch?v={video_id}"')
+            updated.append(num)
+    return content, updated
+
+def apply_lecture_video_links(content, num, video_id):
+    """Fill in the video thumbnail and link placeholders of one lecture page."""
+    youtube_url = f'https://www.youtube.com/watch?v={video_id}'
+    
+    # Replace VIDEO_ID_XX in thumbnail image URLs (older pattern)
+    content = content.replace(f'VIDEO_ID_{num}', video_id)
+    
+    # Replace YOUR_VIDEO_ID_HERE in thumbnail URLs (newer pattern)
+    # This handles files that haven't been updated yet
+    if 'YOUR_VIDEO_ID_HERE' in content:
+        content = content.replace('YOUR_VIDEO_ID_HERE', video_id)
+    
+    # Replace #video-lecture-XX in thumbnail links
+    return content.replace(f'href="#video-lecture-{num}"', f'href="{youtube_url}"')
+
 # =============================================================================
 # SCRIPT EXECUTION
 # =============================================================================
@@ -90,11 +128,9 @@ def main():
     print("=" * 70)
     
     # Extract video IDs from URLs if needed
-    processed_ids = {}
-    for num, url_or_id in VIDEO_IDS.items():
-        video_id = extract_video_id(url_or_id)
-        processed_ids[num] = video_id
-        if url_or_id != video_id and 'YOUR_VIDEO_ID_HERE' not in video_id:
+    processed_ids = resolve_video_ids()
+    for num, video_id in processed_ids.items():
+        if VIDEO_IDS[num] != video_id and 'YOUR_VIDEO_ID_HERE' not in video_id:
             print(f"   Extracted ID for lecture {num}: {video_id}")
     
     VIDEO_IDS.update(processed_ids)
@@ -119,21 +155,10 @@ def main():
         with open('index.html', 'r', encoding='utf-8') as f:
             index_content = f.read()
         
-        updated_count = 0
-        for num, video_id in VIDEO_IDS.items():
-            if 'YOUR_VIDEO_ID_HERE' in video_id:
-                continue
-                
-            youtube_url = f'https://www.youtube.com/watch?v={video_id}'
-            
-            # Replace #video-XX with actual YouTube URL
-            old_href = f'href="#video-{num}"'
-            new_href = f'href="{youtube_url}"'
-            
-            if old_href in index_content:
-                index_content = index_content.replace(old_href, new_href)
-                updated_count += 1
-                print(f'   ✓ Lecture {num}: Updated video button link')
+        index_content, updated = apply_index_video_links(index_content, VIDEO_IDS)
+        updated_count = len(updated)
+        for num in updated:
+            print(f'   ✓ Lecture {num}: Updated video button link')
         
         with open('index.html', 'w', encoding='utf-8') as f:
             f.write(index_content)
@@ -169,34 +194,7 @@ def main():
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            youtube_url = f'https://www.youtube.com/watch?v={video_id}'
-            
-            # Replace VIDEO_ID_XX in thumbnail image URLs (older pattern)
-            content = content.replace(f'VIDEO_ID_{num}', video_id)
-            
-            # Replace YOUR_VIDEO_ID_HERE in thumbnail URLs (newer pattern)
-            # This handles files that haven't been updated yet
-            if 'YOUR_VIDEO_ID_HERE' in content:
-                content = content.replace('YOUR_VIDEO_ID_HERE', video_id)
-            
-            # Replace #video-lecture-XX in thumbnail links
-            content = content.replace(
-                f'href="#video-lecture-{num}"', 
-                f'href="{youtube_url}"'
-            )
-            
-            # Also replace href="https://www.youtube.com/watch?v=YOUR_VIDEO_ID_HERE"
-            content = content.replace(
-                f'href="https://www.youtube.com/watch?v=YOUR_VIDEO_ID_HERE"',
-                f'href="{youtube_url}"'
-            )
-            content = content.replace(f'VIDEO_ID_{num}', video_id)
-            
-            # Replace #video-lecture-XX in thumbnail links
-            content = content.replace(
-                f'href="#video-lecture-{num}"', 
-                f'href="{youtube_url}"'
-            )
+            content = apply_lecture_video_links(content, num, video_id)
             
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
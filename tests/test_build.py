@@ -0,0 +1,57 @@
+import shutil
+from pathlib import Path
+
+from build import SiteBuilder
+from fingerprint_assets import AssetManifest
+from purge_css import PURGED_KEY
+from service_worker import SERVICE_WORKER_PATH, read_manifest
+
+REPO = Path(__file__).resolve().parent.parent
+LECTURES = ['Lecture 1 - Computer Abstractions.md', 'Lecture 2 - Technology Trends.md']
+
+
+def make_site(root):
+    shutil.copy(REPO / 'index.html', root / 'index.html')
+    shutil.copytree(REPO / 'assets', root / 'assets', ignore=shutil.ignore_patterns('dist'))
+    (root / 'Lectures/markdown').mkdir(parents=True)
+    for name in LECTURES:
+        shutil.copy(REPO / 'Lectures/markdown' / name, root / 'Lectures/markdown' / name)
+
+
+def test_clean_build_precaches_the_purged_stylesheet(tmp_path, monkeypatch):
+    make_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    SiteBuilder().run()
+
+    purged = AssetManifest().load().derived[PURGED_KEY]
+    assert Path(purged).is_file()
+    urls = {entry['url'] for entry in read_manifest(SERVICE_WORKER_PATH.read_text(encoding='utf-8'))}
+    assert purged in urls
+    assert 'Lectures/html/lecture-01.html' in urls
+
+    # A second build has nothing left to change in sw.js
+    service_worker = SERVICE_WORKER_PATH.read_text(encoding='utf-8')
+    SiteBuilder().run()
+    assert SERVICE_WORKER_PATH.read_text(encoding='utf-8') == service_worker
+
+
+def html_stamps():
+    return {path.name: path.stat().st_mtime_ns for path in Path('Lectures/html').iterdir()}
+
+
+def test_convert_lectures_and_build_share_one_manifest(tmp_path, monkeypatch, capsys):
+    import build
+    import convert_lectures
+
+    make_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    for first, second in [(convert_lectures.main, build.main), (build.main, convert_lectures.main)]:
+        first([])
+        stamps = html_stamps()
+        capsys.readouterr()
+        second([])
+        assert 'up to date' in capsys.readouterr().out
+        assert html_stamps() == stamps
+        # Running either one again leaves the pages alone too
+        first([])
+        assert html_stamps() == stamps
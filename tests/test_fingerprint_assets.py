@@ -0,0 +1,26 @@
+from fingerprint_assets import fingerprint_name, rewrite_asset_urls
+
+IMAGE = "Lectures/img/Chapter 1 Moore's Law.jpg"
+COPY = 'assets/dist/' + fingerprint_name(IMAGE, '0123456789abcdef')
+
+
+def test_entity_in_url_is_rewritten():
+    page = '<img src="../img/Chapter%201%20Moore&#x27;s%20Law.jpg" alt="">'
+    rewritten = rewrite_asset_urls(page, 'Lectures/html', {IMAGE: COPY})
+    assert rewritten == f'<img src="../../{COPY}" alt="">'
+
+
+def test_rewritten_url_is_escaped():
+    copy = "assets/dist/it's.0123456789.jpg"
+    page = '<a href="../img/Chapter%201%20Moore&#39;s%20Law.jpg">'
+    rewritten = rewrite_asset_urls(page, 'Lectures/html', {IMAGE: copy})
+    assert rewritten == '<a href="../../assets/dist/it%27s.0123456789.jpg">'
+    page = '<a href="../img/a&amp;b.png">'
+    rewritten = rewrite_asset_urls(page, 'Lectures/html', {'Lectures/img/a&b.png': 'assets/dist/a&b.0123456789.png'})
+    assert rewritten == '<a href="../../assets/dist/a%26b.0123456789.png">'
+
+
+def test_rewriting_is_idempotent():
+    page = '<img src="../img/Chapter%201%20Moore&#x27;s%20Law.jpg">'
+    once = rewrite_asset_urls(page, 'Lectures/html', {IMAGE: COPY})
+    assert rewrite_asset_urls(once, 'Lectures/html', {IMAGE: COPY}, {COPY: IMAGE}) == once
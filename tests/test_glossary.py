@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from glossary import build_glossary, collect_terms, mark_terms
+from lecture_parser import parse_markdown
+
+MARKDOWN_DIR = Path(__file__).resolve().parent.parent / 'Lectures' / 'markdown'
+
+
+def lecture_terms(name):
+    doc = parse_markdown((MARKDOWN_DIR / name).read_text(encoding='utf-8'))
+    return {entry['key']: entry for entry in collect_terms(doc)}
+
+
+def test_terms_defined_with_a_head_noun_or_under_a_definition_heading():
+    terms = lecture_terms('Lecture 15 - Direct Mapped Cache Control.md')
+    assert terms['write through']['term'] == 'Write-Through'
+    assert terms['write back']['definition'].startswith('Write-back policy introduced')
+    assert lecture_terms('Lecture 12 - Pipelined Processors.md')['forwarding']['term'] == 'Forwarding'
+
+
+def test_proper_nouns_plurals_and_values_are_not_terms():
+    keys = set(lecture_terms('Lecture 2 - Technology Trends.md'))
+    assert 'hardware architecture' in keys
+    assert not keys & {'gamer', 'enthusiast', 'java', 'plateau'}
+    assert not set(lecture_terms('Lecture 18 - Virtual Memory.md')) & {'access', 'transfer'}
+    assert 'data' not in lecture_terms('Lecture 13 - Pipeline Operation and Timing.md')
+
+
+def test_separator_after_an_abbreviation():
+    doc = parse_markdown('- **Translation Lookaside Buffer** (TLB): caches recent address translations\n\n'
+                         'The translation lookaside buffer is small.\n')
+    assert collect_terms(doc)[0]['definition'] == 'caches recent address translations'
+
+
+def test_only_glossary_terms_are_marked():
+    doc = parse_markdown('**Hit rate**: fraction of accesses found in the cache.\n\n'
+                         'The hit rate is high. **Hit rate** and **net effect calculation** again.\n')
+    glossary = build_glossary([{'lecture': 1, 'title': 'T', 'url': 'lecture-01.html', 'terms': collect_terms(doc)}])
+    keys = {entry['key'] for entry in glossary['terms']}
+    assert keys == {'hit rate'}
+
+    page = ('<p><strong>Hit rate</strong>, <strong data-term="net effect calculation">net effect calculation'
+            '</strong>, <strong>Hit-rate policy</strong></p>')
+    marked = mark_terms(page, keys)
+    assert marked == ('<p><strong data-term="hit rate">Hit rate</strong>, <strong>net effect calculation</strong>, '
+                      '<strong data-term="hit rate">Hit-rate policy</strong></p>')
+    assert mark_terms(marked, keys) == marked
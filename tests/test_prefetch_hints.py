@@ -0,0 +1,20 @@
+from prefetch_hints import first_image, set_image_prefetch
+
+PICTURE = ('<picture><source type="image/avif" srcset="a-480.avif 480w, a-960.avif 960w" sizes="600px">'
+           '<source type="image/webp" srcset="a-480.webp 480w, a-960.webp 960w" sizes="600px">'
+           '<img src="a.jpg" alt=""></picture>')
+
+
+def test_picture_hint_carries_the_source_type():
+    assert first_image(PICTURE) == ('a-960.avif', 'image/avif')
+    assert first_image('<img src="a.jpg">') == ('a.jpg', None)
+    assert first_image('<img src="https://example.com/a.jpg">') is None
+
+
+def test_set_image_prefetch_is_idempotent():
+    page = '<head></head>'
+    once = set_image_prefetch(page, 'a-960.avif', 'image/avif')
+    assert once == '<head><link rel="prefetch" href="a-960.avif" as="image" type="image/avif"></head>'
+    assert set_image_prefetch(once, 'a-960.avif', 'image/avif') == once
+    assert set_image_prefetch(once, 'a.jpg') == '<head><link rel="prefetch" href="a.jpg" as="image"></head>'
+    assert set_image_prefetch(once, None) == page
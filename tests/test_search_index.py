@@ -0,0 +1,46 @@
+from bench_search_index import JsonTerms
+from lecture_parser import parse_markdown
+from search_format import decode_dictionary, decode_shard, encode_dictionary, encode_shard
+from search_index import INDEX_VERSION, SearchIndex, build_dictionary, lecture_shard, lecture_vocabulary
+
+LECTURES = {
+    1: ('# Lecture 1\n\nCaches keep recent data.\n\n## Write-Back Policy\n\n'
+        'A write-back cache writes a dirty block back on eviction. Write-back saves bandwidth.\n\n'
+        '## Summary\n\nBack to basics: write policies.\n'),
+    2: ('# Lecture 2\n\n## Pipelines\n\nThe write-back stage comes last.\n\n'
+        '## Pipelines\n\nA repeated heading gets a numbered anchor.\n\n## Grüße\n\nUnicode headings keep their anchor.\n'),
+}
+
+
+def shards():
+    return [lecture_shard(parse_markdown(text), num, f'Lecture {num}', f'lecture-{num:02d}.html')
+            for num, text in LECTURES.items()]
+
+
+def binary_index(shards):
+    dictionary = decode_dictionary(encode_dictionary(build_dictionary(map(lecture_vocabulary, shards))))
+    data = {shard['lecture']: encode_shard(shard, INDEX_VERSION) for shard in shards}
+    return SearchIndex(dictionary, lambda num: decode_shard(data[num], dictionary))
+
+
+def test_postings_count_occurrences_per_section():
+    shard = shards()[0]
+    assert [anchor for anchor, _ in shard['sections']] == ['', 'write-back-policy', 'summary']
+    # Section 1 four times (once in its heading), then section 2 once
+    assert shard['postings']['back'] == [1, 4, 1, 1]
+
+
+def test_binary_index_ranks_like_the_json_one():
+    built = shards()
+    json_index = SearchIndex({'terms': JsonTerms(build_dictionary(map(lecture_vocabulary, built))['terms'])},
+                             {shard['lecture']: shard for shard in built}.get)
+    binary = binary_index(built)
+    for query in ('write-back', 'write back', 'pipe', 'grüße', 'anchor', 'back basics'):
+        assert binary.query(query) == json_index.query(query), query
+
+    results = binary.query('write-back')
+    # In the heading and as a phrase in it, then only in the text, ties by lecture
+    assert [(r['lecture'], r['anchor']) for r in results] == [(1, 'write-back-policy'), (1, 'summary'),
+                                                             (2, 'pipelines')]
+    assert binary.query('repeated')[0]['url'] == 'lecture-02.html#pipelines-1'
+    assert binary.query('unicode')[0]['anchor'] == 'grüße'